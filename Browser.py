@@ -1,12 +1,24 @@
 
 import re
 import os
+import errno
+import bisect
+import heapq
 import socket
 import json
 import pathlib
 import time
 import select
+import subprocess
+import threading
+import queue
+import unicodedata
+from array import array
+from collections import OrderedDict
 from XoneK2_DJ.tinytag import TinyTag
+from XoneK2_DJ.library import USER_LIBRARY, DURATIONS_VERSION, DurationCache, LibraryScanner, TagSummary
+from XoneK2_DJ import logger
+from XoneK2_DJ import store
 from urllib.parse import unquote
 
 MUSIC_TO_OPEN_KEY = {
@@ -74,11 +86,20 @@ OPEN_TO_MUSICAL_KEY = {
 }
 
 def uri_to_path(uri):
-    path = re.sub('^query:UserLibrary#', '~/Music/Ableton/User Library/', uri)
+    path = re.sub('^query:UserLibrary#', USER_LIBRARY + '/', uri)
     path = re.sub(':','/', path)
     path = unquote(path)
     return path
 
+def normalise_path(path):
+    """
+        Key to compare file names from different sources, e.g. the browser's uris
+        and clip.file_path: absolute, normalised and in NFC (macOS file systems
+        hand out decomposed unicode)
+    """
+    path = os.path.normcase(os.path.normpath(os.path.expanduser(path)))
+    return unicodedata.normalize('NFC', path)
+
 def key_distance(from_key, to_key):
     # key distances are as follows:
     # -1: unknown
@@ -111,19 +132,142 @@ def key_distance(from_key, to_key):
         return 2
 
     if (d > 6):
-        d = 12 - 6
+        d = 12 - d
 
     if (d <= 1):
         return d
     return 12
 
+# key distances between all open keys by KEY_INDEX, with UNKNOWN_KEY for anything else
+OPEN_KEYS = ["%d%s" % (n, dm) for n in range(1, 13) for dm in "dm"]
+KEY_INDEX = {key: i for i, key in enumerate(OPEN_KEYS)}
+UNKNOWN_KEY = len(OPEN_KEYS)
+KEY_DISTANCES = [[key_distance(from_key, to_key) for to_key in OPEN_KEYS + ["?"]] for from_key in OPEN_KEYS + ["?"]]
+
+def key_index(open_key):
+    return KEY_INDEX.get(open_key, UNKNOWN_KEY)
+
+def bpm_bounds(bpm, tolerance_percent):
+    """the bpm ranges that fit bpm at this tolerance, at the same, half and double time"""
+    fac = (100.0 + tolerance_percent) / 100.0
+    return [(bpm * m / fac, bpm * m * fac) for m in (1.0, 0.5, 2.0)]
+
+# "suggest next track" ranks the library by a penalty against the master deck, lowest first:
+# by key distance (anything not listed is a clash), per percent the bpm is off from the
+# tempo (at half or double time, whichever is closest) and for a different genre
+SUGGESTION_COUNT = 20
+SUGGESTION_KEY_PENALTY = {0: 0.0, 1: 1.0, 3: 2.0, 2: 3.0}
+SUGGESTION_KEY_CLASH_PENALTY = 8.0
+SUGGESTION_BPM_PENALTY_PER_PERCENT = 1.0
+SUGGESTION_BPM_UNKNOWN_PENALTY = 10.0
+SUGGESTION_GENRE_PENALTY = 2.0
+# bpm offset in percent of the first tracks looked at for suggestions, see _update_suggestions()
+SUGGESTION_FIRST_BPM_OFFSET = 1.0
+
+def bpm_offset_percent(bpm, tempo):
+    """how far bpm is from tempo in percent, allowing half and double time"""
+    return min(abs(bpm * 0.5 - tempo), abs(bpm - tempo), abs(bpm * 2.0 - tempo)) * 100.0 / tempo
+
+def bpm_penalty(bpm, tempo):
+    """the bpm part of the suggestion penalty, tempo (float) is the song's tempo the track will be warped to"""
+    if bpm > 0:
+        return bpm_offset_percent(bpm, tempo) * SUGGESTION_BPM_PENALTY_PER_PERCENT
+    return SUGGESTION_BPM_UNKNOWN_PENALTY
+
+# bump when the library data kept in the store changes
+LIBRARY_FORMAT_VERSION = 3
+
+class ExactDurationScanner(threading.Thread):
+    """
+        TinyTag only estimates the duration of mp3 files from the first few frames,
+        which can be quite far off for VBR files. This counts all frames in the
+        background and hands the results back through a queue, so the browser can
+        pick them up in poll(). Files that were measured before, in this session or
+        an earlier one, come from the DurationCache.
+    """
+    # the durations measured so far are written to the cache file this often
+    SAVE_INTERVAL = 30.0
+
+    def __init__(self, filenames, cache):
+        super(ExactDurationScanner, self).__init__(daemon=True)
+        self._filenames = filenames
+        self._cache = cache
+        self._stopped = False
+        self.results = queue.Queue()
+
+    def run(self):
+        next_save = time.monotonic() + self.SAVE_INTERVAL
+        try:
+            for filename in self._filenames:
+                if self._stopped:
+                    return
+                try:
+                    self.results.put((filename, self._exact_duration(filename)))
+                except Exception:
+                    continue
+                if time.monotonic() >= next_save:
+                    self._cache.save()
+                    next_save = time.monotonic() + self.SAVE_INTERVAL
+        finally:
+            self._cache.save()
+
+    def _exact_duration(self, filename):
+        path = os.path.expanduser(filename)
+        stat = os.stat(path)
+        seconds = self._cache.get(path, stat)
+        if seconds == None:
+            seconds = TinyTag.get(path, tags=False, duration=True, exact_duration=True).duration
+            self._cache.put(path, stat, seconds)
+        return seconds
+
+    def stop(self):
+        self._stopped = True
+
+class LibraryRescan(threading.Thread):
+    """
+        Scans the library in the background when the browser started from the
+        library kept in the store. The result is handed back through a queue as
+        (found, manifest), found is None if nothing changed
+    """
+    def __init__(self, scanner, library):
+        """
+        library (dict): the library the browser started from, as kept in the store
+        """
+        super(LibraryRescan, self).__init__(daemon=True)
+        self._scanner = scanner
+        self._files = library["files"]
+        self._tags = library["tags"]
+        self.results = queue.Queue()
+
+    def run(self):
+        found = self._scanner.scan()
+        if [filename for filename, _ in found] == self._files and \
+                [summary.to_list() for _, summary in found] == self._tags:
+            found = None
+        self.results.put((found, self._scanner.manifest))
+
+def format_duration(seconds):
+    return "%d:%02d" % (int(seconds)/60, int(seconds) % 60)
+
 class TaggedFile():
-    def __init__(self, filename):
+    # there's one of these per file in the library, so keep them small
+    __slots__ = ('_file_name', '_artist', '_title', '_genre', '_duration', '_bpm', '_key', '_key_distance',
+                 '_open_key', '_musical_key')
+
+    def __init__(self, filename, summary=None):
+        """
+        summary (TagSummary): the file's tags if they are known already, e.g. from
+            the library manifest, otherwise they are read from the file
+        """
         self._file_name = filename
-        self._tags = TinyTag.get(self._file_name)
-        self._duration = "%d:%02d" % (int(self._tags.duration)/60, int(self._tags.duration) % 60)
-        self._bpm = self._tags.extra['bpm'] if 'bpm' in self._tags.extra else "none"
-        self._key = self._tags.extra['initial_key'] if 'initial_key' in self._tags.extra else "none"
+        if summary == None:
+            summary = TagSummary.read(filename)
+        self._artist = summary.artist
+        self._title = summary.title
+        self._genre = summary.genre
+        self._duration = format_duration(summary.duration)
+        self._bpm = summary.bpm
+        self._key = summary.key
         self._key_distance = -1
         self._normaliseKey()
 
@@ -139,11 +283,8 @@ class TaggedFile():
             self._musical_key = key
             self._open_key = MUSIC_TO_OPEN_KEY[key] if key in MUSIC_TO_OPEN_KEY.keys() else "?"
 
-    def updateDistanceTo(self, key):
-        if key == None:
-            self._key_distance = -1
-        else:
-            self._key_distance = key_distance(self.open_key, key)
+    def set_duration(self, seconds):
+        self._duration = format_duration(seconds)
 
     @property
     def filename(self):
@@ -151,11 +292,11 @@ class TaggedFile():
 
     @property
     def artist(self):
-        return self._tags.artist or "unknown"
+        return self._artist or "unknown"
 
     @property
     def title(self):
-        return self._tags.title or self.filename.split('/')[-1]
+        return self._title or self.filename.split('/')[-1]
 
     @property
     def duration(self):
@@ -175,7 +316,7 @@ class TaggedFile():
 
     @property
     def genre(self):
-        return self._tags.genre or "unknown"
+        return self._genre or "unknown"
 
     @property
     def keydistance(self):
@@ -183,27 +324,233 @@ class TaggedFile():
 
 
 class BrowserItem(TaggedFile):
-    def __init__(self, live_browser_item):
-        super(BrowserItem, self).__init__(uri_to_path(live_browser_item.uri))
+    """
+        A file of the user library. The item of Live's browser is only looked up
+        when it's needed, walking the browser tree along the file's path.
+    """
+    __slots__ = ('_item',)
+
+    def __init__(self, filename, summary=None, live_browser_item=None):
+        super(BrowserItem, self).__init__(filename, summary)
         self._item = live_browser_item
 
-    def item(self):
+    def item(self, browser):
+        if self._item == None:
+            self._item = find_browser_item(browser.user_library, self._file_name)
         return self._item
 
+def find_browser_item(node, filename):
+    """the item below node whose uri maps to filename, None if there is none"""
+    wanted = normalise_path(filename)
+    while node != None:
+        parent, node = node, None
+        for child in parent.iter_children:
+            path = normalise_path(uri_to_path(child.uri))
+            if path == wanted:
+                return child
+            if child.is_folder and wanted.startswith(path + os.sep):
+                node = child
+                break
+    return None
+
+class FilterCache():
+    """
+        Least recently used results of _apply_filter, as array('I') of library
+        indices with the bpm window they were computed for, keyed by everything
+        the result depends on. Holds at most max_bytes of results.
+    """
+    ENTRY_OVERHEAD = 200
+
+    def __init__(self, max_bytes):
+        self._max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _size(self, entry):
+        return entry[0].itemsize * len(entry[0]) + self.ENTRY_OVERHEAD
+
+    def get(self, key):
+        entry = self._entries.get(key)
+        if entry == None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._entries.move_to_end(key)
+        return entry
+
+    def put(self, key, indices, bpm_lower, bpm_upper):
+        entry = (array('I', indices), bpm_lower, bpm_upper)
+        size = self._size(entry)
+        if size > self._max_bytes:
+            return
+        old = self._entries.pop(key, None)
+        if old != None:
+            self.bytes -= self._size(old)
+        self._entries[key] = entry
+        self.bytes += size
+        while self.bytes > self._max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self.bytes -= self._size(evicted)
+            self.evictions += 1
+
+    def clear(self):
+        self._entries.clear()
+        self.bytes = 0
+
+    def stats(self):
+        return "%d entries, %d KB, %d hits, %d misses, %d evictions" % (
+            len(self._entries), self.bytes // 1024, self.hits, self.misses, self.evictions)
+
+class UiProcess():
+    """
+        Keeps the LiveMusicBrowser UI running as a child process. Nothing here waits
+        for the UI: start() launches it, poll() (called on every tick) pings it until
+        it reports it's ready and restarts it with increasing delays when it crashed.
+        Without a command it only pings, for a UI that is started some other way.
+    """
+    RESTART_DELAY = 1.0
+    MAX_RESTART_DELAY = 30.0
+    PING_INTERVAL = 0.5
+    LOG_FILE = "/tmp/LiveMusicBrowser.log"
+
+    def __init__(self, command, log, ping):
+        self._command = command
+        self._log = log
+        self._ping = ping
+        self._process = None
+        self._ready = False
+        self._started_at = 0.0
+        self._next_ping = 0.0
+        self._restart_at = None
+        self._restart_delay = self.RESTART_DELAY
+
+    def is_ready(self):
+        return self._ready
+
+    def set_ready(self):
+        if not self._ready:
+            self._log("UI ready after %.1fs" % (time.monotonic() - self._started_at))
+        self._ready = True
+
+    def lost(self):
+        """the UI stopped accepting messages, wait for it to report ready again"""
+        self._ready = False
+
+    def start(self):
+        self._ready = False
+        self._restart_at = None
+        self._started_at = time.monotonic()
+        self._next_ping = self._started_at
+        if self._command == None:
+            self._log("waiting for UI to be started")
+            return
+        try:
+            with open(self.LOG_FILE, "ab") as log_file:
+                self._process = subprocess.Popen(self._command, stdin=subprocess.DEVNULL,
+                                                 stdout=log_file, stderr=log_file)
+        except OSError as e:
+            self._log("Couldn't start UI %s: %s" % (self._command, e))
+            self._process = None
+            self._schedule_restart()
+
+    def poll(self):
+        now = time.monotonic()
+        if self._process != None:
+            returncode = self._process.poll()
+            if returncode != None:
+                self._process = None
+                self._ready = False
+                if returncode == 0:
+                    # closed by the user or told to quit
+                    self._log("UI exited")
+                else:
+                    self._log("UI exited with %d" % returncode)
+                    self._schedule_restart()
+                return
+        elif self._command != None:
+            if self._restart_at != None and now >= self._restart_at:
+                self.start()
+            return
+
+        if not self._ready and now >= self._next_ping:
+            self._next_ping = now + self.PING_INTERVAL
+            self._ping()
+
+    def _schedule_restart(self):
+        now = time.monotonic()
+        if now - self._started_at > self.MAX_RESTART_DELAY:
+            # it ran fine for a while, so start over with short delays
+            self._restart_delay = self.RESTART_DELAY
+        self._log("restarting UI in %.1fs" % self._restart_delay)
+        self._restart_at = now + self._restart_delay
+        self._restart_delay = min(self._restart_delay * 2, self.MAX_RESTART_DELAY)
+
+    def stop(self):
+        """stop supervising, the UI quits by itself when it's told to"""
+        self._restart_at = None
+        self._process = None
+        self._ready = False
+
 class BrowserRepresentation():
 
     SOCKET_IN = "/tmp/LiveMusicBrowser.src.socket"
     SOCKET_OUT = "/tmp/LiveMusicBrowser.ui.socket"
+    COLUMNS = ["Artist", "Title", "Genre", "Duration", "BPM", "Key", "KeyDistance"]
+    ROW_ATTRIBUTES = [c.lower() for c in COLUMNS]
+    # tags of playing files that aren't in the library are kept for this many files
+    OUTSIDE_FILE_CACHE_SIZE = 16
+    # memory for the results of recent filter states, to toggle back to them quickly
+    FILTER_CACHE_BYTES = 4 * 1024 * 1024
+    # tempos closer than this share filter results
+    FILTER_CACHE_BPM_QUANTUM = 0.01
+    # exact durations that change what the UI shows are sent at most this often
+    DURATION_UPDATE_INTERVAL = 1.0
+    # at most this many exact durations are taken over per poll
+    DURATIONS_PER_POLL = 5000
 
     def __init__(self, browser, log):
+        # __del__ quits the UI, even if this fails before it is started
+        self._ui = None
         self._browser = browser
         self._log = log
         self._parents = []
         self._current = []
         self._filtered = []
         self._current_index = 0
-        self._iterate_and_find_audio(browser.user_library)
+        # the library as kept in the store, see _set_library()
+        self._library = None
+        self._scan_library()
+        # library indices of the items in self._filtered, in the same order
+        self._filtered_ix = []
+        self._outside_files = OrderedDict()
         self._decks = {}
+        # the arguments of the last set_decks(), to find the decks again in a changed library
+        self._deck_files = ([], None)
+        self._master_deck = None
+        self._playing_key = None
+        # bumped on every change of the decks, compatibility with them is cached per version
+        self._deck_version = 0
+        self._compatibility_version = None
+        self._compatibility = []
+        # only show tracks compatible with None: no filter, "all": all playing decks, n: deck n
+        self._deck_filter = None
+        self._deck_mask = None
+        self._deck_mask_version = None
+        # bumped whenever the library changes, cached filter results are per version
+        self._library_version = 0
+        self._filter_cache = FilterCache(self.FILTER_CACHE_BYTES)
+        # "suggest next track": the best matches for the master deck, best first
+        self._suggest = False
+        self._suggestions = []
+        # the key and genre part of every track's suggestion penalty, per library and deck version
+        self._suggestion_base = []
+        self._suggestion_base_version = None
+        # an exact duration the UI shows came in since it was last updated
+        self._durations_shown = False
+        self._next_duration_update = 0.0
 
         if os.path.exists(self.SOCKET_IN):
             os.remove(self.SOCKET_IN)
@@ -211,6 +558,12 @@ class BrowserRepresentation():
         self._socket = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
         self._socket.bind(self.SOCKET_IN)
         self._socket.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, 250*1024)
+        # never block Live's thread when the UI doesn't keep up
+        self._socket.setblocking(False)
+        # latest message for the UI that couldn't be sent yet
+        self._pending = None
+        # the last full state didn't fit in a datagram, so the UI has an older one
+        self._too_big = False
         self._bpm_lower = 0.0
         self._bpm_upper = 1000.0
         self._bpm = 100.0
@@ -223,13 +576,155 @@ class BrowserRepresentation():
         self._start_ui()
         self._apply_filter()
         self._update()
+        self._start_duration_scan()
+
+    def _scan_library(self):
+        """
+            Starts from the library kept in the store if a set was loaded before,
+            and checks it for changes in the background. Scans it otherwise.
+        """
+        self._library_scan = None
+        stored = store.get("library", LIBRARY_FORMAT_VERSION)
+        if stored != None and stored["root"] == os.path.expanduser(USER_LIBRARY):
+            self._load_library(stored)
+            self._log("library has %d files, kept from the last set" % len(self._current))
+            self._library_scan = LibraryRescan(LibraryScanner(self._log, manifest=stored["manifest"]), stored)
+            self._library_scan.start()
+            return
+        scanner = LibraryScanner(self._log)
+        found = scanner.scan()
+        self._log("library has %d files, read tags of %d" % (len(found), scanner.read_count))
+        self._set_library(found, scanner.manifest)
+
+    def _load_library(self, library):
+        self._library = library
+        self._current = [BrowserItem(filename, TagSummary(*tags))
+                         for filename, tags in zip(library["files"], library["tags"])]
+        self._items_by_path = dict(zip(library["paths"], self._current))
+        self._key_column = library["key_column"]
+        self._bpm_column = library["bpm_column"]
+        self._bpm_order = library["bpm_order"]
+        self._bpm_sorted = library["bpm_sorted"]
+        self._genre_column = library["genre_column"]
+
+    def _set_library(self, found, manifest):
+        """
+            Makes found [(filename, TagSummary)] the library and keeps it in the
+            store as plain data. The items of files with the same tags as before
+            are kept, with their exact durations.
+        """
+        old = {}
+        if self._library != None:
+            old = {filename: (tags, path, item) for filename, tags, path, item in
+                   zip(self._library["files"], self._library["tags"], self._library["paths"], self._current)}
+        files = []
+        tags = []
+        paths = []
+        items = []
+        for filename, summary in found:
+            summary_tags = summary.to_list()
+            entry = old.get(filename)
+            if entry != None and entry[0] == summary_tags:
+                path, item = entry[1], entry[2]
+            else:
+                path, item = normalise_path(filename), BrowserItem(filename, summary)
+            files.append(filename)
+            tags.append(summary_tags)
+            paths.append(path)
+            items.append(item)
+        self._current = items
+        self._items_by_path = dict(zip(paths, items))
+        self._index_columns()
+        self._library = {
+            "root": os.path.expanduser(USER_LIBRARY),
+            "manifest": manifest,
+            "files": files,
+            "tags": tags,
+            "paths": paths,
+            "key_column": self._key_column,
+            "bpm_column": self._bpm_column,
+            "bpm_order": self._bpm_order,
+            "bpm_sorted": self._bpm_sorted,
+            "genre_column": self._genre_column,
+        }
+        store.put("library", LIBRARY_FORMAT_VERSION, self._library)
+
+    def _apply_library_scan(self):
+        """takes over the result of the background scan if there is one"""
+        if self._library_scan == None:
+            return
+        try:
+            found, manifest = self._library_scan.results.get_nowait()
+        except queue.Empty:
+            return
+        self._library_scan = None
+        if found == None:
+            # another browser, e.g. the one from before the set was reloaded, may use the stored one
+            self._library = dict(self._library, manifest=manifest)
+            store.put("library", LIBRARY_FORMAT_VERSION, self._library)
+            return
+        self._set_library(found, manifest)
+        self._log("library changed, has %d files now" % len(self._current))
+        # library indices of the old library mean nothing anymore
+        self._library_version += 1
+        self._filter_cache.clear()
+        self._filtered_ix = []
+        self._current_index = 0
+        self._duration_scanner.stop()
+        self._start_duration_scan()
+        # finds the decks in the new library, which recomputes and sends everything depending on them
+        self.set_decks(*self._deck_files)
+
+    def _index_columns(self):
+        # keys and bpms of the library by index, to go through all of it in one pass
+        self._key_column = [key_index(item.open_key) for item in self._current]
+        self._bpm_column = [item.bpm for item in self._current]
+        # library indices sorted by bpm, to find the tracks entering or leaving the bpm window
+        self._bpm_order = sorted(range(len(self._current)), key=self._bpm_column.__getitem__)
+        self._bpm_sorted = [self._bpm_column[i] for i in self._bpm_order]
+        # lower case, as the suggestions compare them
+        self._genre_column = [item.genre.lower() for item in self._current]
+
+    def _start_duration_scan(self):
+        # library indices of the files waiting for their exact duration
+        self._exact_duration_pending = {}
+        for i, item in enumerate(self._current):
+            if item.filename.lower().endswith("mp3"):
+                self._exact_duration_pending[item.filename] = i
+        # the durations are kept in the store as well, so a reload doesn't read the file again
+        cache = DurationCache(self._log, durations=store.get("exact_durations", DURATIONS_VERSION))
+        cache.prune(os.path.expanduser(filename) for filename in self._exact_duration_pending)
+        store.put("exact_durations", DURATIONS_VERSION, cache.durations)
+        self._duration_scanner = ExactDurationScanner(list(self._exact_duration_pending.keys()), cache)
+        self._duration_scanner.start()
 
-    def _iterate_and_find_audio(self, node):
-        for n in node.iter_children:
-            if n.is_folder:
-                self._iterate_and_find_audio(n)
-            elif n.uri.endswith("aiff") or n.uri.endswith("mp3"):
-                self._current.append(BrowserItem(n))           
+    def _apply_exact_durations(self):
+        """
+            Takes over the exact durations found since the last poll, True if the UI
+            should be updated: a row it shows changed, and it hasn't been updated
+            for DURATION_UPDATE_INTERVAL
+        """
+        for _ in range(self.DURATIONS_PER_POLL):
+            try:
+                filename, duration = self._duration_scanner.results.get_nowait()
+            except queue.Empty:
+                break
+            i = self._exact_duration_pending.pop(filename, None)
+            if i == None or not duration:
+                continue
+            item = self._current[i]
+            shown = item.duration
+            item.set_duration(duration)
+            if not self._durations_shown and item.duration != shown and self._is_shown(i, item):
+                self._durations_shown = True
+        return self._durations_shown and time.monotonic() >= self._next_duration_update
+
+    def _is_shown(self, i, item):
+        """whether the UI shows the library item i: in the rows, on a deck or suggested"""
+        pos = bisect.bisect_left(self._filtered_ix, i)
+        if pos < len(self._filtered_ix) and self._filtered_ix[pos] == i:
+            return True
+        return any(deck is item for deck in self._decks) or any(s is item for s in self._suggestions)
 
     def scroll_horizontal(self, right_not_left):
         pass
@@ -249,78 +744,293 @@ class BrowserRepresentation():
         self._update()
 
     def preview(self):
-        self._browser.preview_item(
-            self._filtered[self._current_index].item())
+        if self._filtered:
+            self._browser_action(self._browser.preview_item, self._filtered[self._current_index])
 
     def load(self):
-        self._browser.load_item(
-            self._filtered[self._current_index].item())
+        if self._filtered:
+            self._browser_action(self._browser.load_item, self._filtered[self._current_index])
+
+    def _browser_action(self, action, item):
+        """
+            Calls action (preview_item or load_item) with the item of Live's browser
+            for item. The library is scanned from disk, Live may not have indexed a
+            file yet or not list it at all, e.g. if it can't import the format.
+        """
+        live_item = item.item(self._browser)
+        if live_item == None:
+            self._log("%s isn't in Live's browser, can't preview or load it" % item.filename)
+            return
+        action(live_item)
 
     def tempo(self, bpm):
         self._bpm = float(bpm)
-        self._apply_filter()
-        self._update()
+        if self._filter_by_bpm:
+            self._shift_bpm_window()
+        if self._suggest:
+            suggestions = self._suggestions
+            self._update_suggestions()
+            if self._suggestions != suggestions:
+                self._send_diff({
+                    "sel_ix": self._current_index,
+                    "rows_removed": [],
+                    "rows_inserted": [],
+                    "suggestions": [self._row(item) for item in self._suggestions]
+                })
 
-    def _filter(self, item):
+    def _filter(self, i, item):
+        return self._filter_except_bpm(i, item) and \
+               (not self._filter_by_bpm or (item.bpm > self._bpm_lower and item.bpm < self._bpm_upper))
+
+    def _filter_except_bpm(self, i, item):
+        if (self._filter_artist != "" or self._filter_title != "" or self._filter_genre != "") and \
+                not self._filter_text(item):
+            return False
+        if self._deck_mask != None and not self._deck_mask[i]:
+            return False
+        return not self._filter_by_key or item.keydistance < 4
+
+    def _filter_text(self, item):
         if self._filter_artist != "" and not self._filter_artist in item.artist.lower():
             return False
         if self._filter_title != "" and not self._filter_title in item.title.lower():
             return False
         if self._filter_genre != "" and not self._filter_genre in item.genre.lower():
             return False
+        return True
 
-        return (not self._filter_by_bpm or (item.bpm > self._bpm_lower and item.bpm < self._bpm_upper)) and \
-               (not self._filter_by_key or item.keydistance < 4)
-
-    def _apply_filter(self):
-        try:
-            current_sel = self._filtered[self._current_index]
-        except:
-            current_sel = None
-
+    def _bpm_window(self):
         fac = (100.0 + self._bpm_tolerance_percent)/100.0
-        self._bpm_upper = self._bpm * fac
-        self._bpm_lower = self._bpm / fac
+        return self._bpm / fac, self._bpm * fac
 
-        self._filtered = list(filter(lambda item: self._filter(item), self._current))
+    def _bpm_range(self, lower, upper):
+        """positions in self._bpm_order of the tracks with lower < bpm < upper"""
+        return (bisect.bisect_right(self._bpm_sorted, lower),
+                bisect.bisect_left(self._bpm_sorted, upper))
 
+    def _selected_library_index(self):
         try:
-            self._current_index = self._filtered.index(current_sel)
-        except:
+            return self._filtered_ix[self._current_index]
+        except IndexError:
+            return None
+
+    def _select_library_index(self, library_ix):
+        pos = bisect.bisect_left(self._filtered_ix, library_ix) if library_ix != None else 0
+        if pos < len(self._filtered_ix) and self._filtered_ix[pos] == library_ix:
+            self._current_index = pos
+        else:
             self._current_index = 0
 
+    def _filter_state(self):
+        """everything the result of _apply_filter depends on, normalised"""
+        return (
+            self._library_version,
+            self._filter_artist, self._filter_title, self._filter_genre,
+            self._playing_key if self._filter_by_key else False,
+            (round(self._bpm / self.FILTER_CACHE_BPM_QUANTUM), self._bpm_tolerance_percent)
+                if self._filter_by_bpm else False,
+            (self._deck_filter, self._deck_version, self._bpm_tolerance_percent)
+                if self._deck_filter != None else None,
+        )
+
+    def _apply_filter(self):
+        selected = self._selected_library_index()
+        version = (self._deck_version, self._bpm_tolerance_percent, self._deck_filter)
+        if self._deck_mask_version != version:
+            self._deck_mask = self._deck_filter_mask()
+            self._deck_mask_version = version
+
+        state = self._filter_state()
+        cached = self._filter_cache.get(state)
+        if cached != None:
+            # made for a tempo up to half a quantum away, so move its window to this one
+            indices, self._bpm_lower, self._bpm_upper = cached
+            self._filtered_ix = list(indices)
+            self._filtered = [self._current[i] for i in self._filtered_ix]
+            if self._filter_by_bpm:
+                self._move_bpm_window()
+        else:
+            self._bpm_lower, self._bpm_upper = self._bpm_window()
+            self._filtered_ix = [i for i, item in enumerate(self._current) if self._filter(i, item)]
+            self._filter_cache.put(state, self._filtered_ix, self._bpm_lower, self._bpm_upper)
+            self._filtered = [self._current[i] for i in self._filtered_ix]
+        self._select_library_index(selected)
+
+    def _shift_bpm_window(self):
+        """moves the bpm window to the current tempo and sends the UI just the rows that changed"""
+        changes = self._move_bpm_window()
+        if changes == None:
+            return
+        removed, inserted = changes
+        # removals are positions in the old rows, highest first, insertions positions
+        # in the new rows, lowest first
+        self._send_diff({
+            "sel_ix": self._current_index,
+            "rows_removed": removed,
+            "rows_inserted": inserted
+        })
+
+    def _move_bpm_window(self):
+        """
+            Moves the bpm window to the current tempo, only looking at the tracks that
+            enter or leave it. Returns the removed and inserted rows, None if none changed
+        """
+        old_start, old_end = self._bpm_range(self._bpm_lower, self._bpm_upper)
+        self._bpm_lower, self._bpm_upper = self._bpm_window()
+        start, end = self._bpm_range(self._bpm_lower, self._bpm_upper)
+
+        leaving = [self._bpm_order[p] for p in range(old_start, old_end) if not start <= p < end]
+        entering = [self._bpm_order[p] for p in range(start, end) if not old_start <= p < old_end]
+        leaving = [i for i in leaving if self._filter_except_bpm(i, self._current[i])]
+        entering = [i for i in entering if self._filter_except_bpm(i, self._current[i])]
+        if not leaving and not entering:
+            return None
+
+        selected = self._selected_library_index()
+        removed = sorted((bisect.bisect_left(self._filtered_ix, i) for i in leaving), reverse=True)
+        for pos in removed:
+            del self._filtered_ix[pos]
+            del self._filtered[pos]
+        inserted = []
+        for i in sorted(entering):
+            pos = bisect.bisect_left(self._filtered_ix, i)
+            self._filtered_ix.insert(pos, i)
+            self._filtered.insert(pos, self._current[i])
+            inserted.append([pos, self._row(self._current[i])])
+        self._select_library_index(selected)
+        return removed, inserted
+
     def _update_key_distance(self):
         self._playing_key = None
         if self._master_deck != None:
             self._playing_key = self._master_deck.open_key
 
-        for item in self._current:
-            item.updateDistanceTo(self._playing_key)
+        if self._playing_key == None:
+            for item in self._current:
+                item._key_distance = -1
+        else:
+            distances = KEY_DISTANCES[key_index(self._playing_key)]
+            for item, key in zip(self._current, self._key_column):
+                item._key_distance = distances[key]
+
+    def _deck_compatibility(self):
+        """
+            For every deck, a byte per library track that is 1 if the track goes with
+            the deck (key distance below 4 or unknown, bpm within the tolerance at
+            the same, half or double time), None for empty decks. Computed once per
+            deck state and tolerance.
+        """
+        version = (self._deck_version, self._bpm_tolerance_percent)
+        if self._compatibility_version != version:
+            self._compatibility = [self._compatible_with(deck) if deck != None else None for deck in self._decks]
+            self._compatibility_version = version
+        return self._compatibility
+
+    def _compatible_with(self, deck):
+        distances = KEY_DISTANCES[key_index(deck.open_key)]
+        if deck.bpm > 0:
+            (lo, hi), (lo_half, hi_half), (lo_double, hi_double) = bpm_bounds(deck.bpm, self._bpm_tolerance_percent)
+        else:
+            # no idea, so anything goes
+            lo, hi = lo_half, hi_half = lo_double, hi_double = 0.0, float('inf')
+        return bytes([distances[key] < 4 and
+                      (bpm <= 0 or lo < bpm < hi or lo_half < bpm < hi_half or lo_double < bpm < hi_double)
+                      for key, bpm in zip(self._key_column, self._bpm_column)])
+
+    def _deck_filter_mask(self):
+        """which library tracks pass the deck filter, None if it is off"""
+        if self._deck_filter == None:
+            return None
+        compatibility = self._deck_compatibility()
+        if self._deck_filter == "all":
+            masks = [c for c in compatibility if c != None]
+        elif 0 <= self._deck_filter < len(compatibility) and compatibility[self._deck_filter] != None:
+            masks = [compatibility[self._deck_filter]]
+        else:
+            masks = []
+        if not masks:
+            # no deck to be compatible with
+            return None
+        if len(masks) == 1:
+            return masks[0]
+        return bytes([all(flags) for flags in zip(*masks)])
+
+    def _update_suggestions(self):
+        """
+            Ranks the library (with the text filters, not the bpm and key filters)
+            against the master deck and keeps the best SUGGESTION_COUNT. The bpm part
+            of the penalty grows with the bpm offset, so only the tracks within the
+            offset the worst of them has can make it: this starts with the tracks
+            within SUGGESTION_FIRST_BPM_OFFSET and widens to that offset if it has to.
+        """
+        self._suggestions = []
+        if not self._suggest or self._master_deck == None:
+            return
+        base = self._update_suggestion_base()
+        tempo = self._bpm
+        playing = set(id(deck) for deck in self._decks if deck != None)
+        current = self._current
+        bpm_column = self._bpm_column
+        text_filter = self._filter_artist != "" or self._filter_title != "" or self._filter_genre != ""
+        max_offset = SUGGESTION_FIRST_BPM_OFFSET
+        while True:
+            candidates = self._bpm_candidates(tempo, max_offset)
+            best = heapq.nsmallest(SUGGESTION_COUNT, (
+                (base[i] + bpm_penalty(bpm_column[i], tempo), i) for i in candidates
+                if id(current[i]) not in playing and (not text_filter or self._filter_text(current[i]))))
+            # the tracks left out are more than max_offset off, their penalty is higher
+            worst = best[-1][0] if len(best) == SUGGESTION_COUNT else float('inf')
+            if worst <= max_offset * SUGGESTION_BPM_PENALTY_PER_PERCENT or max_offset == float('inf'):
+                break
+            max_offset = worst / SUGGESTION_BPM_PENALTY_PER_PERCENT
+        self._suggestions = [current[i] for _, i in best]
+
+    def _bpm_candidates(self, tempo, max_offset):
+        """
+            Library indices of the tracks at most max_offset percent off tempo at the
+            same, half or double time, with the unknown bpms if their penalty isn't
+            more than that.
+        """
+        fac = max_offset / 100.0
+        candidates = set()
+        for m in (1.0, 0.5, 2.0):
+            start = bisect.bisect_left(self._bpm_sorted, max(tempo * (1.0 - fac) / m, 0.0))
+            end = bisect.bisect_right(self._bpm_sorted, tempo * (1.0 + fac) / m)
+            candidates.update(self._bpm_order[start:end])
+        if SUGGESTION_BPM_UNKNOWN_PENALTY <= max_offset * SUGGESTION_BPM_PENALTY_PER_PERCENT:
+            candidates.update(self._bpm_order[:bisect.bisect_right(self._bpm_sorted, 0.0)])
+        return candidates
+
+    def _update_suggestion_base(self):
+        """the key and genre part of every track's suggestion penalty against the master deck"""
+        version = (self._library_version, self._deck_version)
+        if self._suggestion_base_version != version:
+            key_penalty = [SUGGESTION_KEY_PENALTY.get(d, SUGGESTION_KEY_CLASH_PENALTY)
+                           for d in KEY_DISTANCES[key_index(self._master_deck.open_key)]]
+            genre = self._master_deck.genre.lower()
+            self._suggestion_base = [key_penalty[key] + (SUGGESTION_GENRE_PENALTY if g != genre else 0.0)
+                                     for key, g in zip(self._key_column, self._genre_column)]
+            self._suggestion_base_version = version
+        return self._suggestion_base
 
     def _update(self):
+        self._durations_shown = False
+        self._next_duration_update = time.monotonic() + self.DURATION_UPDATE_INTERVAL
         d = {
             "sel_ix": self._current_index,
-            "cols": [
-                "Artist",
-                "Title",
-                "Genre",
-                "Duration",
-                "BPM",
-                "Key",
-                "KeyDistance"
-            ],
+            "cols": self.COLUMNS,
             "rows": [],
             "playing": {},
             "bpm_filter": self._filter_by_bpm,
             "bpm_percent": self._bpm_tolerance_percent,
-            "key_filter": self._filter_by_key
+            "key_filter": self._filter_by_key,
+            "deck_filter": self._deck_filter,
+            "suggest": self._suggest,
+            "suggestions": [self._row(item) for item in self._suggestions]
         }
 
         for item in self._filtered:
-            r = []
-            for k in d["cols"]:
-                r.append(getattr(item, k.lower()))
-            d["rows"].append(r)
+            d["rows"].append(self._row(item))
 
         d["master_deck"] = -1
         d["decks"] = []
@@ -334,16 +1044,65 @@ class BrowserRepresentation():
                     d["master_deck"] = deck_index
             deck_index = deck_index + 1
 
+        self._send(d)
+
+    def _row(self, item):
+        return [getattr(item, k) for k in self.ROW_ATTRIBUTES]
+
+    def _send_diff(self, d):
+        if self._pending != None or self._too_big or not self._ui.is_ready():
+            # the UI hasn't got the state this is based on, send all of it instead
+            self._update()
+            return
         try:
-            self._socket.sendto(json.dumps(d, indent=1).encode('utf-8'), self.SOCKET_OUT)
-        except:
+            self._socket.sendto(json.dumps(d).encode('utf-8'), self.SOCKET_OUT)
+        except OSError:
+            self._update()
+
+    def _send(self, d):
+        # every message carries the full state, so only the latest one needs to be kept
+        self._pending = d
+        if not self._ui.is_ready():
+            return
+        data = json.dumps(d, indent=1).encode('utf-8')
+        try:
+            self._socket.sendto(data, self.SOCKET_OUT)
+            self._pending = None
+            self._too_big = False
+        except BlockingIOError:
             pass
+        except OSError as e:
+            if e.errno != errno.EMSGSIZE:
+                self._ui.lost()
+                return
+            # the UI is there, sending this again won't help. Wait for the next state
+            if not self._too_big:
+                self._log("UI state of %d bytes doesn't fit in a datagram, not sending it" % len(data))
+            self._pending = None
+            self._too_big = True
+
+    def _deck_file(self, filename):
+        key = normalise_path(filename)
+        item = self._items_by_path.get(key)
+        if item != None:
+            return item
+
+        # not in the library, only parse it if we haven't seen it recently
+        item = self._outside_files.pop(key, None)
+        if item == None:
+            item = TaggedFile(filename)
+        self._outside_files[key] = item
+        if len(self._outside_files) > self.OUTSIDE_FILE_CACHE_SIZE:
+            self._outside_files.popitem(last=False)
+        return item
 
     def set_decks(self, decks, master_deck_index):
+        self._deck_files = (decks, master_deck_index)
         d = []
         for f in decks:
-            d.append(TaggedFile(f) if f != None else None)
+            d.append(self._deck_file(f) if f != None else None)
         self._decks = d
+        self._deck_version += 1
         try:
             self._master_deck = self._decks[master_deck_index]
         except:
@@ -356,23 +1115,41 @@ class BrowserRepresentation():
 
         self._update_key_distance()
         self._apply_filter()
+        self._update_suggestions()
         self._update()
 
     def _start_ui(self):
-        pwd = pathlib.Path(__file__).parent.resolve()
-        os.system("'%s/build/LiveMusicBrowser' > /tmp/LiveMusicBrowser.log &" % pwd)
-        timeout = 10
-        while (timeout > 0 and not os.path.exists(self.SOCKET_OUT)):
-            time.sleep(0.1)
-            timeout = timeout - 1
-    
+        # XONEK2_UI can point to another UI binary, or be "external" to not start the
+        # UI at all and wait for one started separately, e.g. in a debugger
+        ui = os.environ.get("XONEK2_UI") or str(pathlib.Path(__file__).parent.resolve() / "build" / "LiveMusicBrowser")
+        self._ui = UiProcess(None if ui == "external" else [ui], self._log, self._ping_ui)
+        self._ui.start()
+
+    def _ping_ui(self):
+        try:
+            self._socket.sendto(json.dumps({"ping": True}).encode('utf-8'), self.SOCKET_OUT)
+        except OSError:
+            # not listening yet
+            pass
+
     def poll(self):
+        self._ui.poll()
+        self._apply_library_scan()
+        if self._apply_exact_durations():
+            self._update()
+        elif self._pending != None:
+            self._send(self._pending)
+
         ready = select.select([self._socket], [], [], 0)
         if ready[0]:
             data = self._socket.recv(4096)
-            self._log("Received: %s" % data)
+            logger.debug("Received: %s", data)
             data = json.loads(data)
             filter_changed = False
+            if "ready" in data:
+                # (re)started UI, send it everything
+                self._ui.set_ready()
+                self._update()
             if "bpm_filter" in data:
                 filter_changed = filter_changed or self._filter_by_bpm != data["bpm_filter"]
                 self._filter_by_bpm = data["bpm_filter"]
@@ -390,6 +1167,19 @@ class BrowserRepresentation():
                 self.set_current_index(data["load_ix"])
                 self.load()
                 self._update()
+            elif "deck_filter" in data:
+                filter_changed = filter_changed or self._deck_filter != data["deck_filter"]
+                self._deck_filter = data["deck_filter"]
+            elif "suggest" in data:
+                self._suggest = data["suggest"]
+                self._update_suggestions()
+                self._update()
+            elif "preview_suggestion" in data:
+                if 0 <= data["preview_suggestion"] < len(self._suggestions):
+                    self._browser_action(self._browser.preview_item, self._suggestions[data["preview_suggestion"]])
+            elif "load_suggestion" in data:
+                if 0 <= data["load_suggestion"] < len(self._suggestions):
+                    self._browser_action(self._browser.load_item, self._suggestions[data["load_suggestion"]])
             elif "filter_artist" in data:
                 self._filter_artist = data["filter_artist"].lower()
                 filter_changed = filter_changed or True
@@ -402,10 +1192,14 @@ class BrowserRepresentation():
 
             if filter_changed:
                 self._apply_filter()
+                self._update_suggestions()
                 self._update()
 
 
     def _quit_ui(self):
+        if self._ui == None:
+            return
+        self._ui.stop()
         try:
             self._socket.sendto(json.dumps({"quit": True}).encode('utf-8'), self.SOCKET_OUT)
         except:
@@ -415,4 +1209,6 @@ class BrowserRepresentation():
         self._quit_ui()
 
     def disconnect(self):
-        self._quit_ui()
\ No newline at end of file
+        self._log("filter cache: %s" % self._filter_cache.stats())
+        self._duration_scanner.stop()
+        self._quit_ui()
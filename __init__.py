@@ -1,8 +1,24 @@
 from importlib import reload
 import XoneK2_DJ.xone
 import XoneK2_DJ.Browser
+import XoneK2_DJ.diagnostics
+import XoneK2_DJ.dispatcher
+import XoneK2_DJ.latency
+import XoneK2_DJ.library
+import XoneK2_DJ.logger
+import XoneK2_DJ.profiling
+# not reloaded, it keeps data across sets
+import XoneK2_DJ.store
+import XoneK2_DJ.trace
 
 def create_instance(c_instance):
+    reload(diagnostics)
+    reload(logger)
+    reload(dispatcher)
+    reload(latency)
+    reload(profiling)
+    reload(trace)
+    reload(library)
     reload(xone)
     reload(Browser)
     return xone.XoneK2_DJ(c_instance)
@@ -0,0 +1,256 @@
+"""
+    Benchmark for BrowserRepresentation against synthetic libraries.
+
+    For every library size this reports wall time (median of repeated runs) and
+    peak Python memory (tracemalloc, in a separate run) of:
+
+        scan_cold     building the representation, i.e. finding the files of the
+                      library and reading the tags of every one of them
+        scan          the same with an up to date library manifest
+        reload        the same with the library kept in the store from the last
+                      time, as when another set is loaded (checking the library
+                      for changes runs in the background and isn't included)
+        filter_tempo  _apply_filter after a tempo change
+        tempo_step    tempo(), which only moves the bpm window and sends a diff
+        filter_key    _apply_filter after toggling the key filter
+        filter_text   _apply_filter with an artist filter
+        filter_cached toggling the key filter with both results in the filter cache
+        set_decks     set_decks() with two playing library files
+        key_distance  _update_key_distance() after that
+        deck_compatibility  compatibility of the library with every deck
+        filter_deck   _apply_filter with the "compatible with deck 1" filter
+        suggest       ranking the library for "suggest next track" after that
+        update        building the UI payload in _update(), plus its size and the
+                      time to encode it as JSON, with the bpm and key filters on
+        update_all    the same with every item of the library shown
+
+    The libraries are generated once into --library-dir and reused. Usage, from the
+    repository root:
+
+        python -m benchmarks.browser_bench -o baseline.json
+        ... change things ...
+        python -m benchmarks.browser_bench -b baseline.json
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from benchmarks import common
+
+sys.path.insert(0, common.repo_root())
+from headless import harness  # noqa: E402
+
+LIBRARY_VERSION = 1
+
+
+def library(directory, size, seed):
+    """generates (or reuses) a library of size files below directory, which is used as HOME"""
+    stamp = os.path.join(directory, ".library")
+    params = "%d %d %d" % (LIBRARY_VERSION, size, seed)
+    if not (os.path.exists(stamp) and open(stamp).read() == params):
+        print("generating library of %d files in %s" % (size, directory))
+        harness.make_library(directory, size, seed, seconds=0.05)
+        with open(stamp, 'w') as f:
+            f.write(params)
+    return directory
+
+
+def measure(fn, setup=None, min_time=0.5, max_runs=50):
+    """median wall time of fn() over runs, each preceded by setup() (not timed)"""
+    times = []
+    total = time.perf_counter()
+    while len(times) < 3 or (time.perf_counter() - total < min_time and len(times) < max_runs):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return statistics.median(times)
+
+
+def peak_memory(fn, setup=None):
+    """peak memory allocated by Python objects while running fn(), in MB"""
+    if setup is not None:
+        setup()
+    tracemalloc.start()
+    try:
+        fn()
+        return tracemalloc.get_traced_memory()[1] / 1e6
+    finally:
+        tracemalloc.stop()
+
+
+class Bench(object):
+    def __init__(self, home, min_time):
+        import Live
+        self._browser = Live.Browser(harness.browser_tree(home))
+        self._min_time = min_time
+        self.br = None
+        self.module = sys.modules[harness.PACKAGE + ".Browser"]
+
+    def scan(self):
+        self.br = self.module.BrowserRepresentation(self._browser, lambda msg: None)
+        # the exact duration scan runs in the background, it would skew everything else
+        self.br._duration_scanner.stop()
+
+    def settle(self):
+        """waits for the background scan of a reload and takes over its result"""
+        if self.br._library_scan is not None:
+            self.br._library_scan.join()
+            self.br._apply_library_scan()
+
+    def close(self):
+        if self.br is not None:
+            self.settle()
+            self.br.disconnect()
+            self.br._socket.close()
+            self.br = None
+
+    def case(self, fn, setup=None, memory=True):
+        r = {"wall_s": measure(fn, setup, self._min_time)}
+        if memory:
+            r["peak_mb"] = peak_memory(fn, setup)
+        return r
+
+    def run(self):
+        results = {}
+        manifest = os.path.expanduser(sys.modules[harness.PACKAGE + ".library"].MANIFEST_FILE)
+        store = sys.modules[harness.PACKAGE + ".store"]
+
+        def fresh_process():
+            self.close()
+            store.remove("library")
+
+        def remove_manifest():
+            fresh_process()
+            if os.path.exists(manifest):
+                os.remove(manifest)
+        results["scan_cold"] = {"wall_s": measure(self.scan, remove_manifest, min_time=0, max_runs=3),
+                                "peak_mb": peak_memory(self.scan, remove_manifest)}
+        results["scan"] = {"wall_s": measure(self.scan, fresh_process, min_time=0, max_runs=3),
+                           "peak_mb": peak_memory(self.scan, fresh_process)}
+        results["reload"] = {"wall_s": measure(self.scan, self.close, min_time=0, max_runs=3),
+                             "peak_mb": peak_memory(self.scan, self.close)}
+        self.settle()
+        br = self.br
+        items = br._current
+        tempos = iter(range(10 ** 9))
+
+        # these measure filtering the library, not looking up a cached result
+        def tempo_change():
+            br._filter_cache.clear()
+            br._bpm = 100.0 + next(tempos) % 40
+        results["filter_tempo"] = self.case(br._apply_filter, tempo_change)
+
+        # the incremental path sends its diffs to a UI that is ready, with nothing
+        # pending, otherwise it falls back to a full update. The UI starts from the
+        # current rows, a full update of a big library doesn't fit in a datagram.
+        ui = harness.FakeUi()
+        ui.data = {"rows": [br._row(item) for item in br._filtered]}
+        br._ui.set_ready()
+        br._pending = None
+
+        def tempo_step():
+            br.tempo(100.0 + (next(tempos) % 4000) * 0.01)
+        results["tempo_step"] = self.case(tempo_step, ui.drain)
+        results["tempo_step"]["full_updates"] = ui.full_updates
+        br._ui.lost()
+        ui.close()
+
+        def toggle_key_filter():
+            br._filter_cache.clear()
+            br._filter_by_key = not br._filter_by_key
+        results["filter_key"] = self.case(br._apply_filter, toggle_key_filter)
+
+        def toggle_key_filter_cached():
+            br._filter_by_key = not br._filter_by_key
+        results["filter_cached"] = self.case(br._apply_filter, toggle_key_filter_cached)
+        br._filter_by_key = True
+
+        def artist_filter():
+            br._filter_cache.clear()
+            br._filter_artist = "artist 1"
+        results["filter_text"] = self.case(br._apply_filter, artist_filter)
+        br._filter_artist = ""
+        br._apply_filter()
+
+        decks = [items[0].filename, items[len(items) // 2].filename, None, None]
+        results["set_decks"] = self.case(lambda: br.set_decks(decks, 0))
+        results["key_distance"] = self.case(br._update_key_distance)
+
+        def new_deck_state():
+            br._deck_version += 1
+        results["deck_compatibility"] = self.case(br._deck_compatibility, new_deck_state)
+        br._deck_filter = 0
+        results["filter_deck"] = self.case(br._apply_filter, br._filter_cache.clear)
+        br._deck_filter = None
+        br._apply_filter()
+        br._suggest = True
+
+        def suggest_tempo():
+            br._bpm = 100.0 + (next(tempos) % 4000) * 0.01
+        results["suggest"] = self.case(br._update_suggestions, suggest_tempo)
+        results["suggest_new_decks"] = self.case(br._update_suggestions, new_deck_state)
+        br._suggest = False
+        br._suggestions = []
+
+        # the UI isn't there, so _update() only builds the payload and keeps it pending
+        results["update"] = self.case(br._update)
+        payload = br._pending
+        results["update"]["encode_s"] = measure(lambda: json.dumps(payload, indent=1).encode('utf-8'),
+                                                min_time=self._min_time)
+        results["update"]["payload_bytes"] = len(json.dumps(payload, indent=1).encode('utf-8'))
+        results["update"]["rows"] = len(payload["rows"])
+
+        # worst case, every item of the library is shown
+        br._filter_by_bpm = br._filter_by_key = False
+        br._apply_filter()
+        results["update_all"] = self.case(br._update)
+        payload = br._pending
+        results["update_all"]["encode_s"] = measure(lambda: json.dumps(payload, indent=1).encode('utf-8'),
+                                                    min_time=self._min_time)
+        results["update_all"]["payload_bytes"] = len(json.dumps(payload, indent=1).encode('utf-8'))
+        self.close()
+        return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="*", default=[1000, 10000, 100000],
+                        help="library sizes to benchmark")
+    parser.add_argument("--library-dir", default=os.path.join(tempfile.gettempdir(), "xonek2_bench_library"),
+                        help="directory for the generated libraries (reused if up to date)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--min-time", type=float, default=0.5,
+                        help="seconds to spend timing each case")
+    common.add_arguments(parser)
+    args = parser.parse_args(argv)
+
+    harness.load_package()
+    old_env = {name: os.environ.get(name) for name in ("HOME", "XONEK2_UI")}
+    os.environ["XONEK2_UI"] = "external"
+    results = {}
+    try:
+        for size in args.sizes:
+            home = library(os.path.join(args.library_dir, str(size)), size, args.seed)
+            os.environ["HOME"] = home
+            for name, r in sorted(Bench(home, args.min_time).run().items()):
+                case = "%s/%d" % (name, size)
+                print("%-22s %s" % (case, "  ".join("%s=%.4g" % kv for kv in sorted(r.items()))))
+                results[case] = r
+    finally:
+        for name, value in old_env.items():
+            if value is None:
+                os.environ.pop(name, None)
+            else:
+                os.environ[name] = value
+    return common.finish(args, results, benchmark="browser", seed=args.seed)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
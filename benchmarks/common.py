@@ -0,0 +1,91 @@
+"""
+    Helpers shared by the benchmark scripts: result files and baseline comparison.
+
+    Results are plain JSON: {"meta": {...}, "results": {case: {metric: value}}}.
+    Metrics listed in HIGHER_IS_BETTER regress when they go down, all others
+    (times, bytes, syscalls, ...) regress when they go up.
+"""
+import json
+import os
+import platform
+import sys
+import time
+
+HIGHER_IS_BETTER = {"files_per_sec", "events_per_sec"}
+
+
+def repo_root():
+    return os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def meta(**extra):
+    d = {
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+    }
+    d.update(extra)
+    return d
+
+
+def save_results(path, results, **meta_args):
+    with open(path, 'w') as f:
+        json.dump({"meta": meta(**meta_args), "results": results}, f, indent=1, sort_keys=True)
+
+
+def load_results(path):
+    with open(path) as f:
+        return json.load(f)["results"]
+
+
+def compare(results, baseline, threshold_percent):
+    """
+        Returns a list of (case, metric, baseline value, current value, change in percent,
+        is_regression) for all metrics present in both result sets
+    """
+    rows = []
+    for case in sorted(results):
+        if case not in baseline:
+            continue
+        for metric, value in sorted(results[case].items()):
+            base = baseline[case].get(metric)
+            if not isinstance(value, (int, float)) or not isinstance(base, (int, float)):
+                continue
+            if base == 0:
+                change = 0.0 if value == 0 else float('inf')
+            else:
+                change = (value - base) * 100.0 / abs(base)
+            if metric in HIGHER_IS_BETTER:
+                regression = change < -threshold_percent
+            else:
+                regression = change > threshold_percent
+            rows.append((case, metric, base, value, change, regression))
+    return rows
+
+
+def print_comparison(rows, out=sys.stdout):
+    for case, metric, base, value, change, regression in rows:
+        out.write("%-40s %-22s %12.4g -> %12.4g  %+7.1f%%%s\n" % (
+            case, metric, base, value, change, "  REGRESSION" if regression else ""))
+
+
+def finish(args, results, **meta_args):
+    """
+        Common tail of the benchmark scripts: write results and compare against a
+        baseline. Returns the exit code, which is 1 if there were regressions.
+    """
+    if args.output:
+        save_results(args.output, results, **meta_args)
+    if args.baseline:
+        rows = compare(results, load_results(args.baseline), args.threshold)
+        print_comparison(rows)
+        if any(row[-1] for row in rows):
+            return 1
+    return 0
+
+
+def add_arguments(parser):
+    parser.add_argument("--output", "-o", help="write results as JSON to this file, e.g. to use as baseline later")
+    parser.add_argument("--baseline", "-b", help="compare against results in this JSON file")
+    parser.add_argument("--threshold", type=float, default=10.0,
+                        help="changes beyond this many percent count as regression (default: 10)")
@@ -0,0 +1,364 @@
+"""
+    Generates a deterministic corpus of small synthetic audio files, covering
+    all the formats and tag flavours tinytag can parse. The files only contain
+    enough structure for the parsers, the audio data is random noise.
+"""
+import os
+import random
+import struct
+
+CORPUS_VERSION = 1
+
+TAGS = {
+    "title": "Synthetic Title",
+    "artist": "Synthetic Artist",
+    "album": "Synthetic Album",
+    "genre": "Techno",
+    "year": "2022",
+    "track": "3/12",
+    "bpm": "124",
+    "key": "8m",
+    "comment": "generated for benchmarking",
+}
+
+
+def _synchsafe(n):
+    return bytes([(n >> 21) & 0x7f, (n >> 14) & 0x7f, (n >> 7) & 0x7f, n & 0x7f])
+
+
+def _artwork(rnd, size=64 * 1024):
+    return b'\xff\xd8\xff\xe0' + rnd.randbytes(size - 4)
+
+
+# ---- ID3 / mp3 --------------------------------------------------------------
+
+ID3V22_FRAMES = {"title": b'TT2', "artist": b'TP1', "album": b'TAL', "genre": b'TCO',
+                 "year": b'TYE', "track": b'TRK', "comment": b'COM'}
+ID3V23_FRAMES = {"title": b'TIT2', "artist": b'TPE1', "album": b'TALB', "genre": b'TCON',
+                 "year": b'TYER', "track": b'TRCK', "bpm": b'TBPM', "key": b'TKEY',
+                 "comment": b'COMM'}
+
+# text encoding marker -> (codec, string terminator), utf-16 strings start with a BOM
+ID3_ENCODINGS = {0: ('latin1', b'\x00'), 1: ('utf-16', b'\x00\x00'), 3: ('utf-8', b'\x00')}
+
+
+def id3v2(version, tags=TAGS, artwork=None, padding=256, encoding=3):
+    codec, terminator = ID3_ENCODINGS[encoding]
+    marker = bytes([encoding])
+    frames = b''
+    names = ID3V22_FRAMES if version == 2 else ID3V23_FRAMES
+    for name, frame_id in names.items():
+        text = tags[name].encode(codec)
+        if name == "comment":  # language and an empty description first
+            data = marker + b'eng' + ''.encode(codec) + terminator + text
+        else:
+            data = marker + text
+        frames += _id3_frame(version, frame_id, data)
+    if artwork is not None:
+        if version == 2:
+            data = b'\x00JPG\x03cover\x00' + artwork
+            frames += _id3_frame(version, b'PIC', data)
+        else:
+            data = b'\x00image/jpeg\x00\x03cover\x00' + artwork
+            frames += _id3_frame(version, b'APIC', data)
+    frames += b'\x00' * padding
+    return b'ID3' + bytes([version, 0, 0]) + _synchsafe(len(frames)) + frames
+
+
+def _id3_frame(version, frame_id, data):
+    if version == 2:
+        return frame_id + len(data).to_bytes(3, 'big') + data
+    size = _synchsafe(len(data)) if version == 4 else struct.pack('>I', len(data))
+    return frame_id + size + b'\x00\x00' + data
+
+
+def id3v1(tags=TAGS):
+    def field(text, length):
+        return text.encode('latin1')[:length].ljust(length, b'\x00')
+    return (b'TAG' + field(tags["title"], 30) + field(tags["artist"], 30) +
+            field(tags["album"], 30) + field(tags["year"], 4) + field(tags["comment"], 28) +
+            b'\x00\x03' + bytes([18]))  # track 3, genre 'Techno'
+
+
+MP3_BITRATE_IDS = {32: 1, 64: 5, 96: 7, 128: 9, 160: 10, 192: 11, 256: 13, 320: 14}
+
+
+def mp3_frame(rnd, bitrate, body=b''):
+    # MPEG 1 Layer III, 44.1kHz, joint stereo, no padding
+    header = bytes([0xff, 0xfb, MP3_BITRATE_IDS[bitrate] << 4, 0x40])
+    length = 144000 * bitrate // 44100
+    return header + body + rnd.randbytes(length - 4 - len(body))
+
+
+def mp3_audio(rnd, kind, seconds):
+    frame_count = int(seconds * 44100 / 1152)
+    if kind == "cbr":
+        bitrates = [128] * frame_count
+    else:
+        bitrates = [rnd.choice((96, 128, 160, 192, 256, 320)) for _ in range(frame_count)]
+    frames = [mp3_frame(rnd, br) for br in bitrates]
+    stream = b''.join(frames)
+    if kind == "xing":
+        # Xing header sits 32 bytes into a MPEG 1 stereo frame: frames + bytes flags
+        xing = b'\x00' * 32 + b'Xing' + struct.pack('>iii', 3, frame_count, len(stream))
+        return mp3_frame(rnd, 128, xing) + stream
+    if kind == "vbri":
+        vbri = b'\x00' * 32 + b'VBRI' + struct.pack('>HHHII', 1, 0, 75, len(stream), frame_count)
+        return mp3_frame(rnd, 128, vbri) + stream
+    return stream
+
+
+# ---- AIFF / WAV -------------------------------------------------------------
+
+def _ieee_extended(value):
+    # 80 bit IEEE 754 extended precision, as used for the AIFF sample rate
+    exponent = 16383 + value.bit_length() - 1
+    mantissa = value << (64 - value.bit_length())
+    return struct.pack('>HQ', exponent, mantissa)
+
+
+def _iff_chunk(name, data, byteorder='big'):
+    size = len(data).to_bytes(4, byteorder)
+    return name + size + data + (b'\x00' if len(data) % 2 else b'')
+
+
+def aiff(rnd, seconds, tags=TAGS, artwork=None):
+    frames = int(seconds * 44100)
+    audio = rnd.randbytes(frames * 4)
+    comm = struct.pack('>hLh', 2, frames, 16) + _ieee_extended(44100)
+    chunks = (_iff_chunk(b'COMM', comm) + _iff_chunk(b'SSND', b'\x00' * 8 + audio) +
+              _iff_chunk(b'ID3 ', id3v2(3, tags, artwork)))
+    return b'FORM' + struct.pack('>I', len(chunks) + 4) + b'AIFF' + chunks
+
+
+def wav(rnd, seconds, tags=TAGS, artwork=None):
+    frames = int(seconds * 44100)
+    fmt = struct.pack('<HHIIHH', 1, 2, 44100, 44100 * 4, 4, 16)
+    info = b'INFO'
+    for field, name in ((b'INAM', "title"), (b'IART', "artist"), (b'IGNR', "genre")):
+        info += _iff_chunk(field, tags[name].encode('utf-8') + b'\x00', 'little')
+    chunks = (_iff_chunk(b'fmt ', fmt, 'little') + _iff_chunk(b'LIST', info, 'little') +
+              _iff_chunk(b'data', rnd.randbytes(frames * 4), 'little') +
+              _iff_chunk(b'id3 ', id3v2(3, tags, artwork), 'little'))
+    return b'RIFF' + struct.pack('<I', len(chunks) + 4) + b'WAVE' + chunks
+
+
+# ---- Vorbis comments: FLAC / Ogg --------------------------------------------
+
+def vorbis_comment(tags=TAGS):
+    vendor = b'tinytag benchmark corpus'
+    comments = [("TITLE", "title"), ("ARTIST", "artist"), ("ALBUM", "album"),
+                ("GENRE", "genre"), ("DATE", "year"), ("TRACKNUMBER", "track"),
+                ("BPM", "bpm"), ("INITIALKEY", "key"), ("DESCRIPTION", "comment")]
+    data = struct.pack('<I', len(vendor)) + vendor + struct.pack('<I', len(comments))
+    for key, name in comments:
+        entry = ("%s=%s" % (key, tags[name])).encode('utf-8')
+        data += struct.pack('<I', len(entry)) + entry
+    return data
+
+
+def _flac_block(block_type, data, last=False):
+    return bytes([block_type | (0x80 if last else 0)]) + len(data).to_bytes(3, 'big') + data
+
+
+def flac(rnd, seconds, tags=TAGS, artwork=None):
+    samplerate = 44100
+    total = int(seconds * samplerate)
+    packed = (samplerate << 44) | (1 << 41) | (15 << 36) | total  # stereo, 16 bits
+    streaminfo = (struct.pack('>HH', 4096, 4096) + b'\x00\x00\x10' + b'\x00\x40\x00' +
+                  packed.to_bytes(8, 'big') + rnd.randbytes(16))
+    blocks = _flac_block(0, streaminfo) + _flac_block(4, vorbis_comment(tags))
+    if artwork is not None:
+        mime = b'image/jpeg'
+        picture = (struct.pack('>II', 3, len(mime)) + mime + struct.pack('>I', 0) +
+                   struct.pack('>5I', 500, 500, 24, 0, len(artwork)) + artwork)
+        blocks += _flac_block(6, picture)
+    blocks += _flac_block(1, b'\x00' * 4096, last=True)
+    # roughly the size of a FLAC stream with 60% compression
+    return b'fLaC' + blocks + rnd.randbytes(total * 4 * 6 // 10)
+
+
+def _ogg_page(packets, granule, sequence, flags=0):
+    segments = []
+    body = b''
+    for packet in packets:
+        n = len(packet)
+        while n >= 255:
+            segments.append(255)
+            n -= 255
+        segments.append(n)
+        body += packet
+    header = struct.pack('<4sBBqIIiB', b'OggS', 0, flags, granule, 0x1234, sequence, 0,
+                         len(segments))
+    return header + bytes(segments) + body
+
+
+def _ogg_stream(rnd, header_packets, samplerate, seconds, bytes_per_second):
+    pages = [_ogg_page([header_packets[0]], 0, 0, flags=2)]
+    pages.append(_ogg_page(header_packets[1:], 0, 1))
+    samples_per_page = samplerate // 2
+    total = int(seconds * samplerate)
+    granule = 0
+    sequence = 2
+    while granule < total:
+        granule = min(granule + samples_per_page, total)
+        # 16 packets of up to 254 bytes, so no packet spans pages
+        packet_size = min(bytes_per_second // 2 // 16, 254)
+        packets = [rnd.randbytes(packet_size) for _ in range(16)]
+        pages.append(_ogg_page(packets, granule, sequence, flags=4 if granule == total else 0))
+        sequence += 1
+    return b''.join(pages)
+
+
+def ogg_vorbis(rnd, seconds, tags=TAGS, artwork=None):
+    ident = b'\x01vorbis' + struct.pack('<IBIiiiBB', 0, 2, 44100, 0, 128000, 0, 0xb8, 1)
+    comment = b'\x03vorbis' + vorbis_comment(tags) + b'\x01'
+    return _ogg_stream(rnd, [ident, comment], 44100, seconds, 16000)
+
+
+def ogg_opus(rnd, seconds, tags=TAGS, artwork=None):
+    head = b'OpusHead' + struct.pack('<BBHIhB', 1, 2, 312, 44100, 0, 0)
+    comment = b'OpusTags' + vorbis_comment(tags)
+    return _ogg_stream(rnd, [head, comment], 48000, seconds, 16000)
+
+
+# ---- MP4 ---------------------------------------------------------------------
+
+def _atom(name, data):
+    return struct.pack('>I', len(data) + 8) + name + data
+
+
+def _data_atom(data_type, payload):
+    return _atom(b'data', struct.pack('>II', data_type, 0) + payload)
+
+
+def m4a(rnd, seconds, tags=TAGS, artwork=None):
+    timescale = 44100
+    mvhd = _atom(b'mvhd', struct.pack('>B3xIIII', 0, 0, 0, timescale, int(seconds * timescale)) +
+                 b'\x00' * 80)
+    descriptor = lambda tag, data: bytes([tag, 0x80, 0x80, 0x80, len(data)]) + data
+    decoder_config = descriptor(0x04, struct.pack('>BB3sII', 0x40, 0x15, b'\x00\x00\x00',
+                                                  128000, 128000))
+    es = descriptor(0x03, struct.pack('>HB', 0, 0) + decoder_config)
+    esds = _atom(b'esds', b'\x00\x00\x00\x00' + es)
+    mp4a = _atom(b'mp4a', b'\x00' * 6 + struct.pack('>H', 1) + b'\x00' * 8 +
+                 struct.pack('>HHHHI', 2, 16, 0, 0, 44100 << 16) + esds)
+    stsd = _atom(b'stsd', struct.pack('>II', 0, 1) + mp4a)
+    trak = _atom(b'trak', _atom(b'mdia', _atom(b'minf', _atom(b'stbl', stsd))))
+    track, total = tags["track"].split('/')
+    items = (_atom(b'\xa9nam', _data_atom(1, tags["title"].encode('utf-8'))) +
+             _atom(b'\xa9ART', _data_atom(1, tags["artist"].encode('utf-8'))) +
+             _atom(b'\xa9alb', _data_atom(1, tags["album"].encode('utf-8'))) +
+             _atom(b'\xa9gen', _data_atom(1, tags["genre"].encode('utf-8'))) +
+             _atom(b'\xa9day', _data_atom(1, tags["year"].encode('utf-8'))) +
+             _atom(b'trkn', _data_atom(0, struct.pack('>HHHH', 0, int(track), int(total), 0))))
+    if artwork is not None:
+        items += _atom(b'covr', _data_atom(13, artwork))
+    meta = _atom(b'meta', b'\x00\x00\x00\x00' + _atom(b'hdlr', b'\x00' * 25) + _atom(b'ilst', items))
+    moov = _atom(b'moov', mvhd + trak + _atom(b'udta', meta))
+    ftyp = _atom(b'ftyp', b'M4A \x00\x00\x00\x00M4A mp42isom')
+    return ftyp + moov + _atom(b'mdat', rnd.randbytes(int(seconds * 16000)))
+
+
+# ---- WMA / ASF ---------------------------------------------------------------
+
+ASF_HEADER = b'0&\xb2u\x8ef\xcf\x11\xa6\xd9\x00\xaa\x00b\xcel'
+ASF_CONTENT_DESCRIPTION = b'3&\xb2u\x8ef\xcf\x11\xa6\xd9\x00\xaa\x00b\xcel'
+ASF_EXTENDED_CONTENT_DESCRIPTION = b'@\xa4\xd0\xd2\x07\xe3\xd2\x11\x97\xf0\x00\xa0\xc9^\xa8P'
+ASF_FILE_PROPERTIES = b'\xa1\xdc\xab\x8cG\xa9\xcf\x11\x8e\xe4\x00\xc0\x0c Se'
+ASF_STREAM_PROPERTIES = b'\x91\x07\xdc\xb7\xb7\xa9\xcf\x11\x8e\xe6\x00\xc0\x0c Se'
+ASF_AUDIO_MEDIA = b'@\x9ei\xf8M[\xcf\x11\xa8\xfd\x00\x80_\\D+'
+ASF_DATA = b'6&\xb2u\x8ef\xcf\x11\xa6\xd9\x00\xaa\x00b\xcel'
+
+
+def _asf_object(guid, data):
+    return guid + struct.pack('<Q', len(data) + 24) + data
+
+
+def _utf16(text):
+    return (text + '\x00').encode('utf-16-le')
+
+
+def wma(rnd, seconds, tags=TAGS, artwork=None):
+    title, artist, comment = _utf16(tags["title"]), _utf16(tags["artist"]), _utf16(tags["comment"])
+    content = (struct.pack('<5H', len(title), len(artist), 0, len(comment), 0) +
+               title + artist + comment)
+    descriptors = [("WM/AlbumTitle", tags["album"]), ("WM/Genre", tags["genre"]),
+                   ("WM/Year", tags["year"]), ("WM/TrackNumber", tags["track"].split('/')[0])]
+    extended = struct.pack('<H', len(descriptors))
+    for name, value in descriptors:
+        name, value = _utf16(name), _utf16(value)
+        extended += struct.pack('<H', len(name)) + name + struct.pack('<HH', 0, len(value)) + value
+    preroll = 3000
+    file_properties = (rnd.randbytes(16) + struct.pack('<QQQQQQ', 0, 0, 100,
+                                                       int((seconds * 1000 + preroll) * 10000),
+                                                       int(seconds * 10000000), preroll) +
+                       struct.pack('<IIII', 2, 3200, 3200, 128000))
+    waveformat = struct.pack('<HHIIHHH', 0x161, 2, 44100, 16000, 2972, 16, 0)
+    stream_properties = (ASF_AUDIO_MEDIA + b'\x00' * 16 + struct.pack('<QIIH', 0, len(waveformat), 0, 1) +
+                         b'\x00' * 4 + waveformat)
+    objects = (_asf_object(ASF_FILE_PROPERTIES, file_properties) +
+               _asf_object(ASF_STREAM_PROPERTIES, stream_properties) +
+               _asf_object(ASF_CONTENT_DESCRIPTION, content) +
+               _asf_object(ASF_EXTENDED_CONTENT_DESCRIPTION, extended))
+    header = ASF_HEADER + struct.pack('<QI', len(objects) + 30, 4) + b'\x01\x02' + objects
+    return header + _asf_object(ASF_DATA, rnd.randbytes(int(seconds * 16000)))
+
+
+# ---- the corpus ---------------------------------------------------------------
+
+def _mp3(id3_version, kind, with_artwork):
+    def generate(rnd, seconds):
+        tag = id3v2(id3_version, artwork=_artwork(rnd) if with_artwork else None)
+        return tag + mp3_audio(rnd, kind, seconds) + id3v1()
+    return generate
+
+
+def _with_artwork(generator):
+    return lambda rnd, seconds: generator(rnd, seconds, artwork=_artwork(rnd))
+
+
+def _plain(generator):
+    return lambda rnd, seconds: generator(rnd, seconds)
+
+
+# name -> (file extension, generator(rnd, seconds))
+VARIANTS = {}
+for _version in (2, 3, 4):
+    for _art in (False, True):
+        _name = "mp3-id3v2.%d%s-cbr" % (_version, "-art" if _art else "")
+        VARIANTS[_name] = (".mp3", _mp3(_version, "cbr", _art))
+for _kind in ("vbr", "xing", "vbri"):
+    VARIANTS["mp3-id3v2.3-" + _kind] = (".mp3", _mp3(3, _kind, False))
+for _name, _ext, _generator in (("aiff-id3", ".aiff", aiff), ("wav", ".wav", wav),
+                                ("flac", ".flac", flac), ("ogg-vorbis", ".ogg", ogg_vorbis),
+                                ("ogg-opus", ".opus", ogg_opus), ("m4a", ".m4a", m4a),
+                                ("wma", ".wma", wma)):
+    VARIANTS[_name] = (_ext, _plain(_generator))
+for _name, _ext, _generator in (("aiff-id3-art", ".aiff", aiff), ("flac-art", ".flac", flac),
+                                ("m4a-art", ".m4a", m4a)):
+    VARIANTS[_name] = (_ext, _with_artwork(_generator))
+
+
+def generate(directory, seconds=30.0, seed=0, variants=None):
+    """
+        Writes one file per variant into directory and returns {variant: path}.
+        Files that already exist from a run with the same parameters are reused.
+    """
+    os.makedirs(directory, exist_ok=True)
+    stamp = os.path.join(directory, ".corpus")
+    params = "%d %r %d" % (CORPUS_VERSION, seconds, seed)
+    reuse = os.path.exists(stamp) and open(stamp).read() == params
+    files = {}
+    for name in sorted(variants or VARIANTS):
+        ext, generator = VARIANTS[name]
+        path = os.path.join(directory, name + ext)
+        if not (reuse and os.path.exists(path)):
+            # seed per variant, so the files don't depend on which variants are generated
+            rnd = random.Random("%d-%s" % (seed, name))
+            with open(path, 'wb') as f:
+                f.write(generator(rnd, seconds))
+        files[name] = path
+    with open(stamp, 'w') as f:
+        f.write(params)
+    return files
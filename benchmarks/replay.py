@@ -0,0 +1,217 @@
+"""
+    Replays recorded K2 MIDI traces (see trace.py) into the script running
+    headless, to benchmark a whole set in seconds and compare builds.
+
+    The set is synthetic: every track has clips from a generated library in its
+    first scenes, and fired clips start playing on the next tick. Ticks happen
+    every TICK_INTERVAL seconds of trace time, like Live calls update_display().
+    At maximum speed (the default) nothing waits between events, with --realtime
+    the trace is played back at the speed it was recorded.
+
+    For every trace this reports the time spent handling each event and each tick,
+    the replay throughput and what went to the UI (messages, full state updates,
+    row diffs, bytes) and to the controller. Usage, from the repository root:
+
+        python -m benchmarks.replay --synthesize 120 /tmp/set.trace -o baseline.json
+        python -m benchmarks.replay ~/k2-traces/*.trace -b baseline.json
+
+    --synthesize writes a generated set of that many minutes to the (single)
+    trace file first, for when there is no recording at hand.
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+
+from benchmarks import common
+
+sys.path.insert(0, common.repo_root())
+from headless import harness  # noqa: E402
+
+TICK_INTERVAL = 0.1
+STATUS_NOTE_ON = 0x90
+STATUS_NOTE_OFF = 0x80
+STATUS_CC = 0xB0
+
+
+def synthetic_set(minutes, seed=0):
+    """
+        Events of a plausible set: a transition between two decks every few minutes
+        (browse, pick a scene, launch, ride tempo, fade the EQs and faders over)
+        and some knob twiddling in between
+    """
+    from XoneK2_DJ import xone
+    rnd = random.Random(seed)
+    channel = xone.CHANNEL
+    events = []
+    t = 0.0
+
+    def add(status, number, value, dt=0.0):
+        nonlocal t
+        t += dt
+        events.append((t, (status + channel, number, value)))
+
+    def press(note, hold=0.15):
+        add(STATUS_NOTE_ON, note, 127, rnd.uniform(0.3, 1.0))
+        add(STATUS_NOTE_OFF, note, 0, hold)
+
+    def sweep(cc, start, end, seconds):
+        steps = abs(end - start)
+        for i in range(1, steps + 1):
+            add(STATUS_CC, cc, start + (i if end > start else -i), seconds / steps)
+
+    def turn(cc, clicks, interval=0.05):
+        for _ in range(abs(clicks)):
+            add(STATUS_CC, cc, 1 if clicks > 0 else 127, interval)
+
+    deck, end = 0, minutes * 60.0
+    while t < end:
+        next_deck = (deck + 1) % len(xone.FADERS)
+        # browse for the next track on the shift layer of the right encoder, and back
+        press(xone.BUTTON_LL)
+        press(xone.BUTTON_LL)
+        turn(xone.ENCODER_LR, rnd.randint(-40, 40))
+        press(xone.BUTTON_LL)
+        press(xone.BUTTON_LL)
+        # pick a scene and launch it on the next deck
+        turn(xone.ENCODER_LR, rnd.choice([-1, 1]), 0.3)
+        press(xone.GRID[0][next_deck])
+        # match the tempo, blend in with the EQs, swap the lows, fade over
+        turn(xone.ENCODER_LL, rnd.randint(-20, 20))
+        sweep(xone.KNOBS1[next_deck], 0, 64, 4.0)
+        sweep(xone.FADERS[next_deck], 0, 127, 16.0)
+        sweep(xone.KNOBS3[deck], 64, 0, 2.0)
+        sweep(xone.KNOBS3[next_deck], 0, 64, 2.0)
+        sweep(xone.FADERS[deck], 127, 0, 12.0)
+        press(xone.GRID[1][deck])
+        deck = next_deck
+        # let it play, with the odd tweak
+        until = t + rnd.uniform(120.0, 300.0)
+        while t < until:
+            knob = rnd.choice(xone.KNOBS1 + xone.KNOBS2)
+            value = rnd.randint(40, 88)
+            sweep(knob, 64, value, rnd.uniform(0.5, 2.0))
+            sweep(knob, value, 64, rnd.uniform(0.5, 2.0))
+            t += rnd.uniform(5.0, 30.0)
+    return [event for event in events if event[0] < end]
+
+
+def write_trace(path, events):
+    from XoneK2_DJ import trace
+    writer = trace.TraceWriter(path)
+    for seconds, midi_bytes in events:
+        writer.add(int(seconds * 1e6), midi_bytes)
+    writer.close()
+
+
+def percentiles(values):
+    values = sorted(values)
+    if not values:
+        return 0.0, 0.0, 0.0
+
+    def at(percent):
+        return values[min(len(values) - 1, int(len(values) * percent / 100.0))]
+    return at(50), at(99), values[-1]
+
+
+def replay(h, events, realtime=False):
+    event_times = []
+    tick_times = []
+
+    def tick():
+        start = time.perf_counter()
+        h.tick()
+        h.launch_triggered()
+        tick_times.append(time.perf_counter() - start)
+
+    h.ui.reset_stats()
+    del h.sent_midi[:]
+    next_tick = TICK_INTERVAL
+    started = time.perf_counter()
+    for seconds, midi_bytes in events:
+        while next_tick <= seconds:
+            tick()
+            next_tick += TICK_INTERVAL
+        if realtime:
+            delay = started + seconds - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+        start = time.perf_counter()
+        h.midi(midi_bytes)
+        event_times.append(time.perf_counter() - start)
+    # let the last deferred writes and updates go out
+    for _ in range(5):
+        tick()
+    wall = time.perf_counter() - started
+
+    event_p50, event_p99, event_max = percentiles(event_times)
+    tick_p50, tick_p99, tick_max = percentiles(tick_times)
+    return {
+        "events": len(events),
+        "trace_s": events[-1][0] if events else 0.0,
+        "wall_s": wall,
+        "events_per_sec": len(events) / wall if wall > 0 else 0.0,
+        "event_us_mean": statistics.mean(event_times) * 1e6 if event_times else 0.0,
+        "event_us_p50": event_p50 * 1e6,
+        "event_us_p99": event_p99 * 1e6,
+        "event_us_max": event_max * 1e6,
+        "tick_us_mean": statistics.mean(tick_times) * 1e6,
+        "tick_us_p50": tick_p50 * 1e6,
+        "tick_us_p99": tick_p99 * 1e6,
+        "tick_us_max": tick_max * 1e6,
+        "ui_messages": h.ui.messages,
+        "ui_full_updates": h.ui.full_updates,
+        "ui_diffs": h.ui.diffs,
+        "ui_bytes": h.ui.bytes,
+        "midi_out": len(h.sent_midi),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("traces", nargs="+", help="trace files recorded with XONEK2_TRACE")
+    parser.add_argument("--realtime", action="store_true", help="replay at the recorded speed")
+    parser.add_argument("--synthesize", type=float, metavar="MINUTES",
+                        help="first write a synthetic set of this length to the trace file")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--tracks", type=int, default=4)
+    parser.add_argument("--scenes", type=int, default=16)
+    parser.add_argument("--library", type=int, default=500, help="number of files in the library")
+    common.add_arguments(parser)
+    args = parser.parse_args(argv)
+
+    harness.load_package()
+    from XoneK2_DJ import trace
+    if args.synthesize is not None:
+        if len(args.traces) != 1:
+            parser.error("--synthesize needs exactly one trace file")
+        write_trace(args.traces[0], synthetic_set(args.synthesize, args.seed))
+
+    results = {}
+    for path in args.traces:
+        _, events = trace.read(path)
+        with harness.Harness(args.tracks, args.scenes, args.library, args.seed) as h:
+            rnd = random.Random(args.seed)
+            for track in range(args.tracks):
+                for scene in range(args.scenes):
+                    h.load_clip(track, scene, rnd.choice(h.library))
+            h.play(0, 0)
+            h.tick()
+            r = replay(h, events, args.realtime)
+        case = os.path.splitext(os.path.basename(path))[0]
+        print("%s: %d events over %.0fs replayed in %.2fs (%.0f events/s)" % (
+            case, r["events"], r["trace_s"], r["wall_s"], r["events_per_sec"]))
+        print("  event us: mean %.1f p50 %.1f p99 %.1f max %.1f" % (
+            r["event_us_mean"], r["event_us_p50"], r["event_us_p99"], r["event_us_max"]))
+        print("  tick us:  mean %.1f p50 %.1f p99 %.1f max %.1f" % (
+            r["tick_us_mean"], r["tick_us_p50"], r["tick_us_p99"], r["tick_us_max"]))
+        print("  UI: %d messages (%d full updates, %d diffs), %d bytes; %d MIDI messages out" % (
+            r["ui_messages"], r["ui_full_updates"], r["ui_diffs"], r["ui_bytes"], r["midi_out"]))
+        results[case] = r
+    return common.finish(args, results, benchmark="replay", realtime=args.realtime)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
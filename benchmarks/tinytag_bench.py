@@ -0,0 +1,143 @@
+"""
+    Throughput benchmark for tinytag over the synthetic corpus.
+
+    For every corpus variant and option set this reports files/sec, and bytes
+    read and syscalls per file (counted on the raw file object, i.e. what hits
+    the OS rather than what the parsers ask the buffered reader for).
+
+    Usage, from the repository root:
+
+        python -m benchmarks.tinytag_bench -o baseline.json
+        ... change things ...
+        python -m benchmarks.tinytag_bench -b baseline.json
+"""
+import argparse
+import io
+import os
+import sys
+import tempfile
+import time
+import warnings
+from unittest import mock
+
+from benchmarks import common, corpus
+
+sys.path.insert(0, common.repo_root())
+warnings.simplefilter("ignore", DeprecationWarning)  # aifc/chunk on python 3.11+
+from tinytag import TinyTag  # noqa: E402
+
+OPTIONS = {
+    "tags": dict(tags=True, duration=False),
+    "duration": dict(tags=False, duration=True),
+    "image": dict(tags=True, duration=False, image=True),
+    "all": dict(tags=True, duration=True),
+    "exact_duration": dict(tags=False, duration=True, exact_duration=True),
+}
+
+
+class CountingFileIO(io.FileIO):
+    """raw file that counts the calls that end up as syscalls"""
+    def __init__(self, *args, **kwargs):
+        super(CountingFileIO, self).__init__(*args, **kwargs)
+        self.reads = 0
+        self.seeks = 0
+        self.bytes_read = 0
+
+    def readinto(self, b):
+        self.reads += 1
+        n = super(CountingFileIO, self).readinto(b)
+        self.bytes_read += n or 0
+        return n
+
+    def readall(self):
+        self.reads += 1
+        data = super(CountingFileIO, self).readall()
+        self.bytes_read += len(data)
+        return data
+
+    def read(self, size=-1):
+        self.reads += 1
+        data = super(CountingFileIO, self).read(size)
+        self.bytes_read += len(data or b'')
+        return data
+
+    def seek(self, pos, whence=0):
+        self.seeks += 1
+        return super(CountingFileIO, self).seek(pos, whence)
+
+    def tell(self):
+        self.seeks += 1  # lseek(fd, 0, SEEK_CUR)
+        return super(CountingFileIO, self).tell()
+
+
+def count_io(path, options):
+    opened = []
+
+    def counting_open(file, mode='r', *args, **kwargs):
+        raw = CountingFileIO(file, 'rb')
+        opened.append(raw)
+        return io.BufferedReader(raw)
+
+    with mock.patch.object(io, 'open', counting_open):
+        TinyTag.get(path, **options)
+    reads = sum(raw.reads for raw in opened)
+    seeks = sum(raw.seeks for raw in opened)
+    # plus stat (getsize), open and close per file
+    return {
+        "bytes_read": sum(raw.bytes_read for raw in opened),
+        "reads": reads,
+        "seeks": seeks,
+        "syscalls": reads + seeks + 3 * len(opened) + 1,
+    }
+
+
+def time_files(path, options, min_time):
+    count = 0
+    start = time.perf_counter()
+    elapsed = 0.0
+    while elapsed < min_time or count < 3:
+        TinyTag.get(path, **options)
+        count += 1
+        elapsed = time.perf_counter() - start
+    return count / elapsed
+
+
+def run(files, options, min_time):
+    results = {}
+    for name, path in sorted(files.items()):
+        for option in options:
+            case = "%s/%s" % (name, option)
+            try:
+                r = count_io(path, OPTIONS[option])
+                r["files_per_sec"] = time_files(path, OPTIONS[option], min_time)
+                r["file_size"] = os.path.getsize(path)
+            except Exception as e:
+                print("%-40s failed: %r" % (case, e))
+                continue
+            print("%-40s %10.1f files/s %10d bytes %5d syscalls" % (
+                case, r["files_per_sec"], r["bytes_read"], r["syscalls"]))
+            results[case] = r
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--corpus", default=os.path.join(tempfile.gettempdir(), "tinytag_corpus"),
+                        help="directory for the generated files (reused if up to date)")
+    parser.add_argument("--seconds", type=float, default=240.0, help="length of the generated files")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--variants", nargs="*", choices=sorted(corpus.VARIANTS),
+                        help="only benchmark these variants")
+    parser.add_argument("--options", nargs="*", choices=sorted(OPTIONS), default=sorted(OPTIONS))
+    parser.add_argument("--min-time", type=float, default=0.5,
+                        help="seconds to spend timing each case")
+    common.add_arguments(parser)
+    args = parser.parse_args(argv)
+
+    files = corpus.generate(args.corpus, args.seconds, args.seed, args.variants)
+    results = run(files, args.options, args.min_time)
+    return common.finish(args, results, benchmark="tinytag", seconds=args.seconds, seed=args.seed)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,47 @@
+"""
+    Common part of the diagnostics that are switched on with an environment
+    variable before starting Live: logger, latency, trace and profiling.
+
+    Each of these modules has a Switch holding the object that does the work while
+    the diagnostic is on. The module functions the script calls forward to it, and
+    return right away while it's off. Functions that wrap handlers or methods hand
+    them back unchanged then, so a diagnostic that is off costs nothing.
+
+    tick() ticks the diagnostics that are on, from a single task of the script.
+"""
+import os
+
+g_switches = []  # the switches that are on, in the order they were switched on
+
+
+class Switch():
+    def __init__(self, env_var):
+        self.env_var = env_var
+        self.active = None
+
+    def setting(self, setting=None):
+        """setting if it's given, the value of the environment variable otherwise"""
+        return setting if setting is not None else os.environ.get(self.env_var, "")
+
+    def switch_on(self, active):
+        """
+            Makes active the object the module forwards to, None leaves it off.
+            Returns active.
+        """
+        self.stop()
+        self.active = active
+        if active is not None:
+            g_switches.append(self)
+        return active
+
+    def stop(self):
+        if self.active is None:
+            return
+        g_switches.remove(self)
+        active, self.active = self.active, None
+        active.stop()
+
+
+def tick():
+    for switch in g_switches:
+        switch.active.tick()
@@ -0,0 +1,77 @@
+"""
+    Runs external commands like osascript on a worker thread, so they never block
+    Live's control surface thread.
+
+    Actions are queued with a key. An action with the same key as the last one
+    still waiting is merged into it by adding up the counts, e.g. five zoom-in
+    steps queued while the previous command runs become one command zooming in
+    five times. Actions with different keys keep their order.
+"""
+import subprocess
+import threading
+from collections import deque
+
+
+def run_command(argv):
+    """default runner, waits for the command to finish"""
+    subprocess.run(argv, stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL,
+                   stderr=subprocess.DEVNULL, timeout=10)
+
+
+class ActionDispatcher():
+    def __init__(self, log=None, runner=run_command):
+        """
+        log (function): called with a message when a command fails
+        runner (function): runner(argv) runs a command, replace it to
+            use stub commands
+        """
+        self._log = log
+        self._runner = runner
+        self._queue = deque()
+        self._lock = threading.Lock()
+        self._wakeup = threading.Condition(self._lock)
+        self._worker = None
+        self._stopped = False
+
+    def submit(self, key, build_command, count=1):
+        """
+        key: actions with the same key queued directly after each other are merged
+        build_command (function): build_command(count) returns the argv to run
+        count (int): how often to do the action
+        """
+        with self._lock:
+            if self._stopped:
+                return
+            if self._queue and self._queue[-1][0] == key:
+                self._queue[-1][2] += count
+            else:
+                self._queue.append([key, build_command, count])
+            if self._worker is None:
+                self._worker = threading.Thread(target=self._run, name="ActionDispatcher", daemon=True)
+                self._worker.start()
+            self._wakeup.notify()
+
+    def pending(self):
+        with self._lock:
+            return len(self._queue)
+
+    def stop(self):
+        """drops what is still queued, a command that is running is left to finish"""
+        with self._lock:
+            self._stopped = True
+            self._queue.clear()
+            self._wakeup.notify()
+
+    def _run(self):
+        while True:
+            with self._lock:
+                while not self._queue and not self._stopped:
+                    self._wakeup.wait()
+                if self._stopped:
+                    return
+                key, build_command, count = self._queue.popleft()
+            try:
+                self._runner(build_command(count))
+            except Exception as e:
+                if self._log is not None:
+                    self._log("action %s failed: %r" % (key, e))
@@ -0,0 +1,374 @@
+"""
+    Stand-in for the parts of Live's Python API used by this script: the song
+    with its tracks, clip slots, clips and devices, the application and its
+    browser. Objects are plain Python objects, properties with listeners notify
+    them on assignment like Live does.
+"""
+
+
+def _listenable(*names):
+    """
+        class decorator adding add_x_listener, remove_x_listener, x_has_listener
+        and notify_x for every name, like Live's API objects provide
+    """
+    def decorate(cls):
+        for name in names:
+            def add(self, callback, name=name):
+                self._listeners.setdefault(name, []).append(callback)
+
+            def remove(self, callback, name=name):
+                self._listeners.get(name, []).remove(callback)
+
+            def has(self, callback, name=name):
+                return callback in self._listeners.get(name, [])
+
+            def notify(self, name=name):
+                for callback in list(self._listeners.get(name, [])):
+                    callback()
+            setattr(cls, "add_%s_listener" % name, add)
+            setattr(cls, "remove_%s_listener" % name, remove)
+            setattr(cls, "%s_has_listener" % name, has)
+            setattr(cls, "notify_%s" % name, notify)
+        return cls
+    return decorate
+
+
+def _notifying_property(name):
+    attr = "_" + name
+
+    def fget(self):
+        return getattr(self, attr)
+
+    def fset(self, value):
+        changed = getattr(self, attr, None) != value
+        setattr(self, attr, value)
+        if changed:
+            getattr(self, "notify_" + name)()
+    return property(fget, fset)
+
+
+class LiveObject(object):
+    def __init__(self):
+        self._listeners = {}
+
+    def listener_count(self, name=None):
+        """listeners on all properties, or only on `name`"""
+        if name is not None:
+            return len(self._listeners.get(name, []))
+        return sum(len(callbacks) for callbacks in self._listeners.values())
+
+
+class MidiMap(object):
+    class MapMode(object):
+        absolute = 0
+        relative_signed_bit = 1
+        relative_two_compliment = 2
+
+
+class Base(object):
+    class Timer(object):
+        """never fires by itself, call fire() to simulate the timer expiring"""
+        def __init__(self, callback=None, interval=100, repeat=False):
+            self.callback = callback
+            self.interval = interval
+            self.repeat = repeat
+            self.running = False
+
+        def start(self):
+            self.running = True
+
+        def stop(self):
+            self.running = False
+
+        def fire(self):
+            if self.running:
+                self.callback()
+                self.running = self.repeat
+
+
+@_listenable("value")
+class DeviceParameter(LiveObject):
+    value = _notifying_property("value")
+
+    def __init__(self, name, value=0.0, min=0.0, max=1.0):
+        super(DeviceParameter, self).__init__()
+        self.name = name
+        self.min = min
+        self.max = max
+        self._value = value
+        self.writes = 0
+
+    def __setattr__(self, name, value):
+        if name == "value":
+            self.writes += 1
+        super(DeviceParameter, self).__setattr__(name, value)
+
+
+@_listenable("parameters")
+class Device(LiveObject):
+    def __init__(self, class_name, parameter_names=None):
+        super(Device, self).__init__()
+        self.class_name = class_name
+        self.name = class_name
+        names = parameter_names or ["Device On"] + ["Param %d" % i for i in range(8)]
+        self.parameters = [DeviceParameter(n) for n in names]
+
+
+def eq_three():
+    return Device("FilterEQ3", ["Device On", "GainLo", "GainMid", "GainHi", "FreqLo", "FreqHi",
+                                "LowOn", "MidOn", "HighOn"])
+
+
+class MixerDevice(object):
+    def __init__(self):
+        self.volume = DeviceParameter("Volume", 0.85)
+        self.panning = DeviceParameter("Pan", 0.5, -1.0, 1.0)
+        self.cue_volume = DeviceParameter("Cue Volume", 0.85)
+        self.crossfader = DeviceParameter("Crossfader", 0.0, -1.0, 1.0)
+        self.sends = []
+
+
+@_listenable("playing_status", "is_playing", "position")
+class Clip(LiveObject):
+    is_playing = _notifying_property("is_playing")
+    position = _notifying_property("position")
+
+    def __init__(self, file_path, length=128.0):
+        super(Clip, self).__init__()
+        self.file_path = file_path
+        self.name = file_path.split('/')[-1] if file_path else "clip"
+        self._is_playing = False
+        self.is_triggered = False
+        self.is_audio_clip = file_path is not None
+        self.warping = True
+        self.playing_position = 0.0
+        self.length = length
+        self._position = 0.0
+        self.slot = None
+
+    def set_playing(self, playing, position=0.0):
+        """what Live does when a launched clip starts (or stops) playing"""
+        self.is_triggered = False
+        self.playing_position = position
+        self._is_playing = playing
+        if self.slot is not None:
+            self.slot.track._playing_clip_changed(self.slot, playing)
+        self.notify_is_playing()
+        self.notify_playing_status()
+
+    def fire(self):
+        self.is_triggered = True
+        self.notify_playing_status()
+
+    def stop(self):
+        if self._is_playing:
+            self.set_playing(False)
+
+
+@_listenable("has_clip", "playing_status")
+class ClipSlot(LiveObject):
+    def __init__(self, track, clip=None):
+        super(ClipSlot, self).__init__()
+        self.track = track
+        self.clip = None
+        self.has_stop_button = True
+        if clip is not None:
+            self.set_clip(clip)
+
+    @property
+    def has_clip(self):
+        return self.clip is not None
+
+    def set_clip(self, clip):
+        if self.clip is not None:
+            self.clip.stop()
+            self.clip.slot = None
+        self.clip = clip
+        if clip is not None:
+            clip.slot = self
+        self.notify_has_clip()
+
+    def delete_clip(self):
+        self.set_clip(None)
+
+    def fire(self):
+        if self.clip is not None:
+            self.clip.fire()
+
+
+@_listenable("clip_slots", "devices", "playing_slot_index", "fired_slot_index", "name")
+class Track(LiveObject):
+    def __init__(self, song, name, num_scenes):
+        super(Track, self).__init__()
+        self.song = song
+        self.name = name
+        self.mixer_device = MixerDevice()
+        self.devices = []
+        self.clip_slots = [ClipSlot(self) for _ in range(num_scenes)]
+        self.playing_slot_index = -1
+        self.fired_slot_index = -1
+        self.solo = False
+        self.mute = False
+        self.arm = False
+        self.can_be_armed = True
+
+    def _playing_clip_changed(self, slot, playing):
+        index = self.clip_slots.index(slot)
+        if playing:
+            for other in self.clip_slots:
+                if other is not slot and other.clip is not None and other.clip._is_playing:
+                    other.clip.set_playing(False)
+            self.playing_slot_index = index
+        elif self.playing_slot_index == index:
+            self.playing_slot_index = -1
+        self.notify_playing_slot_index()
+
+    def set_devices(self, devices):
+        self.devices = devices
+        self.notify_devices()
+
+    def insert_scene(self, index):
+        self.clip_slots.insert(index, ClipSlot(self))
+        self.notify_clip_slots()
+
+    def stop_all_clips(self):
+        for slot in self.clip_slots:
+            if slot.clip is not None:
+                slot.clip.stop()
+
+
+@_listenable("clip_slots")
+class Scene(LiveObject):
+    def __init__(self, song, index):
+        super(Scene, self).__init__()
+        self._song = song
+        self.name = "Scene %d" % (index + 1)
+
+    @property
+    def clip_slots(self):
+        index = self._song.scenes.index(self)
+        return [track.clip_slots[index] for track in self._song.tracks]
+
+    def fire(self):
+        for slot in self.clip_slots:
+            slot.fire()
+
+
+@_listenable("selected_track", "selected_scene", "detail_clip", "follow_song")
+class SongView(LiveObject):
+    selected_track = _notifying_property("selected_track")
+    selected_scene = _notifying_property("selected_scene")
+    detail_clip = _notifying_property("detail_clip")
+    follow_song = _notifying_property("follow_song")
+
+    def __init__(self):
+        super(SongView, self).__init__()
+        self._selected_track = None
+        self._selected_scene = None
+        self._detail_clip = None
+        self._follow_song = False
+
+
+@_listenable("tempo", "is_playing", "tracks", "visible_tracks", "scenes", "nudge_up", "nudge_down")
+class Song(LiveObject):
+    tempo = _notifying_property("tempo")
+    is_playing = _notifying_property("is_playing")
+    nudge_up = _notifying_property("nudge_up")
+    nudge_down = _notifying_property("nudge_down")
+
+    def __init__(self, num_tracks=4, num_scenes=8):
+        super(Song, self).__init__()
+        self._tempo = 120.0
+        self._is_playing = False
+        self._nudge_up = False
+        self._nudge_down = False
+        self.view = SongView()
+        self.tracks = [Track(self, "Track %d" % (i + 1), num_scenes) for i in range(num_tracks)]
+        self.return_tracks = []
+        self.master_track = Track(self, "Master", 0)
+        self.scenes = [Scene(self, i) for i in range(num_scenes)]
+        self.view.selected_track = self.tracks[0] if self.tracks else None
+        self.view.selected_scene = self.scenes[0] if self.scenes else None
+
+    @property
+    def visible_tracks(self):
+        return self.tracks
+
+    def tap_tempo(self):
+        pass
+
+    def stop_all_clips(self, quantized=True):
+        for track in self.tracks:
+            track.stop_all_clips()
+
+    def create_scene(self, index):
+        self.scenes.insert(index, Scene(self, index))
+        for track in self.tracks:
+            track.insert_scene(index)
+        self.notify_scenes()
+
+
+class BrowserItem(object):
+    def __init__(self, name, uri, children=None, is_folder=False):
+        self.name = name
+        self.uri = uri
+        self.is_folder = is_folder
+        self.is_loadable = not is_folder
+        self.is_device = False
+        self._children = children or []
+        self.iterations = 0
+
+    @property
+    def children(self):
+        return list(self._children)
+
+    @property
+    def iter_children(self):
+        self.iterations += 1
+        return iter(self._children)
+
+
+class Browser(object):
+    def __init__(self, user_library=None):
+        self.user_library = user_library or BrowserItem("User Library", "query:UserLibrary",
+                                                        is_folder=True)
+        self.previewed = []
+        self.loaded = []
+
+    def preview_item(self, item):
+        self._check_item(item)
+        self.previewed.append(item)
+
+    def load_item(self, item):
+        self._check_item(item)
+        self.loaded.append(item)
+
+    @staticmethod
+    def _check_item(item):
+        # Live's Python bindings raise for anything that isn't a browser item
+        if not isinstance(item, BrowserItem):
+            raise TypeError("Python argument types did not match C++ signature: %r" % (item,))
+
+    def stop_preview(self):
+        pass
+
+
+class ApplicationView(object):
+    def __init__(self):
+        self.shown = []
+        self.focused = []
+
+    def show_view(self, name):
+        self.shown.append(name)
+
+    def focus_view(self, name):
+        self.focused.append(name)
+
+    def is_view_visible(self, name):
+        return name in self.shown
+
+
+class Application(object):
+    def __init__(self, browser=None):
+        self.browser = browser or Browser()
+        self.view = ApplicationView()
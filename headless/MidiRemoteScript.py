@@ -0,0 +1 @@
+"""stand-in for Live's MidiRemoteScript module, which this script imports but doesn't use"""
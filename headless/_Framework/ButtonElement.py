@@ -0,0 +1,20 @@
+"""stand-in for _Framework.ButtonElement"""
+from _Framework.InputControlElement import InputControlElement
+
+
+class ButtonElement(InputControlElement):
+    def __init__(self, is_momentary, msg_type, channel, identifier, *args, **kwargs):
+        super(ButtonElement, self).__init__(msg_type, channel, identifier)
+        self._is_momentary = is_momentary
+
+    def is_momentary(self):
+        return self._is_momentary
+
+    def is_pressed(self):
+        return False
+
+    def turn_on(self):
+        self.send_value(127)
+
+    def turn_off(self):
+        self.send_value(0)
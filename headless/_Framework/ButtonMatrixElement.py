@@ -0,0 +1,18 @@
+"""stand-in for _Framework.ButtonMatrixElement"""
+
+
+class ButtonMatrixElement(object):
+    def __init__(self, rows=None, *args, **kwargs):
+        self._rows = [list(row) for row in rows or []]
+
+    def add_row(self, buttons):
+        self._rows.append(list(buttons))
+
+    def width(self):
+        return len(self._rows[0]) if self._rows else 0
+
+    def height(self):
+        return len(self._rows)
+
+    def get_button(self, column, row):
+        return self._rows[row][column]
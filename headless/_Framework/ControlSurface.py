@@ -0,0 +1,104 @@
+"""
+    stand-in for _Framework.ControlSurface: owns the controls created while it is
+    being constructed, dispatches incoming MIDI to them and runs its task group
+    on every update_display() tick (Live calls it about every 100ms)
+"""
+import contextlib
+
+from _Framework import Task
+
+_current_surface = []
+
+
+def current_surface():
+    return _current_surface[-1] if _current_surface else None
+
+
+class ControlSurface(object):
+    def __init__(self, c_instance, *args, **kwargs):
+        self._c_instance = c_instance
+        self._controls = {}
+        self._tasks = Task.TaskGroup()
+        self._scheduled = []
+        self._suppress_rebuild_requests = False
+        _current_surface.append(self)
+
+    def _register_control(self, control):
+        key = (control.message_type(), control.message_channel(), control.message_identifier())
+        self._controls.setdefault(key, []).append(control)
+
+    def song(self):
+        return self._c_instance.song()
+
+    def application(self):
+        return self._c_instance.application()
+
+    def log_message(self, *message):
+        self._c_instance.log_message(" ".join(str(m) for m in message))
+
+    def show_message(self, message):
+        self._c_instance.show_message(message)
+
+    @contextlib.contextmanager
+    def component_guard(self):
+        if current_surface() is not self:
+            _current_surface.append(self)
+            pushed = True
+        else:
+            pushed = False
+        try:
+            yield
+        finally:
+            if pushed:
+                _current_surface.remove(self)
+
+    def _set_suppress_rebuild_requests(self, suppress):
+        self._suppress_rebuild_requests = suppress
+
+    def schedule_message(self, delay_in_ticks, callback, parameter=None):
+        self._scheduled.append([delay_in_ticks, callback, parameter])
+
+    def _send_midi(self, midi_bytes, optimized=None):
+        self._c_instance.send_midi(tuple(midi_bytes))
+        return True
+
+    def receive_midi(self, midi_bytes):
+        status = midi_bytes[0] & 0xF0
+        channel = midi_bytes[0] & 0x0F
+        if status in (0x90, 0x80):
+            from _Framework.InputControlElement import MIDI_NOTE_TYPE as msg_type
+            value = midi_bytes[2] if status == 0x90 else 0
+        elif status == 0xB0:
+            from _Framework.InputControlElement import MIDI_CC_TYPE as msg_type
+            value = midi_bytes[2]
+        else:
+            return
+        for control in self._controls.get((msg_type, channel, midi_bytes[1]), []):
+            control.receive_value(value)
+
+    def update_display(self):
+        scheduled, self._scheduled = self._scheduled, []
+        for entry in scheduled:
+            entry[0] -= 1
+            if entry[0] <= 0:
+                if entry[2] is None:
+                    entry[1]()
+                else:
+                    entry[1](entry[2])
+            else:
+                self._scheduled.append(entry)
+        self._tasks.update(0.1)
+
+    def refresh_state(self):
+        pass
+
+    def build_midi_map(self, midi_map_handle):
+        pass
+
+    def disconnect(self):
+        if self in _current_surface:
+            _current_surface.remove(self)
+        for controls in self._controls.values():
+            for control in controls:
+                control.disconnect()
+        self._tasks.clear()
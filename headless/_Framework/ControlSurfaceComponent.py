@@ -0,0 +1,27 @@
+"""stand-in for _Framework.ControlSurfaceComponent"""
+
+
+class ControlSurfaceComponent(object):
+    def __init__(self, *args, **kwargs):
+        from _Framework import ControlSurface
+        self._surface = ControlSurface.current_surface()
+        self._sub_components = []
+        self.name = None
+
+    def song(self):
+        return self._surface.song()
+
+    def application(self):
+        return self._surface.application()
+
+    def register_components(self, *components):
+        self._sub_components.extend(components)
+
+    def is_enabled(self):
+        return True
+
+    def update(self):
+        pass
+
+    def disconnect(self):
+        pass
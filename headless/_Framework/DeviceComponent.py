@@ -0,0 +1,38 @@
+"""stand-in for _Framework.DeviceComponent"""
+from _Framework.ControlSurfaceComponent import ControlSurfaceComponent
+
+
+class DeviceComponent(ControlSurfaceComponent):
+    def __init__(self, *args, **kwargs):
+        super(DeviceComponent, self).__init__()
+        self._device = None
+        self._locked_to_device = False
+        self._parameter_controls = None
+        self._on_off_button = None
+        self.lock_changes = 0
+
+    def device(self):
+        return self._device
+
+    def set_device(self, device):
+        self._device = device
+
+    def set_lock_to_device(self, lock, device):
+        self.lock_changes += 1
+        self._locked_to_device = lock
+        if lock:
+            self._device = device
+
+    def set_parameter_controls(self, controls):
+        self._parameter_controls = controls
+
+    def set_on_off_button(self, button):
+        self._on_off_button = button
+
+    def update(self):
+        if self._device is None or not self._parameter_controls:
+            return
+        parameters = self._device.parameters[1:]
+        for control, parameter in zip(self._parameter_controls, parameters):
+            if control is not None:
+                control.connect_to(parameter)
@@ -0,0 +1,72 @@
+"""stand-in for _Framework.InputControlElement"""
+from _Framework import Task  # noqa: F401, real framework exports it through the star import
+
+MIDI_NOTE_TYPE = 0
+MIDI_CC_TYPE = 1
+MIDI_PB_TYPE = 2
+MIDI_SYSEX_TYPE = 3
+
+MIDI_NOTE_ON_STATUS = 144
+MIDI_NOTE_OFF_STATUS = 128
+MIDI_CC_STATUS = 176
+
+
+class InputControlElement(object):
+    def __init__(self, msg_type, channel, identifier, *args, **kwargs):
+        from _Framework import ControlSurface
+        self._msg_type = msg_type
+        self._msg_channel = channel
+        self._msg_identifier = identifier
+        self._value_listeners = []
+        self._parameter_to_map_to = None
+        self.name = None
+        self._surface = ControlSurface.current_surface()
+        if self._surface is not None:
+            self._surface._register_control(self)
+
+    def message_type(self):
+        return self._msg_type
+
+    def message_channel(self):
+        return self._msg_channel
+
+    def message_identifier(self):
+        return self._msg_identifier
+
+    def add_value_listener(self, callback, identify_sender=False):
+        self._value_listeners.append(callback)
+
+    def remove_value_listener(self, callback):
+        self._value_listeners.remove(callback)
+
+    def value_has_listener(self, callback):
+        return callback in self._value_listeners
+
+    def receive_value(self, value):
+        for callback in list(self._value_listeners):
+            callback(value)
+
+    def connect_to(self, parameter):
+        self._parameter_to_map_to = parameter
+
+    def release_parameter(self):
+        self._parameter_to_map_to = None
+
+    def mapped_parameter(self):
+        return self._parameter_to_map_to
+
+    def send_midi(self, midi_bytes):
+        if self._surface is not None:
+            return self._surface._send_midi(midi_bytes)
+        return False
+
+    def send_value(self, value, force=False):
+        if self._msg_type == MIDI_NOTE_TYPE:
+            status = MIDI_NOTE_ON_STATUS
+        else:
+            status = MIDI_CC_STATUS
+        self.send_midi((status + self._msg_channel, self._msg_identifier, int(value)))
+
+    def disconnect(self):
+        self._value_listeners = []
+        self._parameter_to_map_to = None
@@ -0,0 +1,55 @@
+"""stand-in for _Framework.MixerComponent and its channel strips"""
+from _Framework.ControlSurfaceComponent import ControlSurfaceComponent
+
+
+class ChannelStripComponent(ControlSurfaceComponent):
+    def __init__(self):
+        super(ChannelStripComponent, self).__init__()
+        self._track = None
+        self._volume_control = None
+        self._solo_button = None
+
+    def set_track(self, track):
+        self._track = track
+        self._connect_volume()
+
+    def set_volume_control(self, control):
+        self._volume_control = control
+        self._connect_volume()
+
+    def set_solo_button(self, button):
+        self._solo_button = button
+
+    def _connect_volume(self):
+        if self._volume_control is not None:
+            if self._track is not None:
+                self._volume_control.connect_to(self._track.mixer_device.volume)
+            else:
+                self._volume_control.release_parameter()
+
+
+class MixerComponent(ControlSurfaceComponent):
+    def __init__(self, num_tracks=0, num_returns=0, *args, **kwargs):
+        super(MixerComponent, self).__init__()
+        self._track_offset = 0
+        self._channel_strips = [ChannelStripComponent() for _ in range(num_tracks)]
+        self._return_strips = [ChannelStripComponent() for _ in range(num_returns)]
+        self.register_components(*self._channel_strips)
+        self.song().add_visible_tracks_listener(self._reassign_tracks)
+        self._reassign_tracks()
+
+    def channel_strip(self, index):
+        return self._channel_strips[index]
+
+    def tracks_to_use(self):
+        return self.song().visible_tracks
+
+    def set_track_offset(self, offset):
+        self._track_offset = offset
+        self._reassign_tracks()
+
+    def _reassign_tracks(self):
+        tracks = self.tracks_to_use()
+        for index, strip in enumerate(self._channel_strips):
+            track_index = self._track_offset + index
+            strip.set_track(tracks[track_index] if track_index < len(tracks) else None)
@@ -0,0 +1,9 @@
+"""stand-in for _Framework.SessionComponent"""
+from _Framework.ControlSurfaceComponent import ControlSurfaceComponent
+
+
+class SessionComponent(ControlSurfaceComponent):
+    def __init__(self, num_tracks=0, num_scenes=0, *args, **kwargs):
+        super(SessionComponent, self).__init__()
+        self._num_tracks = num_tracks
+        self._num_scenes = num_scenes
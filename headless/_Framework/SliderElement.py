@@ -0,0 +1,9 @@
+"""stand-in for _Framework.SliderElement"""
+import Live
+from _Framework.EncoderElement import EncoderElement
+
+
+class SliderElement(EncoderElement):
+    def __init__(self, msg_type, channel, identifier, *args, **kwargs):
+        super(SliderElement, self).__init__(msg_type, channel, identifier,
+                                            Live.MidiMap.MapMode.absolute)
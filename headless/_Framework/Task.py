@@ -0,0 +1,46 @@
+"""stand-in for _Framework.Task, only what's needed for repeated tasks"""
+
+
+class Task(object):
+    def __init__(self, func):
+        self._func = func
+        self.killed = False
+
+    def update(self, delta):
+        return self._func(delta)
+
+    def kill(self):
+        self.killed = True
+
+
+class _Repeat(Task):
+    def update(self, delta):
+        self._func.update(delta)
+        return True
+
+
+def run(func, *args, **kwargs):
+    return Task(lambda delta: func(*args, **kwargs))
+
+
+def repeat(task):
+    return _Repeat(task)
+
+
+class TaskGroup(object):
+    def __init__(self):
+        self._tasks = []
+
+    def add(self, task):
+        self._tasks.append(task)
+        return task
+
+    def update(self, delta):
+        for task in list(self._tasks):
+            if task.killed:
+                self._tasks.remove(task)
+            elif not task.update(delta):
+                self._tasks.remove(task)
+
+    def clear(self):
+        self._tasks = []
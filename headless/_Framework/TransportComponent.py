@@ -0,0 +1,6 @@
+"""stand-in for _Framework.TransportComponent"""
+from _Framework.ControlSurfaceComponent import ControlSurfaceComponent
+
+
+class TransportComponent(ControlSurfaceComponent):
+    pass
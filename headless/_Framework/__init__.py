@@ -0,0 +1,5 @@
+"""
+    Stand-in for the subset of Ableton's _Framework used by this script. Control
+    elements register with the control surface that is being constructed, which
+    dispatches incoming MIDI to them in receive_midi() like Live does.
+"""
@@ -0,0 +1,319 @@
+"""
+    Runs the XoneK2_DJ script outside of Live, against the stand-ins for Live's
+    API and _Framework in this directory.
+
+    A Harness builds a synthetic set (tracks x scenes) and a synthetic user
+    library of tagged mp3 files under a temporary home directory, instantiates
+    the control surface like Live does and lets you drive it with MIDI messages,
+    clip launches and display ticks. Instead of the UI binary, a FakeUi answers
+    the handshake and counts what the script sends. It's meant for benchmarks and
+    for trying changes without a Live installation:
+
+        from headless.harness import Harness
+
+        with Harness(num_tracks=4, num_scenes=8, library_size=200) as h:
+            h.load_clip(0, 0, h.library[0])
+            h.play(0, 0)
+            h.midi((0x9e, 36, 127))
+            h.tick()
+            print(h.sent_midi)
+
+    or run a short session from the command line with `python -m headless.harness`.
+"""
+import argparse
+import importlib.util
+import json
+import os
+import random
+import shutil
+import socket
+import sys
+import tempfile
+import time
+import warnings
+from urllib.parse import quote
+
+HEADLESS_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_ROOT = os.path.dirname(HEADLESS_DIR)
+PACKAGE = "XoneK2_DJ"
+LIBRARY_DIR = os.path.join("Music", "Ableton", "User Library")
+OPEN_KEYS = ["%d%s" % (n, dm) for n in range(1, 13) for dm in "dm"]
+
+
+def load_package():
+    """imports the repository as the XoneK2_DJ package, the way Live sees it"""
+    if HEADLESS_DIR not in sys.path:
+        sys.path.insert(0, HEADLESS_DIR)
+    if REPO_ROOT not in sys.path:
+        sys.path.append(REPO_ROOT)
+    if PACKAGE in sys.modules:
+        return sys.modules[PACKAGE]
+    warnings.simplefilter("ignore", DeprecationWarning)  # aifc/chunk on python 3.11+
+    spec = importlib.util.spec_from_file_location(
+        PACKAGE, os.path.join(REPO_ROOT, "__init__.py"), submodule_search_locations=[REPO_ROOT])
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[PACKAGE] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+def make_library(home, size, seed=0, seconds=2.0):
+    """
+        Writes size tagged mp3 files into the user library below home, in a few
+        genre folders, and returns their paths as the script sees them (~/...)
+    """
+    from benchmarks import corpus
+    rnd = random.Random(seed)
+    files = []
+    for i in range(size):
+        folder = "Genre %d" % (i % 8)
+        tags = dict(corpus.TAGS)
+        tags.update({
+            "title": "Title %d" % i,
+            "artist": "Artist %d" % rnd.randrange(size // 4 + 1),
+            "genre": folder,
+            "bpm": "%d" % rnd.randrange(90, 150),
+            "key": rnd.choice(OPEN_KEYS),
+        })
+        relative = os.path.join(LIBRARY_DIR, folder, "track%05d.mp3" % i)
+        path = os.path.join(home, relative)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as f:
+            f.write(corpus.id3v2(3, tags) + corpus.mp3_audio(rnd, "cbr", seconds))
+        files.append(os.path.join("~", relative))
+    return files
+
+
+def browser_tree(home):
+    """the user library below home as a tree of Live.Browser.BrowserItems"""
+    import Live
+    root = os.path.join(home, LIBRARY_DIR)
+
+    def node(path, uri):
+        children = []
+        for name in sorted(os.listdir(path)):
+            child_path = os.path.join(path, name)
+            child_uri = uri + ("#" if uri == "query:UserLibrary" else ":") + quote(name)
+            if os.path.isdir(child_path):
+                children.append(node(child_path, child_uri))
+            else:
+                children.append(Live.BrowserItem(name, child_uri))
+        return Live.BrowserItem(os.path.basename(path), uri, children, is_folder=True)
+
+    return node(root, "query:UserLibrary")
+
+
+class FakeUi(object):
+    """
+        Stands in for the LiveMusicBrowser UI on its socket: answers the readiness
+        handshake, keeps the last state it got (with row diffs applied) and counts
+        messages and bytes
+    """
+    SOCKET = "/tmp/LiveMusicBrowser.ui.socket"
+    SCRIPT_SOCKET = "/tmp/LiveMusicBrowser.src.socket"
+
+    def __init__(self):
+        if os.path.exists(self.SOCKET):
+            os.remove(self.SOCKET)
+        self._socket = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        self._socket.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 250 * 1024)
+        self._socket.bind(self.SOCKET)
+        self._socket.setblocking(False)
+        self.data = None
+        self.quit = False
+        self.reset_stats()
+
+    def reset_stats(self):
+        self.messages = 0
+        self.bytes = 0
+        self.full_updates = 0
+        self.diffs = 0
+
+    def drain(self):
+        while True:
+            try:
+                message = self._socket.recv(1 << 20)
+            except BlockingIOError:
+                return
+            self.messages += 1
+            self.bytes += len(message)
+            msg = json.loads(message)
+            if msg.get("ping"):
+                self._socket.sendto(b'{"ready": true}', self.SCRIPT_SOCKET)
+            elif "quit" in msg:
+                self.quit = True
+            elif "rows_removed" in msg:
+                self.diffs += 1
+                rows = self.data["rows"]
+                for pos in msg["rows_removed"]:
+                    del rows[pos]
+                for pos, row in msg["rows_inserted"]:
+                    rows.insert(pos, row)
+                self.data["sel_ix"] = msg["sel_ix"]
+                if "suggestions" in msg:
+                    self.data["suggestions"] = msg["suggestions"]
+            else:
+                self.full_updates += 1
+                self.data = msg
+
+    def send(self, msg):
+        """what the UI sends when the user clicks something"""
+        self._socket.sendto(json.dumps(msg).encode('utf-8'), self.SCRIPT_SOCKET)
+
+    def close(self):
+        self._socket.close()
+        if os.path.exists(self.SOCKET):
+            os.remove(self.SOCKET)
+
+
+class Clock(object):
+    """stands in for time.monotonic, so the tests decide when time passes"""
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class CInstance(object):
+    """what Live passes to create_instance()"""
+    def __init__(self, song, application, echo=False):
+        self._song = song
+        self._application = application
+        self._echo = echo
+        self.sent_midi = []
+        self.log = []
+        self.messages = []
+
+    def song(self):
+        return self._song
+
+    def application(self):
+        return self._application
+
+    def send_midi(self, midi_bytes):
+        self.sent_midi.append(midi_bytes)
+
+    def log_message(self, message):
+        self.log.append(message)
+        if self._echo:
+            print(message)
+
+    def show_message(self, message):
+        self.messages.append(message)
+
+
+class Harness(object):
+    def __init__(self, num_tracks=4, num_scenes=8, library_size=100, seed=0, home=None, echo_log=False):
+        self._own_home = home is None
+        self.home = home or tempfile.mkdtemp(prefix="xonek2_home_")
+        self._old_env = {name: os.environ.get(name) for name in ("HOME", "XONEK2_UI")}
+        os.environ["HOME"] = self.home
+        os.environ["XONEK2_UI"] = "external"
+        if not os.path.isdir(os.path.join(self.home, LIBRARY_DIR)):
+            make_library(self.home, library_size, seed)
+        self.library = sorted(self._library_files())
+
+        package = load_package()
+        import Live
+        self.live = Live
+        self.song = Live.Song(num_tracks, num_scenes)
+        self.application = Live.Application(Live.Browser(browser_tree(self.home)))
+        self.c_instance = CInstance(self.song, self.application, echo_log)
+        self.ui = FakeUi()
+        self.surface = package.create_instance(self.c_instance)
+        # handshake: ping, ready, first state
+        self.tick()
+        self.tick()
+
+    def _library_files(self):
+        root = os.path.join(self.home, LIBRARY_DIR)
+        for directory, _, names in os.walk(root):
+            for name in names:
+                yield os.path.join("~", os.path.relpath(os.path.join(directory, name), self.home))
+
+    @property
+    def sent_midi(self):
+        return self.c_instance.sent_midi
+
+    def midi(self, midi_bytes):
+        self.surface.receive_midi(tuple(midi_bytes))
+
+    def tick(self, count=1):
+        for _ in range(count):
+            self.surface.update_display()
+            self.ui.drain()
+
+    def load_clip(self, track, scene, file_path):
+        clip = self.live.Clip(file_path)
+        self.song.tracks[track].clip_slots[scene].set_clip(clip)
+        return clip
+
+    def play(self, track, scene, position=0.0):
+        clip = self.song.tracks[track].clip_slots[scene].clip
+        clip.set_playing(True, position)
+        return clip
+
+    def launch_triggered(self):
+        """starts the clips that were fired, like Live does at the next launch quantization"""
+        for track in self.song.tracks:
+            for slot in track.clip_slots:
+                if slot.clip is not None and slot.clip.is_triggered:
+                    slot.clip.set_playing(True)
+
+    def stop(self, track):
+        self.song.tracks[track].stop_all_clips()
+
+    def close(self):
+        if self.surface is not None:
+            self.surface.disconnect()
+            self.surface = None
+        self.ui.close()
+        for name, value in self._old_env.items():
+            if value is None:
+                os.environ.pop(name, None)
+            else:
+                os.environ[name] = value
+        if self._own_home:
+            shutil.rmtree(self.home, ignore_errors=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="runs a short scripted session against a synthetic set")
+    parser.add_argument("--tracks", type=int, default=4)
+    parser.add_argument("--scenes", type=int, default=32)
+    parser.add_argument("--library", type=int, default=500, help="number of files in the library")
+    parser.add_argument("--log", action="store_true", help="print the script's log")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    with Harness(args.tracks, args.scenes, args.library, echo_log=args.log) as h:
+        print("started in %.2fs with %d library items, %d rows shown" % (
+            time.perf_counter() - start, len(h.library), len(h.ui.data["rows"]) if h.ui.data else 0))
+        h.ui.reset_stats()
+        start = time.perf_counter()
+        for track in range(args.tracks):
+            for scene in range(min(args.scenes, 4)):
+                h.load_clip(track, scene, h.library[(track * 7 + scene) % len(h.library)])
+        h.play(0, 0, 16.0)
+        h.play(1, 1)
+        for value in range(128):
+            h.midi((0xbe, 16, value))  # fader of track 1
+        for _ in range(50):
+            h.midi((0xbe, 20, 1))  # tempo down
+            h.tick()
+        h.play(0, 2)
+        h.tick(5)
+        print("session took %.3fs, %d MIDI messages out, UI got %d messages (%d full, %d diffs, %d bytes)" % (
+            time.perf_counter() - start, len(h.sent_midi), h.ui.messages, h.ui.full_updates, h.ui.diffs,
+            h.ui.bytes))
+
+
+if __name__ == '__main__':
+    sys.exit(main())
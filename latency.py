@@ -0,0 +1,137 @@
+"""
+    Opt-in latency instrumentation for the MIDI handlers and the per-tick work.
+
+    Set XONEK2_LATENCY before starting Live to turn it on: "log" writes a summary
+    to Live's Log.txt every SUMMARY_INTERVAL seconds, any other value is taken as
+    a file to append the summaries to.
+
+    For every name there is a histogram of how long the handler ran, from entry
+    to exit, which covers the parameter write or browser update it does. Work that
+    is deferred to a later tick can record the time since the event arrived with
+    record().
+"""
+import math
+import os
+import time
+
+from XoneK2_DJ import diagnostics
+
+ENV_VAR = "XONEK2_LATENCY"
+SUMMARY_INTERVAL = 10.0
+# histogram buckets per doubling of the latency
+BUCKETS_PER_OCTAVE = 4
+
+g_switch = diagnostics.Switch(ENV_VAR)
+
+
+class Histogram():
+    __slots__ = ('count', 'total', 'max', 'buckets')
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.buckets = {}
+
+    def add(self, microseconds):
+        self.count += 1
+        self.total += microseconds
+        if microseconds > self.max:
+            self.max = microseconds
+        bucket = int(math.log2(microseconds) * BUCKETS_PER_OCTAVE) if microseconds > 1 else 0
+        self.buckets[bucket] = self.buckets.get(bucket, 0) + 1
+
+    def percentile(self, percent):
+        """upper bound of the bucket the percentile falls into, in microseconds"""
+        wanted = self.count * percent / 100.0
+        seen = 0
+        for bucket in sorted(self.buckets):
+            seen += self.buckets[bucket]
+            if seen >= wanted:
+                return min(2 ** ((bucket + 1) / BUCKETS_PER_OCTAVE), self.max)
+        return self.max
+
+
+class LatencyRecorder():
+    def __init__(self, output, interval=SUMMARY_INTERVAL, clock=time.perf_counter):
+        """
+        output (function): called with each line of the summary
+        """
+        self._output = output
+        self._interval = interval
+        self._clock = clock
+        self._histograms = {}
+        self._next_summary = clock() + interval
+
+    def record(self, name, seconds):
+        histogram = self._histograms.get(name)
+        if histogram is None:
+            histogram = self._histograms[name] = Histogram()
+        histogram.add(seconds * 1e6)
+
+    def instrument(self, name, fn):
+        clock = self._clock
+        record = self.record
+
+        def instrumented(*args, **kwargs):
+            start = clock()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                record(name, clock() - start)
+        return instrumented
+
+    def tick(self):
+        if self._clock() >= self._next_summary:
+            self.report()
+
+    def report(self):
+        """writes the summary for the time since the last one and starts over"""
+        self._next_summary = self._clock() + self._interval
+        if not self._histograms:
+            return
+        self._output("latency in microseconds, last %.0fs" % self._interval)
+        self._output("  %-50s %6s %6s %6s %6s %6s %6s" % ("", "count", "mean", "p50", "p90", "p99", "max"))
+        for name in sorted(self._histograms):
+            h = self._histograms[name]
+            self._output("  %-50s %6d %6.0f %6.0f %6.0f %6.0f %6.0f" % (
+                name, h.count, h.total / h.count, h.percentile(50), h.percentile(90),
+                h.percentile(99), h.max))
+        self._histograms = {}
+
+    def stop(self):
+        self.report()
+
+
+def start(log, setting=None):
+    """
+        Turns instrumentation on if XONEK2_LATENCY (or setting) says so. Call it before the
+        controls are created.
+    """
+    setting = g_switch.setting(setting)
+    recorder = None
+    if setting == "log":
+        recorder = LatencyRecorder(log)
+    elif setting:
+        def write(line, path=os.path.expanduser(setting)):
+            with open(path, "a") as f:
+                f.write(line + "\n")
+        recorder = LatencyRecorder(write)
+    return g_switch.switch_on(recorder)
+
+
+def stop():
+    g_switch.stop()
+
+
+def instrument(name, fn):
+    recorder = g_switch.active
+    if recorder is None:
+        return fn
+    return recorder.instrument(name, fn)
+
+
+def record(name, seconds):
+    recorder = g_switch.active
+    if recorder is not None:
+        recorder.record(name, seconds)
@@ -0,0 +1,210 @@
+"""
+    Finds the audio files in the user library with os.scandir instead of walking
+    Live's browser tree, which costs a Live API call per node.
+
+    The tags the browser shows are kept in a manifest file between sessions, so
+    only new and changed files are read again. Directory mtimes tell which
+    directories need listing again, but files are still checked by size and mtime:
+    tag editors often rewrite a file in place, which leaves the directory alone.
+
+    Exact durations, which take reading all of a file, are kept the same way in a
+    file of their own, see DurationCache.
+"""
+import json
+import os
+import threading
+
+from XoneK2_DJ.tinytag import TinyTag
+
+USER_LIBRARY = "~/Music/Ableton/User Library"
+AUDIO_EXTENSIONS = ("aiff", "mp3", "flac", "ogg", "opus")
+MANIFEST_FILE = "~/Library/Caches/XoneK2_DJ/library.json"
+MANIFEST_VERSION = 1
+DURATIONS_FILE = "~/Library/Caches/XoneK2_DJ/durations.json"
+DURATIONS_VERSION = 1
+
+
+def write_json(filename, data):
+    """writes data to filename as JSON, replacing the file in one go"""
+    os.makedirs(os.path.dirname(filename), exist_ok=True)
+    # scans of the script before a reload may still be writing theirs
+    tmp = "%s.%d.tmp" % (filename, threading.get_ident())
+    with open(tmp, "w") as f:
+        json.dump(data, f)
+    os.replace(tmp, filename)
+
+
+class TagSummary():
+    """the tags of a file the browser uses, as plain data that fits in the manifest"""
+    __slots__ = ('artist', 'title', 'genre', 'duration', 'bpm', 'key')
+
+    def __init__(self, artist, title, genre, duration, bpm, key):
+        self.artist = artist
+        self.title = title
+        self.genre = genre
+        self.duration = duration
+        self.bpm = bpm
+        self.key = key
+
+    @staticmethod
+    def read(filename):
+        tags = TinyTag.get(os.path.expanduser(filename), compact=True, lazy=True)
+        return TagSummary(tags.artist, tags.title, tags.genre, tags.duration or 0.0,
+                          tags.extra['bpm'] if 'bpm' in tags.extra else "none",
+                          tags.extra['initial_key'] if 'initial_key' in tags.extra else "none")
+
+    def to_list(self):
+        return [self.artist, self.title, self.genre, self.duration, self.bpm, self.key]
+
+
+class LibraryScanner():
+    def __init__(self, log, root=USER_LIBRARY, manifest_file=MANIFEST_FILE, manifest=None):
+        """
+        log (function): called with messages about the scan
+        root (str): the library, as the paths handed out should start
+        manifest ((dirs, files)): the manifest of an earlier scan, to use instead of
+            reading it from manifest_file again
+        """
+        self._log = log
+        self._root = root
+        self._manifest_file = os.path.expanduser(manifest_file)
+        # (dirs, files) as of the last scan, plain data that can be handed to the next scanner
+        self.manifest = manifest
+        self.read_count = 0
+
+    def _load_manifest(self):
+        try:
+            with open(self._manifest_file) as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            return {}, {}
+        if manifest.get("version") != MANIFEST_VERSION or manifest.get("root") != self._root:
+            return {}, {}
+        return manifest["dirs"], manifest["files"]
+
+    def _save_manifest(self, dirs, files):
+        try:
+            write_json(self._manifest_file,
+                       {"version": MANIFEST_VERSION, "root": self._root, "dirs": dirs, "files": files})
+        except OSError as e:
+            self._log("can't write library manifest %s: %s" % (self._manifest_file, e))
+
+    def scan(self):
+        """
+            Returns [(filename, TagSummary)] for the audio files below the root, in
+            the order the browser lists them (sorted by name, depth first)
+        """
+        old_dirs, old_files = self.manifest if self.manifest is not None else self._load_manifest()
+        dirs = {}
+        files = {}
+        found = []
+        self.read_count = 0
+        self._scan_dir("", old_dirs, old_files, dirs, files, found)
+        if dirs != old_dirs or files != old_files:
+            self._save_manifest(dirs, files)
+        self.manifest = (dirs, files)
+        return found
+
+    def _scan_dir(self, relative, old_dirs, old_files, dirs, files, found):
+        path = os.path.join(os.path.expanduser(self._root), relative)
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except OSError:
+            return
+        old = old_dirs.get(relative)
+        if old is not None and old[0] == mtime:
+            # nothing was added, removed or renamed in here
+            names, subdirs = old[1], set(old[2])
+        else:
+            try:
+                with os.scandir(path) as it:
+                    entries = list(it)
+            except OSError:
+                return
+            names = sorted(e.name for e in entries if e.is_dir() or e.name.lower().endswith(AUDIO_EXTENSIONS))
+            subdirs = set(e.name for e in entries if e.is_dir())
+        dirs[relative] = [mtime, names, sorted(subdirs)]
+
+        for name in names:
+            child = os.path.join(relative, name) if relative else name
+            if name in subdirs:
+                self._scan_dir(child, old_dirs, old_files, dirs, files, found)
+                continue
+            try:
+                stat = os.stat(os.path.join(path, name))
+            except OSError:
+                continue
+            filename = self._root + "/" + child.replace(os.sep, "/")
+            entry = old_files.get(child)
+            if entry is not None and entry[0] == stat.st_size and entry[1] == stat.st_mtime_ns:
+                summary = TagSummary(*entry[2:])
+            else:
+                try:
+                    summary = TagSummary.read(filename)
+                except Exception as e:
+                    self._log("can't read tags of %s: %s" % (filename, e))
+                    continue
+                self.read_count += 1
+            files[child] = [stat.st_size, stat.st_mtime_ns] + summary.to_list()
+            found.append((filename, summary))
+
+
+class DurationCache():
+    """
+        Exact durations of files by path, with the size and mtime they were
+        measured at. A file that changed since is measured again and replaces
+        its entry, prune() drops the files that are gone.
+    """
+    def __init__(self, log, durations_file=DURATIONS_FILE, durations=None):
+        """
+        log (function): called with messages about the cache file
+        durations (dict): the durations of an earlier cache, to use instead of
+            reading them from durations_file again
+        """
+        self._log = log
+        self._durations_file = os.path.expanduser(durations_file)
+        # path -> [size, mtime_ns, seconds], plain data that can be handed to the next cache
+        self.durations = durations if durations is not None else self._load()
+        self._changed = False
+
+    def _load(self):
+        try:
+            with open(self._durations_file) as f:
+                cache = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        if cache.get("version") != DURATIONS_VERSION:
+            return {}
+        return cache["durations"]
+
+    def get(self, path, stat):
+        """the duration of path if it was measured when it looked like stat, None otherwise"""
+        entry = self.durations.get(path)
+        if entry is not None and entry[0] == stat.st_size and entry[1] == stat.st_mtime_ns:
+            return entry[2]
+        return None
+
+    def put(self, path, stat, seconds):
+        self.durations[path] = [stat.st_size, stat.st_mtime_ns, seconds]
+        self._changed = True
+
+    def prune(self, paths):
+        """drops the durations of files that aren't in paths anymore, e.g. deleted or moved ones"""
+        keep = set(paths)
+        # list() copies the keys at once, a scanner from before a reload may still be adding
+        for path in list(self.durations):
+            if path not in keep:
+                self.durations.pop(path, None)
+                self._changed = True
+
+    def save(self):
+        """writes the durations to the cache file if they changed"""
+        if not self._changed:
+            return
+        try:
+            # a scanner from before a reload may still be adding to the same durations
+            durations = dict(self.durations)
+            write_json(self._durations_file, {"version": DURATIONS_VERSION, "durations": durations})
+            self._changed = False
+        except OSError as e:
+            self._log("can't write durations to %s: %s" % (self._durations_file, e))
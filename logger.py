@@ -0,0 +1,213 @@
+"""
+    Logging for the script that stays out of the way of the MIDI handlers.
+
+    Messages have a level and are formatted lazily, logger.debug("track %d", i)
+    costs a comparison when debug messages are off. Messages that pass go into a
+    ring buffer of CAPACITY records and are only formatted and written when it is
+    flushed: to Live's log once per tick, or, with XONEK2_LOG set to a file, by a
+    background thread. If the buffer overflows between flushes, the oldest records
+    are dropped and counted.
+
+    Each message format gets at most RATE_LIMIT records per RATE_WINDOW seconds,
+    the rest are counted and reported once the window is over.
+
+    XONEK2_LOG_LEVEL sets the level (debug, info, warning, error), default info.
+"""
+import os
+import threading
+import time
+from collections import deque
+
+from XoneK2_DJ import diagnostics
+
+ENV_VAR = "XONEK2_LOG"
+LEVEL_ENV_VAR = "XONEK2_LOG_LEVEL"
+
+DEBUG = 10
+INFO = 20
+WARNING = 30
+ERROR = 40
+LEVEL_NAMES = {DEBUG: "debug", INFO: "info", WARNING: "warning", ERROR: "error"}
+
+CAPACITY = 1000
+RATE_LIMIT = 10
+RATE_WINDOW = 10.0
+FLUSH_INTERVAL = 0.5
+
+g_switch = diagnostics.Switch(ENV_VAR)
+
+
+class Logger():
+    def __init__(self, sink, level=INFO, capacity=CAPACITY, rate_limit=RATE_LIMIT, rate_window=RATE_WINDOW,
+                 clock=time.monotonic):
+        """
+        sink (function): called with each formatted line when flushing, closed by
+            stop() if it has a close(), like a FileSink
+        """
+        self._sink = sink
+        self.level = level
+        self._records = deque(maxlen=capacity)
+        self._rate_limit = rate_limit
+        self._rate_window = rate_window
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._dropped = 0
+        self._window_end = clock() + rate_window
+        self._counts = {}  # format -> records in the current window
+        self._suppressed = {}  # format -> records over the limit in the current window
+
+    def log(self, level, msg, *args):
+        if level < self.level:
+            return
+        now = self._clock()
+        with self._lock:
+            if now >= self._window_end:
+                self._end_window(now)
+            count = self._counts.get(msg, 0) + 1
+            self._counts[msg] = count
+            if count > self._rate_limit:
+                self._suppressed[msg] = self._suppressed.get(msg, 0) + 1
+                return
+            self._append(level, msg, args)
+
+    def _append(self, level, msg, args):
+        # the deque drops the oldest record when it's full
+        if len(self._records) == self._records.maxlen:
+            self._dropped += 1
+        self._records.append((time.time(), level, msg, args))
+
+    def _end_window(self, now):
+        for msg, count in self._suppressed.items():
+            self._append(INFO, "%d more like: %s", (count, msg))
+        self._counts = {}
+        self._suppressed = {}
+        self._window_end = now + self._rate_window
+
+    def debug(self, msg, *args):
+        self.log(DEBUG, msg, *args)
+
+    def info(self, msg, *args):
+        self.log(INFO, msg, *args)
+
+    def warning(self, msg, *args):
+        self.log(WARNING, msg, *args)
+
+    def error(self, msg, *args):
+        self.log(ERROR, msg, *args)
+
+    def flush(self):
+        """formats and writes what is buffered"""
+        with self._lock:
+            records = list(self._records)
+            self._records.clear()
+            dropped, self._dropped = self._dropped, 0
+        if dropped:
+            self._sink("%d log messages dropped" % dropped)
+        for _, level, msg, args in records:
+            try:
+                text = msg % args if args else msg
+            except (TypeError, ValueError) as e:
+                text = "%s %r (%s)" % (msg, args, e)
+            self._sink(text if level == INFO else "%s: %s" % (LEVEL_NAMES[level], text))
+
+    def tick(self):
+        self.flush()
+
+    def stop(self):
+        with self._lock:
+            self._end_window(self._clock())
+        self.flush()
+        close = getattr(self._sink, "close", None)
+        if close is not None:
+            close()
+
+
+class BackgroundLogger(Logger):
+    """flushes from a thread every FLUSH_INTERVAL, for sinks that may block like files"""
+    def __init__(self, sink, *args, interval=FLUSH_INTERVAL, **kwargs):
+        super(BackgroundLogger, self).__init__(sink, *args, **kwargs)
+        self._interval = interval
+        self._stopped = threading.Event()
+        self._writer = threading.Thread(target=self._run, name="LogWriter", daemon=True)
+        self._writer.start()
+
+    def _run(self):
+        while not self._stopped.wait(self._interval):
+            self.flush()
+
+    def tick(self):
+        pass
+
+    def stop(self):
+        self._stopped.set()
+        self._writer.join()
+        super(BackgroundLogger, self).stop()
+
+
+class FileSink():
+    """appends lines with the time to a file, which stays open until close()"""
+    def __init__(self, path):
+        self._file = open(path, "a")
+
+    def __call__(self, line):
+        self._file.write("%s %s\n" % (time.strftime("%Y-%m-%d %H:%M:%S"), line))
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+
+def parse_level(name, default=INFO):
+    for level, level_name in LEVEL_NAMES.items():
+        if level_name == name.lower():
+            return level
+    return default
+
+
+def start(log_message, setting=None, level=None):
+    """
+        Creates the logger the module functions log to. Messages go to log_message
+        (Live's log) when flush() is called, or to the file XONEK2_LOG (or setting)
+        names from a background thread. Returns the logger.
+    """
+    setting = g_switch.setting(setting)
+    if level is None:
+        level = parse_level(os.environ.get(LEVEL_ENV_VAR, ""))
+    logger = None
+    if setting:
+        path = os.path.expanduser(setting)
+        try:
+            logger = BackgroundLogger(FileSink(path), level)
+        except OSError as e:
+            log_message("can't log to %s: %s" % (path, e))
+    if logger is None:
+        logger = Logger(log_message, level)
+    return g_switch.switch_on(logger)
+
+
+def stop():
+    g_switch.stop()
+
+
+def debug(msg, *args):
+    logger = g_switch.active
+    if logger is not None:
+        logger.log(DEBUG, msg, *args)
+
+
+def info(msg, *args):
+    logger = g_switch.active
+    if logger is not None:
+        logger.log(INFO, msg, *args)
+
+
+def warning(msg, *args):
+    logger = g_switch.active
+    if logger is not None:
+        logger.log(WARNING, msg, *args)
+
+
+def error(msg, *args):
+    logger = g_switch.active
+    if logger is not None:
+        logger.log(ERROR, msg, *args)
@@ -0,0 +1,213 @@
+"""
+    Opt-in profiling of the script's hot paths, to find out after a gig what
+    made Live stutter.
+
+    Set XONEK2_PROFILE before starting Live:
+
+        cprofile  deterministic profile of everything called from the hot paths,
+                  dumped as pstats files (python -m pstats, snakeviz, ...)
+        stacks    samples the stack every SAMPLE_INTERVAL while a hot path runs,
+                  dumped as collapsed stacks for flamegraph.pl or speedscope
+
+    Every DUMP_INTERVAL seconds the data collected so far goes to a new file next
+    to Live's Log.txt (or to XONEK2_PROFILE_DIR), the oldest files of the session
+    are removed beyond MAX_DUMPS.
+"""
+import abc
+import cProfile
+import glob
+import os
+import sys
+import tempfile
+import threading
+import time
+from collections import deque
+
+from XoneK2_DJ import diagnostics
+
+ENV_VAR = "XONEK2_PROFILE"
+DIR_ENV_VAR = "XONEK2_PROFILE_DIR"
+DUMP_INTERVAL = 60.0
+MAX_DUMPS = 180
+SAMPLE_INTERVAL = 0.001
+
+g_switch = diagnostics.Switch(ENV_VAR)
+
+
+def live_log_dir():
+    """the directory of the Log.txt Live writes to, the newest if there are several versions"""
+    candidates = glob.glob(os.path.expanduser("~/Library/Preferences/Ableton/Live */Log.txt"))
+    if os.environ.get("APPDATA"):
+        candidates += glob.glob(os.path.join(os.environ["APPDATA"], "Ableton", "Live *", "Preferences", "Log.txt"))
+    if not candidates:
+        return tempfile.gettempdir()
+    return os.path.dirname(max(candidates, key=os.path.getmtime))
+
+
+class Profiler(abc.ABC):
+    """
+        Common part of the profilers: hot paths are wrapped to call enter() and
+        exit(), dumps go to a new file every interval, written by _write()
+    """
+    SUFFIX = ""
+
+    def __init__(self, log, directory, interval=DUMP_INTERVAL, clock=time.monotonic):
+        self._log = log
+        self._directory = directory
+        self._interval = interval
+        self._clock = clock
+        self._next_dump = clock() + interval
+        self._dumps = deque()
+        self._depth = 0
+        self._calls = 0
+
+    def wrap(self, fn):
+        enter = self.enter
+        exit = self.exit
+
+        def profiled(*args, **kwargs):
+            enter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                exit()
+        return profiled
+
+    def enter(self):
+        self._depth += 1
+        self._calls += 1
+
+    def exit(self):
+        self._depth -= 1
+
+    def tick(self):
+        if self._clock() >= self._next_dump:
+            self.dump()
+
+    def dump(self):
+        """writes what was collected since the last dump to a new file and starts over"""
+        self._next_dump = self._clock() + self._interval
+        if not self._calls:
+            return
+        path = os.path.join(self._directory, time.strftime("xonek2-profile-%Y%m%d-%H%M%S") + self.SUFFIX)
+        try:
+            self._write(path)
+        except OSError as e:
+            self._log("can't write profile to %s: %s" % (path, e))
+            return
+        self._calls = 0
+        self._dumps.append(path)
+        while len(self._dumps) > MAX_DUMPS:
+            try:
+                os.remove(self._dumps.popleft())
+            except OSError:
+                pass
+
+    @abc.abstractmethod
+    def _write(self, path):
+        """writes what was collected to path and starts over"""
+
+    def stop(self):
+        self.dump()
+
+
+class CProfiler(Profiler):
+    SUFFIX = ".prof"
+
+    def __init__(self, *args, **kwargs):
+        super(CProfiler, self).__init__(*args, **kwargs)
+        self._profile = cProfile.Profile()
+
+    def enter(self):
+        # hot paths call each other, only the outermost one switches profiling on
+        if self._depth == 0:
+            self._profile.enable()
+        super(CProfiler, self).enter()
+
+    def exit(self):
+        super(CProfiler, self).exit()
+        if self._depth == 0:
+            self._profile.disable()
+
+    def _write(self, path):
+        self._profile.dump_stats(path)
+        self._profile = cProfile.Profile()
+
+
+class StackSampler(Profiler):
+    SUFFIX = ".folded"
+
+    def __init__(self, *args, sample_interval=SAMPLE_INTERVAL, **kwargs):
+        super(StackSampler, self).__init__(*args, **kwargs)
+        self._sample_interval = sample_interval
+        # the hot paths all run on the thread that starts profiling, Live's main thread
+        self._thread_id = threading.get_ident()
+        self._stacks = {}
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._sampler = threading.Thread(target=self._run, name="StackSampler", daemon=True)
+        self._sampler.start()
+
+    def _run(self):
+        own_file = os.path.abspath(__file__)
+        while not self._stopped.wait(self._sample_interval):
+            if self._depth == 0:
+                continue
+            frame = sys._current_frames().get(self._thread_id)
+            names = []
+            while frame is not None:
+                code = frame.f_code
+                if os.path.abspath(code.co_filename) != own_file:
+                    names.append("%s:%s" % (os.path.basename(code.co_filename),
+                                            getattr(code, "co_qualname", code.co_name)))
+                frame = frame.f_back
+            stack = ";".join(reversed(names))
+            with self._lock:
+                self._stacks[stack] = self._stacks.get(stack, 0) + 1
+
+    def _write(self, path):
+        with self._lock:
+            stacks, self._stacks = self._stacks, {}
+        with open(path, "w") as f:
+            for stack, count in sorted(stacks.items()):
+                f.write("%s %d\n" % (stack, count))
+
+    def stop(self):
+        self._stopped.set()
+        self._sampler.join()
+        super(StackSampler, self).stop()
+
+
+PROFILERS = {
+    "cprofile": CProfiler,
+    "stacks": StackSampler,
+}
+
+
+def start(log, setting=None):
+    """
+        Turns profiling on if XONEK2_PROFILE (or setting) says so. Call it before the
+        objects are created.
+    """
+    setting = g_switch.setting(setting)
+    profiler = None
+    if setting in PROFILERS:
+        directory = os.path.expanduser(os.environ.get(DIR_ENV_VAR) or live_log_dir())
+        profiler = PROFILERS[setting](log, directory)
+        log("profiling with %s, writing to %s" % (setting, directory))
+    elif setting:
+        log("unknown %s %r, use one of %s" % (ENV_VAR, setting, ", ".join(sorted(PROFILERS))))
+    return g_switch.switch_on(profiler)
+
+
+def stop():
+    g_switch.stop()
+
+
+def instrument(obj, names):
+    """replaces the methods of obj with these names by profiled ones, on the instance only"""
+    profiler = g_switch.active
+    if profiler is None:
+        return
+    for name in names:
+        setattr(obj, name, profiler.wrap(getattr(obj, name)))
@@ -1,8 +1,11 @@
 #include "imgui/imgui.h"
 #include "json11/json11.hpp"
+#include <algorithm>
+#include <vector>
 
 static bool filter_bpm = false;
 static bool filter_key = false;
+static bool suggest = false;
 static float bpm_percentage = 5;
 
 static std::map<std::string, std::string> filters;
@@ -34,6 +37,103 @@ void drawFilters(const json11::Json& data, json11::Json& send_data)
     {
         send_data = json11::Json::object{{"bpm_percent", json11::Json(bpm_percentage)}};
     }
+
+    ImGui::SameLine();
+
+    // deck_filter is null for no filter, "all" for all playing decks or the index of a deck
+    std::vector<std::string> deck_filters = {"any deck", "all decks"};
+    for (size_t deck = 0; deck < data["decks"].array_items().size(); deck++)
+    {
+        deck_filters.push_back("deck " + std::to_string(deck + 1));
+    }
+    const json11::Json& deck_filter = data["deck_filter"];
+    int deck_filter_ix = deck_filter.is_null() ? 0 : deck_filter.is_string() ? 1 : deck_filter.int_value() + 2;
+    deck_filter_ix = std::min(deck_filter_ix, int(deck_filters.size()) - 1);
+    ImGui::SetNextItemWidth(100);
+    if (ImGui::BeginCombo("Compatible with", deck_filters[deck_filter_ix].c_str()))
+    {
+        for (int ix = 0; ix < deck_filters.size(); ix++)
+        {
+            if (ImGui::Selectable(deck_filters[ix].c_str(), ix == deck_filter_ix) and ix != deck_filter_ix)
+            {
+                send_data = json11::Json::object{{"deck_filter",
+                    ix == 0 ? json11::Json() : ix == 1 ? json11::Json("all") : json11::Json(ix - 2)}};
+            }
+        }
+        ImGui::EndCombo();
+    }
+
+    ImGui::SameLine();
+
+    suggest = data["suggest"].bool_value();
+    ImGui::Checkbox("Suggest", &suggest);
+    if (suggest != data["suggest"].bool_value())
+    {
+        send_data = json11::Json::object{{"suggest", json11::Json(suggest)}};
+    }
+}
+
+// the best matches for the master deck, best first; click to preview, double click to load
+void drawSuggestions(const json11::Json& data, json11::Json& send_data)
+{
+    ImGui::Text("Suggestions:");
+    ImGuiTableFlags flags = ImGuiTableFlags_Borders | ImGuiTableFlags_RowBg | ImGuiTableFlags_SizingFixedFit;
+
+    if (data["suggestions"].array_items().empty())
+    {
+        ImGui::TextDisabled("nothing to suggest");
+        return;
+    }
+    if (ImGui::BeginTable("suggestions", data["cols"].array_items().size() - 1, flags))
+    {
+        int key_distance_col_ix = -1;
+        int col_ix = 0;
+        for (const auto& col_name: data["cols"].array_items())
+        {
+            if (col_name.string_value() == "KeyDistance")
+            {
+                key_distance_col_ix = col_ix;
+            }
+            else
+            {
+                ImGui::TableSetupColumn(col_name.string_value().c_str());
+            }
+            col_ix++;
+        }
+        ImGui::TableHeadersRow();
+
+        for (int row_ix = 0; row_ix < data["suggestions"].array_items().size(); row_ix++)
+        {
+            const auto& row = data["suggestions"][row_ix];
+            ImGui::TableNextRow();
+            int display_column_offset = 0;
+            for (int column = 0; column < row.array_items().size(); column++)
+            {
+                if (column == key_distance_col_ix) {
+                    display_column_offset++;
+                    continue;
+                }
+                ImGui::TableSetColumnIndex(column - display_column_offset);
+                if (column == 0)
+                {
+                    std::string unique_id = "##suggestion" + std::to_string(row_ix);
+                    if (ImGui::Selectable(unique_id.c_str(), false,
+                                          ImGuiSelectableFlags_SpanAllColumns | ImGuiSelectableFlags_AllowDoubleClick))
+                    {
+                        send_data = json11::Json::object{{ImGui::IsMouseDoubleClicked(0) ? "load_suggestion" : "preview_suggestion", json11::Json(row_ix)}};
+                    }
+                    ImGui::SameLine();
+                }
+
+                if (row[column].is_number()) {
+                    ImGui::Text("%3.5g", row[column].number_value());
+                } else {
+                    ImGui::TextUnformatted(row[column].string_value().c_str());
+                }
+            }
+        }
+        ImGui::EndTable();
+    }
 }
 
 void drawPlayingDecks(const json11::Json& data)
@@ -249,6 +349,11 @@ void drawFrame(int display_w, int display_h, const json11::Json& data, json11::J
 
     drawPlayingDecks(data);
     ImGui::Separator();
+    if (data["suggest"].bool_value())
+    {
+        drawSuggestions(data, send_data);
+        ImGui::Separator();
+    }
     drawFilters(data, send_data);
     ImGui::Separator();
     drawBrowserList(data, send_data);
@@ -11,6 +11,7 @@
 #include <sys/un.h>
 #include <errno.h>
 #include <iostream>
+#include <algorithm>
 #if defined(IMGUI_IMPL_OPENGL_ES2)
 #include <GLES2/gl2.h>
 #endif
@@ -37,6 +38,51 @@ int guard(int n, const char* err)
     return n; 
 }
 
+void writeOutput(int socket, const json11::Json& data)
+{
+    std::string str = data.dump();
+    struct sockaddr_un name;
+    name.sun_family = AF_UNIX;
+    strcpy(name.sun_path, SOCKET_OUT);
+    if (sendto(socket, str.data(), str.size(), 0,
+              reinterpret_cast<struct sockaddr*>(&name), sizeof(struct sockaddr_un)) < 0) {
+        perror("sendto()");
+    }
+}
+
+void sendReady(int socket)
+{
+    writeOutput(socket, json11::Json::object{{"ready", true}});
+}
+
+// applies a diff of the rows, as sent when the bpm window moves: removals are
+// positions in the old rows, highest first, insertions positions in the new rows,
+// lowest first. Changed suggestions come along with it.
+void applyRowsDiff(const json11::Json& diff, json11::Json& data)
+{
+    json11::Json::object obj = data.object_items();
+    json11::Json::array rows = data["rows"].array_items();
+    for (const auto& pos: diff["rows_removed"].array_items())
+    {
+        if (pos.int_value() >= 0 and size_t(pos.int_value()) < rows.size())
+        {
+            rows.erase(rows.begin() + pos.int_value());
+        }
+    }
+    for (const auto& insertion: diff["rows_inserted"].array_items())
+    {
+        size_t pos = std::min(size_t(std::max(insertion[0].int_value(), 0)), rows.size());
+        rows.insert(rows.begin() + pos, insertion[1]);
+    }
+    obj["rows"] = rows;
+    obj["sel_ix"] = diff["sel_ix"];
+    if (not diff["suggestions"].is_null())
+    {
+        obj["suggestions"] = diff["suggestions"];
+    }
+    data = obj;
+}
+
 bool readInput(int socket, json11::Json& data)
 {
     int status = recv(socket, buffer, sizeof(buffer), 0);
@@ -44,29 +90,34 @@ bool readInput(int socket, json11::Json& data)
     {
         buffer[status] = 0;
         std::string err;
-        data = json11::Json::parse(buffer, err);
-        if (data.is_null())
+        json11::Json msg = json11::Json::parse(buffer, err);
+        if (msg.is_null())
         {
             std::cerr << "Parsing data failed: " << err << std::endl;
         }
+        else if (msg["ping"].bool_value())
+        {
+            // the script waits for this before it sends anything else
+            sendReady(socket);
+        }
+        else if (not msg["quit"].is_null())
+        {
+            return false;
+        }
+        else if (not msg["rows_removed"].is_null())
+        {
+            applyRowsDiff(msg, data);
+        }
+        else
+        {
+            data = msg;
+        }
     }
     else if (errno != EAGAIN)
     {
         perror("recv()");
     }
-    return data["quit"].is_null();
-}
-
-void writeOutput(int socket, const json11::Json& data)
-{
-    std::string str = data.dump();
-    struct sockaddr_un name;
-    name.sun_family = AF_UNIX;
-    strcpy(name.sun_path, SOCKET_OUT);
-    if (sendto(socket, str.data(), str.size(), 0,
-              reinterpret_cast<struct sockaddr*>(&name), sizeof(struct sockaddr_un)) < 0) {
-        perror("sendto()");
-    }
+    return true;
 }
 
 extern void drawFrame(int display_w, int display_h, const json11::Json& data, json11::Json& send_data);
@@ -127,6 +178,9 @@ int main(int, char**)
     ImGui_ImplGlfw_InitForOpenGL(window, true);
     ImGui_ImplOpenGL3_Init(glsl_version);
 
+    // in case the script is already waiting, it pings us otherwise
+    sendReady(sock);
+
     // Main loop
     bool show_demo_window = false;
     json11::Json data;
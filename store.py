@@ -0,0 +1,41 @@
+"""
+    Data that outlives the script's modules. __init__ reloads the other modules
+    every time Live creates the control surface, i.e. whenever a set is loaded,
+    but this one is only imported once per Live process, so what it holds is
+    still there for the next set.
+
+    Only plain data (lists, dicts, tuples, strings, numbers, bytes) belongs in
+    here: instances of classes from reloaded modules would keep the old code
+    alive and no longer be instances of the reloaded classes. Values are stored
+    with the version of their format, a script that expects another version
+    doesn't get them.
+
+    Don't add this module to the reloads in __init__, that would drop everything.
+"""
+
+g_values = {}
+
+
+def get(name, version):
+    """the value stored under name in this format version, None if there is none"""
+    entry = g_values.get(name)
+    if entry is None or entry[0] != version:
+        return None
+    return entry[1]
+
+
+def put(name, version, value):
+    g_values[name] = (version, value)
+
+
+def setdefault(name, version, default):
+    """the value stored under name in this format version, stores default if there is none"""
+    value = get(name, version)
+    if value is None:
+        put(name, version, default)
+        value = default
+    return value
+
+
+def remove(name):
+    g_values.pop(name, None)
@@ -0,0 +1,12 @@
+"""
+    The repository is the XoneK2_DJ package and pytest imports its __init__.py
+    while collecting, which only works once the package can be imported under
+    that name, the way Live sees it.
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from headless import harness  # noqa: E402
+
+harness.load_package()
@@ -0,0 +1,206 @@
+"""
+    The browser's filters, run on the headless harness with a synthetic library.
+"""
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from benchmarks import corpus  # noqa: E402
+from headless import harness  # noqa: E402
+
+
+class KeyDistanceTest(unittest.TestCase):
+    # (from, to, distance) in open key notation, d is major and m minor
+    CASES = [
+        ("5d", "5d", 0),
+        ("5d", "6d", 1),
+        ("6d", "5d", 1),
+        ("12m", "1m", 1),   # around the wheel, both ways
+        ("1m", "12m", 1),
+        ("12d", "1d", 1),
+        ("1d", "11d", 12),  # two steps, around the wheel
+        ("11d", "1d", 12),
+        ("3d", "9d", 2),    # opposite
+        ("9m", "3m", 2),
+        ("8m", "8d", 3),    # relative major and minor
+        ("8d", "8m", 3),
+        ("8m", "9d", 12),
+        ("1d", "12m", 12),
+        ("4d", "7d", 12),
+        ("4d", "10d", 2),
+        ("?", "4d", -1),
+        ("4d", "", -1),
+    ]
+
+    def setUp(self):
+        harness.load_package()
+        self.browser = sys.modules[harness.PACKAGE + ".Browser"]
+
+    def test_key_distance(self):
+        for from_key, to_key, distance in self.CASES:
+            self.assertEqual(self.browser.key_distance(from_key, to_key), distance, (from_key, to_key))
+
+    def test_table_matches_key_distance(self):
+        b = self.browser
+        for from_key, to_key, distance in self.CASES:
+            self.assertEqual(b.KEY_DISTANCES[b.key_index(from_key)][b.key_index(to_key)], distance,
+                             (from_key, to_key))
+        for row in b.KEY_DISTANCES:
+            self.assertEqual(len(row), b.UNKNOWN_KEY + 1)
+        # the distance is the same both ways
+        for i, row in enumerate(b.KEY_DISTANCES):
+            for j, distance in enumerate(row):
+                self.assertEqual(distance, b.KEY_DISTANCES[j][i])
+
+
+class UntaggedDeckTest(unittest.TestCase):
+    LIBRARY_SIZE = 40
+
+    def setUp(self):
+        self.home = tempfile.mkdtemp(prefix="xonek2_home_")
+        harness.make_library(self.home, self.LIBRARY_SIZE)
+        # no key and no bpm, the deck filter can't tell what goes with it
+        relative = os.path.join(harness.LIBRARY_DIR, "untagged.mp3")
+        with open(os.path.join(self.home, relative), 'wb') as f:
+            f.write(corpus.mp3_audio(random.Random(0), "cbr", 2.0))
+        self.h = harness.Harness(library_size=self.LIBRARY_SIZE, home=self.home)
+        self.untagged = os.path.join("~", relative)
+        self.h.load_clip(0, 0, self.untagged)
+        self.h.play(0, 0)
+        self.h.tick(5)
+        self.h.ui.send({"bpm_filter": False})
+        self.h.ui.send({"key_filter": False})
+        self.h.tick(2)
+        self.browser = self.h.surface.browser_repr
+
+    def tearDown(self):
+        self.h.close()
+        shutil.rmtree(self.home, ignore_errors=True)
+
+    def rows(self, deck_filter):
+        self.h.ui.send({"deck_filter": deck_filter})
+        self.h.tick(2)
+        return self.h.ui.data["rows"]
+
+    def test_deck_with_unknown_key_hides_nothing(self):
+        deck = self.browser._decks[0]
+        self.assertEqual(deck.filename, self.untagged)
+        self.assertEqual(deck.open_key, "?")
+        unfiltered = self.rows(None)
+        self.assertEqual(len(unfiltered), self.LIBRARY_SIZE + 1)
+        self.assertEqual(self.rows("all"), unfiltered)
+        self.assertEqual(self.rows(0), unfiltered)
+
+
+class StoredLibraryTest(unittest.TestCase):
+    """a reloaded set starts from the library kept in the store and rescans it"""
+    def setUp(self):
+        self.home = tempfile.mkdtemp(prefix="xonek2_home_")
+        harness.Harness(library_size=20, home=self.home).close()
+        self.store = sys.modules[harness.PACKAGE + ".store"]
+        self.library = sys.modules[harness.PACKAGE + ".library"]
+        self.browser_module = sys.modules[harness.PACKAGE + ".Browser"]
+
+    def tearDown(self):
+        shutil.rmtree(self.home, ignore_errors=True)
+
+    def test_unchanged_library_is_replaced_not_changed(self):
+        version = self.browser_module.LIBRARY_FORMAT_VERSION
+        stored = self.store.get("library", version)
+        before = dict(stored)
+        self.assertIsNotNone(self.store.get("exact_durations", self.library.DURATIONS_VERSION))
+        h = harness.Harness(library_size=20, home=self.home)
+        try:
+            browser = h.surface.browser_repr
+            self.assertTrue(any("kept from the last set" in line for line in h.c_instance.log))
+            end = time.monotonic() + 10.0
+            while browser._library_scan is not None:
+                self.assertLess(time.monotonic(), end, "rescan didn't finish")
+                time.sleep(0.01)
+                h.tick()
+            self.assertEqual(len(browser._current), 20)
+        finally:
+            h.close()
+        # the one the first browser had is as it was, the store has the rescanned one
+        self.assertEqual(stored, before)
+        self.assertIs(stored["manifest"], before["manifest"])
+        self.assertIsNot(self.store.get("library", version), stored)
+        self.assertIs(self.store.get("library", version)["files"], stored["files"])
+
+
+class FilterWalkTest(unittest.TestCase):
+    """
+        A random walk over tempo changes, filter settings and decks. The cached
+        filter results and the bpm window moved on from them have to match the
+        filter run from scratch, and the rows the UI has after applying the diffs
+        the rows a full update would send.
+    """
+    STEPS = 3000
+
+    def setUp(self):
+        self.h = harness.Harness(num_tracks=4, num_scenes=4, library_size=300)
+        self.browser = self.h.surface.browser_repr
+        for track in range(4):
+            self.h.load_clip(track, 0, self.h.library[track * 13])
+
+    def tearDown(self):
+        self.h.close()
+
+    def uncached(self):
+        """library indices the filter gives from scratch, at the current tempo"""
+        br = self.browser
+        lower, upper = br._bpm_window()
+        return [i for i, item in enumerate(br._current) if br._filter_except_bpm(i, item) and
+                (not br._filter_by_bpm or lower < item.bpm < upper)]
+
+    def step(self, rnd):
+        h = self.h
+        r = rnd.random()
+        if r < 0.5:
+            # off the cache's bpm quantum, so cached results are for a slightly different tempo
+            h.song.tempo = h.song.tempo + rnd.choice([0.004, 0.7, 4]) * rnd.uniform(-1, 1)
+        elif r < 0.6:
+            h.ui.send({"key_filter": rnd.random() < 0.5})
+        elif r < 0.7:
+            h.ui.send({"bpm_filter": rnd.random() < 0.5})
+        elif r < 0.75:
+            h.ui.send({"bpm_percent": rnd.choice([3.0, 5.0, 8.0])})
+        elif r < 0.8:
+            h.ui.send({"deck_filter": rnd.choice([None, "all", 0, 1])})
+        elif r < 0.85:
+            h.ui.send({"filter_genre": rnd.choice(["", "genre 1", "genre"])})
+        elif r < 0.95:
+            track = rnd.randrange(4)
+            if h.song.tracks[track].playing_slot_index >= 0:
+                h.stop(track)
+            else:
+                h.play(track, 0, rnd.random() * 100)
+        else:
+            h.ui.send({"suggest": rnd.random() < 0.5})
+        h.tick()
+
+    def test_cached_filter_and_diffs_match_full_results(self):
+        rnd = random.Random(5)
+        br = self.browser
+        self.h.ui.reset_stats()
+        for step in range(self.STEPS):
+            self.step(rnd)
+            expected = self.uncached()
+            self.assertEqual(br._filtered_ix, expected, "step %d" % step)
+            if br._filter_by_bpm:
+                self.assertEqual((br._bpm_lower, br._bpm_upper), br._bpm_window(), "step %d" % step)
+            rows = json.loads(json.dumps([br._row(br._current[i]) for i in expected]))
+            self.assertEqual(self.h.ui.data["rows"], rows, "step %d" % step)
+        # both the cache and the diffs were used on the way
+        self.assertGreater(br._filter_cache.hits, 0)
+        self.assertGreater(self.h.ui.diffs, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,110 @@
+"""
+    The waveform zoom runs osascript through the ActionDispatcher. These run it with
+    a stub osascript on the PATH and check that zoom steps coming in while a command
+    runs are merged.
+"""
+import os
+import re
+import shutil
+import stat
+import sys
+import tempfile
+import threading
+import time
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from headless import harness  # noqa: E402
+
+STUB_OSASCRIPT = """#!/bin/sh
+echo "$*" >> "%s"
+sleep %f
+"""
+
+
+def wait_for(condition, timeout=10.0):
+    end = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > end:
+            raise AssertionError("timed out")
+        time.sleep(0.01)
+
+
+class StubCommandTest(unittest.TestCase):
+    RUN_TIME = 0.3
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp(prefix="xonek2_stub_")
+        self.calls = os.path.join(self.dir, "calls")
+        script = os.path.join(self.dir, "osascript")
+        with open(script, "w") as f:
+            f.write(STUB_OSASCRIPT % (self.calls, self.RUN_TIME))
+        os.chmod(script, os.stat(script).st_mode | stat.S_IXUSR)
+        self.old_path = os.environ["PATH"]
+        os.environ["PATH"] = self.dir + os.pathsep + self.old_path
+        self.h = harness.Harness(library_size=10)
+        # creating the script reloads its modules, use the classes it uses
+        self.xone = sys.modules[harness.PACKAGE + ".xone"]
+        self.dispatcher = sys.modules[harness.PACKAGE + ".dispatcher"].ActionDispatcher()
+        self.zoom = self.xone.WaveformZoom(self.h.application, self.h.song, self.dispatcher)
+
+    def tearDown(self):
+        self.dispatcher.stop()
+        self.h.close()
+        os.environ["PATH"] = self.old_path
+        shutil.rmtree(self.dir, ignore_errors=True)
+
+    def zooms(self):
+        """[(key code, count)] of the osascript calls so far"""
+        if not os.path.exists(self.calls):
+            return []
+        with open(self.calls) as f:
+            return [(int(re.search(r"key code (\d+)", line).group(1)),
+                     int(re.search(r"repeat (\d+) times", line).group(1))) for line in f]
+
+    def test_turns_during_a_zoom_are_merged(self):
+        for _ in range(10):
+            self.zoom.handle_encoder_turn(1)
+        for _ in range(3):
+            self.zoom.handle_encoder_turn(127)
+        wait_for(lambda: sum(count for _, count in self.zooms()) == 13)
+        zooms = self.zooms()
+        self.assertLessEqual(len(zooms), 3)
+        zoom = self.xone.WaveformZoom
+        zoom_in = [count for key, count in zooms if key == zoom.ZOOM_IN_KEY_CODE]
+        zoom_out = [count for key, count in zooms if key == zoom.ZOOM_OUT_KEY_CODE]
+        self.assertEqual(sum(zoom_in), 10)
+        self.assertEqual(zoom_out, [3])
+        self.assertEqual(zooms[-1][0], zoom.ZOOM_OUT_KEY_CODE)
+        self.assertIn('Detail/Clip', self.h.application.view.focused)
+
+
+class MergeTest(unittest.TestCase):
+    def test_only_consecutive_actions_are_merged(self):
+        running = threading.Event()
+        release = threading.Event()
+        runs = []
+
+        def runner(argv):
+            runs.append(argv)
+            running.set()
+            release.wait(5)
+        harness.load_package()
+        dispatcher = sys.modules[harness.PACKAGE + ".dispatcher"].ActionDispatcher(runner=runner)
+        try:
+            dispatcher.submit("in", lambda count: ["in", count])
+            running.wait(5)
+            # the first one is running, these queue up behind it
+            for _ in range(5):
+                dispatcher.submit("in", lambda count: ["in", count])
+            dispatcher.submit("out", lambda count: ["out", count], count=2)
+            dispatcher.submit("in", lambda count: ["in", count])
+            release.set()
+            wait_for(lambda: len(runs) == 4)
+            self.assertEqual(runs, [["in", 1], ["in", 5], ["out", 2], ["in", 1]])
+        finally:
+            dispatcher.stop()
+
+
+if __name__ == '__main__':
+    unittest.main()
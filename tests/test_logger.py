@@ -0,0 +1,48 @@
+"""
+    The logger's ring buffer and rate limit, with a clock the tests advance.
+"""
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from headless import harness  # noqa: E402
+
+logger = sys.modules[harness.load_package().__name__ + ".logger"]
+
+
+class RingBufferTest(unittest.TestCase):
+    def setUp(self):
+        self.clock = harness.Clock()
+        self.lines = []
+
+    def make_logger(self, rate_limit):
+        return logger.Logger(self.lines.append, capacity=4, rate_limit=rate_limit, rate_window=10.0,
+                             clock=self.clock)
+
+    def test_overflow_is_counted(self):
+        log = self.make_logger(rate_limit=100)
+        for i in range(6):
+            log.info("message %d" % i)
+        log.flush()
+        self.assertEqual(self.lines, ["2 log messages dropped", "message 2", "message 3", "message 4",
+                                      "message 5"])
+
+    def test_rate_limit_summary_is_counted_when_it_overflows(self):
+        log = self.make_logger(rate_limit=2)
+        for i in range(5):
+            log.info("fast %d", i)
+        log.info("b")
+        log.info("c")
+        # the summary of the window and this one push the two oldest out
+        self.clock.now += 10.0
+        log.info("d")
+        log.flush()
+        self.assertEqual(self.lines, ["2 log messages dropped", "b", "c", "3 more like: fast %d", "d"])
+        self.lines[:] = []
+        log.flush()
+        self.assertEqual(self.lines, [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,338 @@
+"""
+    tinytag on synthetic files from benchmarks/corpus.py.
+"""
+import copy
+import os
+import pickle
+import random
+import shutil
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from benchmarks import corpus  # noqa: E402
+from tinytag.tinytag import ID3, TinyTag  # noqa: E402
+
+SECONDS = 2.0
+# MPEG 1 Layer III at 44.1kHz: 1152 samples per frame, 417 bytes per frame at 128kbps
+FRAMES = int(SECONDS * 44100 / 1152)
+FRAME_DURATION = 1152 / 44100.0
+FRAME_LENGTH = 417
+
+
+class CorpusTestCase(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp(prefix="xonek2_tinytag_")
+
+    def tearDown(self):
+        shutil.rmtree(self.dir, ignore_errors=True)
+
+    def write(self, name, data):
+        path = os.path.join(self.dir, name)
+        with open(path, 'wb') as f:
+            f.write(data)
+        return path
+
+
+class Mp3TestCase(CorpusTestCase):
+    def setUp(self):
+        super(Mp3TestCase, self).setUp()
+        self.tag = corpus.id3v2(3)
+
+    def mp3(self, audio):
+        return self.write("track.mp3", self.tag + audio + corpus.id3v1())
+
+
+class ExactMp3DurationTest(Mp3TestCase):
+    def frames(self, count=FRAMES, seed=0):
+        rnd = random.Random(seed)
+        return [corpus.mp3_frame(rnd, rnd.choice((96, 128, 192, 320))) for _ in range(count)]
+
+    def assertExact(self, path, frames, audio_offset):
+        tag = TinyTag.get(path, tags=False, exact_duration=True)
+        self.assertAlmostEqual(tag.duration, frames * FRAME_DURATION)
+        self.assertEqual(tag.audio_offset, audio_offset)
+        self.assertEqual(tag.samplerate, 44100)
+        self.assertEqual(tag.channels, 2)
+
+    def test_cbr(self):
+        path = self.mp3(corpus.mp3_audio(random.Random(0), "cbr", SECONDS))
+        self.assertExact(path, FRAMES, len(self.tag))
+        self.assertAlmostEqual(TinyTag.get(path, tags=False, exact_duration=True).bitrate, 128, delta=1)
+
+    def test_vbr_with_xing_header(self):
+        # the Xing frame doesn't contain audio, the audio starts after it
+        path = self.mp3(corpus.mp3_audio(random.Random(0), "xing", SECONDS))
+        self.assertExact(path, FRAMES, len(self.tag) + FRAME_LENGTH)
+
+    def test_vbr_with_vbri_header(self):
+        path = self.mp3(corpus.mp3_audio(random.Random(0), "vbri", SECONDS))
+        self.assertExact(path, FRAMES, len(self.tag) + FRAME_LENGTH)
+
+    def test_garbage_between_frames(self):
+        frames = self.frames()
+        # sync bytes and a header that would be valid, but isn't followed by a frame
+        garbage = b'\x00\xff' * 50 + b'\xff\xfb\x90\x40' + b'\x00' * 33
+        path = self.mp3(b''.join(frames[:10]) + garbage + b''.join(frames[10:]))
+        self.assertExact(path, FRAMES, len(self.tag))
+
+    def test_garbage_before_first_frame(self):
+        garbage = b'\x00' * 100 + b'\xff\x00\xff'
+        path = self.mp3(garbage + b''.join(self.frames()))
+        self.assertExact(path, FRAMES, len(self.tag) + len(garbage))
+
+    def test_truncated_stream(self):
+        # the last frame is cut off, what is there of it still counts
+        path = self.mp3(b''.join(self.frames())[:-100])
+        self.assertExact(path, FRAMES, len(self.tag))
+        # cut off right after a frame header
+        audio = b''.join(self.frames())
+        path = self.mp3(audio[:len(audio) - len(self.frames()[-1]) + 4])
+        self.assertExact(path, FRAMES, len(self.tag))
+
+    def test_no_frames(self):
+        rnd = random.Random(0)
+        noise = bytes(b for b in rnd.randbytes(20000) if b != 0xff)
+        path = self.mp3(noise)
+        tag = TinyTag.get(path, tags=False, exact_duration=True)
+        self.assertIsNone(tag.duration)
+        self.assertIsNone(tag.audio_offset)
+
+    def test_block_sizes(self):
+        # frames and garbage crossing the block boundaries anywhere
+        frames = self.frames()
+        path = self.mp3(b''.join(frames[:20]) + b'\x00\xff\x01' * 7 + b''.join(frames[20:]))
+        for block_size in (3, 4, 100, FRAME_LENGTH, FRAME_LENGTH + 1, 4097):
+            with mock.patch.object(ID3, '_EXACT_SCAN_BLOCK_SIZE', block_size):
+                self.assertExact(path, FRAMES, len(self.tag))
+
+    def test_frame_table(self):
+        lengths, samples = ID3._frame_table()
+        cases = [
+            (0xfb90, 417, 1152),   # MPEG 1 Layer III, 128kbps, 44.1kHz
+            (0xfb92, 418, 1152),   # with padding
+            (0xfbe0, 1044, 1152),  # 320kbps
+            (0xf390, 261, 576),    # MPEG 2 Layer III, 80kbps, 22.05kHz
+            (0xff90, 312, 384),    # MPEG 1 Layer I, 288kbps, 44.1kHz
+            (0xfd90, 522, 1152),   # MPEG 1 Layer II, 160kbps, 44.1kHz
+            (0xfbf0, 0, 0),        # bad bitrate
+            (0xfb00, 0, 0),        # free format bitrate isn't supported
+            (0xfb9c, 0, 0),        # reserved samplerate
+            (0xeb90, 0, 0),        # reserved MPEG version
+            (0xf990, 0, 0),        # reserved layer
+        ]
+        for index, length, samples_per_frame in cases:
+            self.assertEqual((lengths[index], samples[index]), (length, samples_per_frame), hex(index))
+
+
+class EstimatedMp3DurationTest(Mp3TestCase):
+    def test_vbr_headers(self):
+        for kind in ("xing", "vbri"):
+            path = self.mp3(corpus.mp3_audio(random.Random(0), kind, SECONDS))
+            self.assertAlmostEqual(TinyTag.get(path, tags=False).duration, FRAMES * FRAME_DURATION)
+
+    def test_vbri_header_at_buffer_boundary(self):
+        # the reader fills its buffer in blocks aligned to its size. The audio search
+        # skips the garbage within a block, up to a VBRI frame 20 bytes before its end,
+        # so peeking at the frame header doesn't see the VBRI header 36 bytes in
+        buffer_size = os.stat(self.dir).st_blksize
+        garbage = b'\x00' * (2 * buffer_size - 20 - len(self.tag))
+        path = self.mp3(garbage + corpus.mp3_audio(random.Random(0), "vbri", SECONDS))
+        tag = TinyTag.get(path, tags=False)
+        self.assertAlmostEqual(tag.duration, FRAMES * FRAME_DURATION)
+        # right after the VBRI fields the frame count is taken from
+        self.assertEqual(tag.audio_offset, len(self.tag) + len(garbage) + 54)
+
+class VorbisCommentTests(object):
+    """for the formats with vorbis comments, mixed into a CorpusTestCase"""
+    EXTENSION = None
+
+    def generate(self, rnd, seconds):
+        raise NotImplementedError()
+
+    def setUp(self):
+        super(VorbisCommentTests, self).setUp()
+        self.data = self.generate(random.Random(0), SECONDS)
+        self.path = self.write("track" + self.EXTENSION, self.data)
+
+    def assertTags(self, tag):
+        self.assertEqual(tag.title, corpus.TAGS["title"])
+        self.assertEqual(tag.artist, corpus.TAGS["artist"])
+        self.assertEqual(tag.genre, corpus.TAGS["genre"])
+        self.assertEqual(tag.year, corpus.TAGS["year"])
+        self.assertEqual((tag.track, tag.track_total), ("3", "12"))
+        self.assertEqual(tag.comment, corpus.TAGS["comment"])
+        self.assertEqual(tag.extra, {"bpm": corpus.TAGS["bpm"], "initial_key": corpus.TAGS["key"]})
+
+    def assertNoTags(self, tag):
+        self.assertIsNone(tag.title)
+        self.assertIsNone(tag.artist)
+        self.assertEqual(tag.extra, {})
+
+    def test_tags_and_duration(self):
+        tag = TinyTag.get(self.path)
+        self.assertTags(tag)
+        self.assertAlmostEqual(tag.duration, SECONDS)
+
+    def test_duration_only(self):
+        tag = TinyTag.get(self.path, tags=False)
+        self.assertNoTags(tag)
+        self.assertAlmostEqual(tag.duration, SECONDS)
+
+
+class OggTests(VorbisCommentTests):
+    def test_tags_only(self):
+        tag = TinyTag.get(self.path, duration=False)
+        self.assertTags(tag)
+        self.assertIsNone(tag.duration)
+
+    def test_last_page_cut_off(self):
+        # the header of the last page is incomplete, the page before it ends half a second earlier
+        last_page = self.data.rfind(b'OggS')
+        path = self.write("cut" + self.EXTENSION, self.data[:last_page + 10])
+        self.assertAlmostEqual(TinyTag.get(path, tags=False).duration, SECONDS - 0.5)
+        # the header is there, the rest of the page isn't
+        path = self.write("cut" + self.EXTENSION, self.data[:last_page + 30])
+        self.assertAlmostEqual(TinyTag.get(path, tags=False).duration, SECONDS)
+
+    def test_last_page_without_granule_position(self):
+        # a page no packet ends on has -1 as granule position, the one before it counts
+        continued = corpus._ogg_page([b'\x00' * 255], -1, 1000)
+        path = self.write("continued" + self.EXTENSION, self.data + continued)
+        self.assertAlmostEqual(TinyTag.get(path, tags=False).duration, SECONDS)
+
+
+class OggVorbisTest(OggTests, CorpusTestCase):
+    EXTENSION = ".ogg"
+
+    def generate(self, rnd, seconds):
+        return corpus.ogg_vorbis(rnd, seconds)
+
+    def test_stream_info(self):
+        tag = TinyTag.get(self.path, tags=False)
+        self.assertEqual(tag.samplerate, 44100)
+        self.assertEqual(tag.bitrate, 128)
+        self.assertEqual(tag.audio_offset, 0)
+
+
+class OggOpusTest(OggTests, CorpusTestCase):
+    EXTENSION = ".opus"
+
+    def generate(self, rnd, seconds):
+        return corpus.ogg_opus(rnd, seconds)
+
+    def test_stream_info(self):
+        tag = TinyTag.get(self.path, tags=False)
+        self.assertEqual(tag.samplerate, 48000)
+        self.assertEqual(tag.channels, 2)
+
+
+class FlacTest(VorbisCommentTests, CorpusTestCase):
+    EXTENSION = ".flac"
+
+    def generate(self, rnd, seconds):
+        return corpus.flac(rnd, seconds, artwork=corpus._artwork(rnd, 1024))
+
+    def test_tags_only(self):
+        # STREAMINFO comes first and has the duration, so it's always there
+        tag = TinyTag.get(self.path, duration=False)
+        self.assertTags(tag)
+        self.assertAlmostEqual(tag.duration, SECONDS)
+
+    def test_stream_info(self):
+        tag = TinyTag.get(self.path, tags=False)
+        self.assertEqual((tag.samplerate, tag.channels), (44100, 2))
+        self.assertIsNone(tag.get_image())
+
+    def test_image_without_tags(self):
+        tag = TinyTag.get(self.path, tags=False, image=True)
+        self.assertNoTags(tag)
+        self.assertEqual(len(tag.get_image()), 1024)
+
+
+class CompactRecordTest(Mp3TestCase):
+    def setUp(self):
+        super(CompactRecordTest, self).setUp()
+        self.path = self.mp3(corpus.mp3_audio(random.Random(0), "cbr", SECONDS))
+        self.expected = TinyTag.get(self.path).as_dict()
+
+    def test_copy_and_pickle(self):
+        for lazy in (False, True):
+            record = TinyTag.get(self.path, compact=True, lazy=lazy)
+            copies = [copy.copy(record), copy.deepcopy(record), pickle.loads(pickle.dumps(record))]
+            for duplicate in copies:
+                self.assertEqual(duplicate.as_dict(), self.expected, lazy)
+            # decoding the lazy fields of the copies left the record alone
+            self.assertEqual(record.as_dict(), self.expected, lazy)
+
+    def test_copy_after_access(self):
+        record = TinyTag.get(self.path, compact=True, lazy=True)
+        self.assertEqual(record.title, corpus.TAGS["title"])
+        duplicate = copy.copy(record)
+        self.assertEqual(duplicate.artist, corpus.TAGS["artist"])
+        self.assertEqual(duplicate.as_dict(), self.expected)
+        self.assertEqual(pickle.loads(pickle.dumps(record)).as_dict(), self.expected)
+
+    def test_unknown_attributes(self):
+        for tag in (TinyTag.get(self.path), TinyTag.get(self.path, lazy=True),
+                    TinyTag.get(self.path, compact=True), TinyTag.get(self.path, compact=True, lazy=True)):
+            with self.assertRaises(AttributeError):
+                tag.no_such_field
+            self.assertFalse(hasattr(tag, 'no_such_field'))
+            self.assertIsNone(getattr(tag, 'no_such_field', None))
+            # the lazy fields are only looked up for fields
+            with self.assertRaises(AttributeError):
+                tag._lazy_fields_of_another_kind
+
+
+class LazyFieldsTest(CorpusTestCase):
+    # id3 text encoding marker -> tags only that encoding can hold
+    TAGS = {
+        0: dict(corpus.TAGS, title="Caf\xe9 Ol\xe9", artist="M\xf6tley Cr\xfce", album="\xc5ngstr\xf6m",
+                comment="na\xefve"),
+        1: dict(corpus.TAGS, title="\u6771\u4eac Night", artist="\u0411\u0430\u043d\u0434\u0430",
+                album="\u00c5lbum \U0001f3b5", comment="\u65e5\u672c"),
+        3: dict(corpus.TAGS, title="\u6771\u4eac Night", artist="\u0411\u0430\u043d\u0434\u0430",
+                album="\u00c5lbum \U0001f3b5", comment="\u65e5\u672c"),
+    }
+
+    def mp3(self, encoding):
+        audio = corpus.mp3_audio(random.Random(0), "cbr", SECONDS)
+        return self.write("track%d.mp3" % encoding,
+                          corpus.id3v2(3, self.TAGS[encoding], encoding=encoding) + audio)
+
+    def test_decoded_on_first_access(self):
+        for encoding, tags in self.TAGS.items():
+            tag = TinyTag.get(self.mp3(encoding), lazy=True)
+            for field in ("title", "artist", "album", "comment", "year"):
+                self.assertNotIn(field, tag.__dict__, (encoding, field))
+            self.assertEqual(tag.title, tags["title"])
+            self.assertIn("title", tag.__dict__)
+            self.assertNotIn("artist", tag.__dict__)
+            # not a lazy field
+            self.assertEqual(tag.genre, tags["genre"])
+
+    def test_same_results(self):
+        for encoding, tags in self.TAGS.items():
+            path = self.mp3(encoding)
+            eager, lazy = TinyTag.get(path), TinyTag.get(path, lazy=True)
+            self.assertEqual(eager.artist, tags["artist"])
+            self.assertEqual(eager.album, tags["album"])
+            self.assertEqual(eager.comment, tags["comment"])
+            self.assertEqual(lazy.as_dict(), eager.as_dict(), encoding)
+            self.assertEqual(str(TinyTag.get(path, lazy=True)), str(eager), encoding)
+            self.assertEqual(str(TinyTag.get(path, compact=True, lazy=True)),
+                             str(TinyTag.get(path, compact=True)), encoding)
+            updated = []
+            for other in (TinyTag.get(path), TinyTag.get(path, lazy=True)):
+                tag = TinyTag(None, 0)
+                tag.update(other)
+                updated.append(tag.as_dict())
+            self.assertEqual(updated[1], updated[0], encoding)
+            self.assertEqual(updated[0]["title"], tags["title"])
+
+
+if __name__ == '__main__':
+    unittest.main()
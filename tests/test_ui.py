@@ -0,0 +1,185 @@
+"""
+    The browser's connection to the LiveMusicBrowser UI, run on the headless harness.
+"""
+import errno
+import gc
+import os
+import socket
+import sys
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from headless import harness  # noqa: E402
+
+
+class SmallDatagrams(object):
+    """the browser's socket, but datagrams over `limit` bytes fail like they do on macOS"""
+    def __init__(self, sock, limit):
+        self._socket = sock
+        self.limit = limit
+        self.too_big = 0
+
+    def sendto(self, data, address):
+        if len(data) > self.limit:
+            self.too_big += 1
+            raise OSError(errno.EMSGSIZE, "Message too long")
+        return self._socket.sendto(data, address)
+
+    def __getattr__(self, name):
+        return getattr(self._socket, name)
+
+
+class FailedStartTest(unittest.TestCase):
+    def setUp(self):
+        self.h = harness.Harness(library_size=10)
+        self.browser = sys.modules[harness.PACKAGE + ".Browser"]
+
+    def tearDown(self):
+        self.h.close()
+
+    def test_socket_bind_fails(self):
+        unraisable = []
+        with mock.patch.object(socket.socket, "bind", side_effect=OSError(errno.EADDRINUSE, "in use")), \
+                mock.patch.object(sys, "unraisablehook", unraisable.append):
+            with self.assertRaises(OSError):
+                self.browser.BrowserRepresentation(self.h.application.browser, lambda message: None)
+            gc.collect()
+        # __del__ of the half made browser didn't raise
+        self.assertEqual([u.exc_value for u in unraisable], [])
+
+
+class UiProcessTest(unittest.TestCase):
+    def setUp(self):
+        self.h = harness.Harness(library_size=10)
+        self.browser = sys.modules[harness.PACKAGE + ".Browser"]
+        self.log = []
+        self.pings = 0
+        self.clock = harness.Clock()
+        patcher = mock.patch("time.monotonic", self.clock)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        self.h.close()
+
+    def ping(self):
+        self.pings += 1
+
+    def crash(self, ui):
+        """let the started UI crash and return the logged restart delay"""
+        ui._process.wait()
+        del self.log[:]
+        ui.poll()
+        self.assertEqual(self.log[0], "UI exited with 3")
+        return float(self.log[1].split()[-1].rstrip("s"))
+
+    def test_restart_backoff(self):
+        ui = self.browser.UiProcess(["/bin/sh", "-c", "exit 3"], self.log.append, self.ping)
+        ui.start()
+        delays = []
+        for _ in range(7):
+            delays.append(self.crash(ui))
+            self.clock.now += delays[-1] - 0.1
+            ui.poll()
+            self.assertEqual(ui._process, None)
+            self.clock.now += 0.1
+            ui.poll()
+            self.assertNotEqual(ui._process, None)
+        self.assertEqual(delays, [1.0, 2.0, 4.0, 8.0, 16.0, 30.0, 30.0])
+        # a UI that ran for a while before crashing is restarted quickly again
+        self.clock.now += 31.0
+        self.assertEqual(self.crash(ui), 1.0)
+        self.assertEqual(self.pings, 0)
+        ui.stop()
+
+    def test_handshake(self):
+        ui = self.browser.UiProcess(None, self.log.append, self.ping)
+        ui.start()
+        self.assertFalse(ui.is_ready())
+        for _ in range(10):
+            ui.poll()
+            self.clock.now += 0.1
+        # one ping right away and then one every PING_INTERVAL
+        self.assertEqual(self.pings, 2)
+        ui.set_ready()
+        self.assertTrue(ui.is_ready())
+        self.clock.now += 5.0
+        ui.poll()
+        self.assertEqual(self.pings, 2)
+        ui.lost()
+        self.assertFalse(ui.is_ready())
+        ui.poll()
+        self.assertEqual(self.pings, 3)
+
+    def test_resend_after_restart(self):
+        browser = self.h.surface.browser_repr
+        self.h.ui.send({"bpm_filter": False, "key_filter": False})
+        self.h.tick(3)
+        self.h.ui.close()
+        # the UI is gone, so the state is kept until it's back
+        browser.set_current_index(3)
+        browser._update()
+        self.assertFalse(browser._ui.is_ready())
+        browser.set_current_index(5)
+        browser._update()
+        browser._send_diff({"sel_ix": 6})
+        self.h.ui = harness.FakeUi()
+        while not browser._ui.is_ready():
+            self.h.surface.update_display()
+            self.h.ui.drain()
+            self.clock.now += 0.1
+        self.h.tick()
+        # one ping, then only the latest state, once
+        self.assertEqual(self.h.ui.messages, 2)
+        self.assertEqual(self.h.ui.full_updates, 1)
+        self.assertEqual(self.h.ui.diffs, 0)
+        self.assertEqual(self.h.ui.data["sel_ix"], 5)
+        self.assertIsNone(browser._pending)
+
+
+class OversizedStateTest(unittest.TestCase):
+    def setUp(self):
+        self.h = harness.Harness(library_size=60)
+        self.h.ui.send({"bpm_filter": False, "key_filter": False})
+        self.h.tick(3)
+        self.browser = self.h.surface.browser_repr
+        self.log = []
+        self.browser._log = self.log.append
+        self.clock = harness.Clock()
+        patcher = mock.patch("time.monotonic", self.clock)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.socket = SmallDatagrams(self.browser._socket, 2000)
+        self.browser._socket = self.socket
+
+    def tearDown(self):
+        self.h.close()
+
+    def test_state_too_big_for_a_datagram(self):
+        self.assertEqual(len(self.h.ui.data["rows"]), 60)
+        self.h.ui.reset_stats()
+        self.browser._update()
+        self.assertEqual(self.socket.too_big, 1)
+        # the UI is still there, so no handshake and no resending
+        self.assertTrue(self.browser._ui.is_ready())
+        for _ in range(20):
+            self.clock.now += 1.0
+            self.h.tick()
+        self.assertEqual(self.socket.too_big, 1)
+        self.assertEqual(self.h.ui.messages, 0)
+        # a diff would be based on the state the UI didn't get
+        self.browser._send_diff({"sel_ix": 1})
+        self.assertEqual(self.h.ui.diffs, 0)
+        self.assertEqual(self.socket.too_big, 2)
+        self.assertEqual(len([line for line in self.log if "datagram" in line]), 1)
+
+        self.h.ui.send({"filter_artist": "nobody has this name"})
+        self.h.tick(2)
+        self.assertEqual(self.h.ui.full_updates, 1)
+        self.assertEqual(self.h.ui.data["rows"], [])
+        self.assertFalse(self.browser._too_big)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,360 @@
+"""
+    The control surface's bookkeeping of the Live session, run on the headless harness.
+"""
+import math
+import os
+import random
+import sys
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from headless import harness  # noqa: E402
+
+
+class ClipListenerTest(unittest.TestCase):
+    """
+        Every slot of the controlled tracks has one has_clip listener and every clip
+        in them one playing_status listener, whatever was loaded, replaced or deleted
+    """
+    def setUp(self):
+        self.h = harness.Harness(num_tracks=5, num_scenes=4, library_size=20)
+        self.registry = self.h.surface.clip_listeners
+        self.gone = []
+
+    def tearDown(self):
+        self.h.close()
+
+    def check(self):
+        for track_idx, track in enumerate(self.h.song.tracks):
+            controlled = track_idx < 4
+            for slot_idx, slot in enumerate(track.clip_slots):
+                self.assertEqual(slot.listener_count("has_clip"), int(controlled), (track_idx, slot_idx))
+                if slot.has_clip:
+                    self.assertEqual(slot.clip.listener_count("playing_status"), int(controlled),
+                                     (track_idx, slot_idx))
+        for clip in self.gone:
+            self.assertEqual(clip.listener_count("playing_status"), 0)
+
+    def replace(self, track, scene, path):
+        old = self.h.song.tracks[track].clip_slots[scene].clip
+        if old is not None:
+            self.gone.append(old)
+        if path is None:
+            self.h.song.tracks[track].clip_slots[scene].delete_clip()
+        else:
+            self.h.load_clip(track, scene, path)
+
+    def test_load_replace_delete(self):
+        self.check()
+        for track in range(5):
+            self.replace(track, 0, self.h.library[track])
+        self.check()
+        self.replace(1, 0, self.h.library[10])
+        self.replace(2, 0, None)
+        self.replace(2, 0, None)
+        self.replace(3, 2, self.h.library[11])
+        self.h.play(3, 2)
+        self.replace(3, 2, self.h.library[12])
+        self.h.tick()
+        self.check()
+
+        rnd = random.Random(3)
+        for _ in range(200):
+            path = rnd.choice(self.h.library + [None])
+            self.replace(rnd.randrange(5), rnd.randrange(4), path)
+        self.h.tick()
+        self.check()
+
+        # the listeners of a clip loaded into an emptied slot report to its deck
+        self.h.song.tracks[0].clip_slots[1].delete_clip()
+        self.h.load_clip(0, 1, self.h.library[0])
+        self.h.play(0, 1)
+        self.assertTrue(self.h.surface.deck_state.is_playing(0))
+
+        clips = [slot.clip for track in self.h.song.tracks for slot in track.clip_slots if slot.has_clip]
+        slots = [slot for track in self.h.song.tracks for slot in track.clip_slots]
+        self.h.close()
+        self.assertEqual(sum(o.listener_count("playing_status") for o in clips), 0)
+        self.assertEqual(sum(o.listener_count("has_clip") for o in slots), 0)
+
+
+class DeckStateTest(unittest.TestCase):
+    """
+        The deck state kept up to date by the listeners has to be what a full
+        sync() of the session gives, after any sequence of plays, stops and clip
+        replacements
+    """
+    def setUp(self):
+        self.h = harness.Harness(num_tracks=5, num_scenes=3, library_size=20)
+        self.xone = sys.modules[harness.PACKAGE + ".xone"]
+        self.deck_state = self.h.surface.deck_state
+
+    def tearDown(self):
+        self.h.close()
+
+    def assertSynced(self, message):
+        fresh = self.xone.DeckState()
+        fresh.sync(self.h.song.tracks[:4])
+        state = self.deck_state
+        self.assertEqual(state._slots, fresh._slots, message)
+        self.assertEqual(state._clips, fresh._clips, message)
+        self.assertEqual(state.files(), fresh.files(), message)
+        self.assertEqual(state.master(), fresh.master(), message)
+        # and the browser was told
+        browser = self.h.surface.browser_repr
+        self.assertEqual(browser._deck_files, (fresh.files(), fresh.master()), message)
+
+    def step(self, rnd):
+        h = self.h
+        track = rnd.randrange(5)
+        scene = rnd.randrange(3)
+        slot = h.song.tracks[track].clip_slots[scene]
+        r = rnd.random()
+        if r < 0.35:
+            if slot.has_clip:
+                h.play(track, scene, rnd.choice([0.0, 8.0, 16.0, 32.0, 64.0]))
+            return "play %d %d" % (track, scene)
+        elif r < 0.5:
+            h.stop(track)
+            return "stop %d" % track
+        elif r < 0.6:
+            slot.fire()
+            h.launch_triggered()
+            return "launch %d %d" % (track, scene)
+        elif r < 0.75:
+            path = rnd.choice(h.library + [None])
+            clip = h.live.Clip(path)
+            h.song.tracks[track].clip_slots[scene].set_clip(clip)
+            return "replace %d %d with %s" % (track, scene, path)
+        elif r < 0.85:
+            slot.delete_clip()
+            return "delete %d %d" % (track, scene)
+        else:
+            h.tick()
+            return "tick"
+
+    def test_incremental_matches_sync(self):
+        rnd = random.Random(7)
+        for track in range(5):
+            for scene in range(3):
+                self.h.load_clip(track, scene, rnd.choice(self.h.library))
+        self.assertSynced("loaded")
+        for i in range(2000):
+            action = self.step(rnd)
+            self.assertSynced("step %d: %s" % (i, action))
+
+
+class LedShadowTest(unittest.TestCase):
+    """the LED messages that go out on each tick"""
+    def setUp(self):
+        self.h = harness.Harness(library_size=10)
+        self.xone = sys.modules[harness.PACKAGE + ".xone"]
+        self.leds = self.h.surface.leds
+        self.red = self.xone.Color.RED
+        self.h.tick(5)
+
+    def tearDown(self):
+        self.h.close()
+
+    def tick(self):
+        """the note on messages on the K2's channel the next tick sends"""
+        del self.h.sent_midi[:]
+        self.h.tick()
+        return [msg for msg in self.h.sent_midi if msg[0] == 144 + self.xone.CHANNEL]
+
+    def test_only_changes_are_sent(self):
+        self.assertEqual(self.tick(), [])
+        for _ in range(3):
+            self.leds.set(1, self.red)
+        self.assertEqual(self.tick(), [(158, 1, 127)])
+        self.assertEqual(self.tick(), [])
+        # changed and changed back before the tick
+        self.leds.set(1, self.xone.Color.GREEN)
+        self.leds.set(1, self.red)
+        self.assertEqual(self.tick(), [])
+        # switching off only needs the lit color
+        self.leds.set(1)
+        self.assertEqual(self.tick(), [(158, 1, 0)])
+
+    def test_messages_per_tick_are_capped(self):
+        cap = self.xone.MAX_LED_MESSAGES_PER_TICK
+        for notenr in range(1, 31):
+            self.leds.set(notenr + 60, self.red)
+        first = self.tick()
+        self.assertEqual(first, [(158, n, 127) for n in range(61, 61 + cap)])
+        self.assertEqual(self.tick(), [(158, n, 127) for n in range(61 + cap, 91)])
+        self.assertEqual(self.tick(), [])
+        # an LED in an unknown state takes three messages, which aren't split over ticks
+        for notenr in range(1, 11):
+            self.leds.set(notenr)
+        sent = [self.tick(), self.tick(), self.tick()]
+        self.assertEqual([len(messages) for messages in sent], [cap, 30 - cap, 0])
+        self.assertEqual(sent[0][-3:], [(158, 8, 0), (158, 8 + 36, 0), (158, 8 + 72, 0)])
+
+    def test_resent_after_release(self):
+        button = self.xone.ButtonWithLight(1)
+        self.leds.set(1, self.red)
+        self.assertEqual(len(self.tick()), 1)
+        # the framework may have lit it while it was mapped
+        button.release_parameter()
+        self.assertEqual(self.tick(), [(158, 1, 0), (158, 37, 0), (158, 73, 0)])
+        self.leds.set(1, self.red)
+        self.assertEqual(self.tick(), [(158, 1, 127)])
+
+    def test_refresh_state_resends_everything(self):
+        self.leds.set(1, self.red)
+        self.tick()
+        expected = sum(1 if color is not None else 3 for color, _ in self.leds._wanted.values())
+        self.assertGreater(expected, self.xone.MAX_LED_MESSAGES_PER_TICK)
+        self.h.surface.refresh_state()
+        sent = []
+        while True:
+            messages = self.tick()
+            if not messages:
+                break
+            self.assertLessEqual(len(messages), self.xone.MAX_LED_MESSAGES_PER_TICK)
+            sent.extend(messages)
+        self.assertEqual(len(sent), expected)
+        self.assertIn((158, 1, 127), sent)
+        self.assertEqual(self.tick(), [])
+
+
+class ParameterWriteTest(unittest.TestCase):
+    """fader moves coming in faster than COALESCE_INTERVAL are written once per interval"""
+    def setUp(self):
+        self.h = harness.Harness(library_size=10)
+        self.xone = sys.modules[harness.PACKAGE + ".xone"]
+        self.volume = self.h.song.tracks[0].mixer_device.volume
+        self.interval = self.xone.COALESCE_INTERVAL["Fader"]
+        self.clock = harness.Clock()
+        patcher = mock.patch("time.monotonic", self.clock)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        self.h.close()
+
+    def fader(self, value):
+        self.h.midi((176 + self.xone.CHANNEL, self.xone.FADERS[0], value))
+        return 0.85 * ((value / 127.0) ** 0.5)
+
+    def test_burst_is_coalesced(self):
+        self.fader(0)
+        self.assertEqual(self.volume.writes, 1)
+        writes = self.volume.writes
+        start = self.clock.now
+        # 100 moves in 0.1s
+        for value in range(1, 101):
+            self.clock.now += 0.001
+            expected = self.fader(value)
+            if self.volume.writes > writes:
+                # what's written is the latest value
+                self.assertEqual(self.volume.writes, writes + 1)
+                self.assertEqual(self.volume.value, expected)
+                writes = self.volume.writes
+        self.assertLessEqual(writes - 1, math.ceil((self.clock.now - start) / self.interval))
+        self.assertNotEqual(self.volume.value, expected)
+        # the flush on the next tick writes the last value
+        self.h.tick()
+        self.assertEqual(self.volume.value, expected)
+        self.assertEqual(self.volume.writes, writes + 1)
+        self.h.tick()
+        self.assertEqual(self.volume.writes, writes + 1)
+
+    def test_last_value_is_never_dropped(self):
+        rnd = random.Random(11)
+        start = self.clock.now
+        ticks = moves = 0
+        expected = None
+        for _ in range(2000):
+            self.clock.now += rnd.uniform(0.0, 0.005)
+            if rnd.random() < 0.1:
+                self.h.tick()
+                ticks += 1
+                if expected is not None:
+                    self.assertEqual(self.volume.value, expected)
+            else:
+                expected = self.fader(rnd.randrange(128))
+                moves += 1
+        self.h.tick()
+        self.assertEqual(self.volume.value, expected)
+        # one write per interval, plus one per tick at most for the values left over
+        elapsed = self.clock.now - start
+        self.assertLessEqual(self.volume.writes, elapsed / self.interval + ticks + 2)
+        self.assertLess(self.volume.writes, moves / 2)
+
+
+class MixerDevicesTest(unittest.TestCase):
+    """
+        A change to one track's devices only touches the device and EQ components
+        of that track's strip, and the encoders connected through them
+    """
+    def setUp(self):
+        # three tracks for four strips, the last one has no track
+        self.h = harness.Harness(num_tracks=3, library_size=10)
+        self.live = self.h.live
+        self.mixer = self.h.surface.mixer
+        for track in self.h.song.tracks[:2]:
+            track.set_devices([self.live.Device("OriginalSimpler"), self.live.eq_three()])
+
+    def tearDown(self):
+        self.h.close()
+
+    def state(self, i):
+        dev, eq = self.mixer.devices[i], self.mixer.eqs[i]
+        return (dev["component"].lock_changes, eq["component"].lock_changes,
+                [control.mapped_parameter() if control is not None else None
+                 for control in eq["component"]._parameter_controls])
+
+    def check_only(self, changed, before):
+        for i in range(4):
+            if i not in changed:
+                self.assertEqual(self.state(i), before[i], "strip %d" % i)
+        for track in self.h.song.tracks:
+            self.assertEqual(track.listener_count("devices"), 2)
+
+    def test_device_change(self):
+        before = [self.state(i) for i in range(4)]
+        targets = [encoder.target for encoder in self.mixer.encoders]
+        self.assertEqual(targets, self.h.song.tracks[0].devices[0].parameters[1:5])
+        track = self.h.song.tracks[1]
+        device = self.live.Device("Operator")
+        track.set_devices([device] + track.devices)
+        self.check_only([1], before)
+        self.assertEqual(self.state(1)[0], before[1][0] + 1)
+        self.assertEqual(self.state(1)[1:], before[1][1:])
+        self.assertIs(self.mixer.devices[1]["device"], device)
+        # the encoders follow the selected track only
+        self.assertEqual([encoder.target for encoder in self.mixer.encoders], targets)
+        self.h.song.view.selected_track = track
+        self.assertEqual([encoder.target for encoder in self.mixer.encoders], device.parameters[1:5])
+
+    def test_eq_change(self):
+        before = [self.state(i) for i in range(4)]
+        track = self.h.song.tracks[0]
+        eq = self.live.eq_three()
+        track.set_devices([track.devices[0], eq])
+        self.check_only([0], before)
+        lock_changes, eq_lock_changes, controls = self.state(0)
+        self.assertEqual(lock_changes, before[0][0])
+        self.assertEqual(eq_lock_changes, before[0][1] + 1)
+        # gains and cut buttons, the fourth control is unused
+        self.assertEqual(controls, eq.parameters[1:4] + [None] + eq.parameters[5:8])
+
+    def test_track_without_devices(self):
+        before = [self.state(i) for i in range(4)]
+        self.assertEqual(self.mixer.devices[2]["device"], None)
+        # no device before and after, so only the EQ changes
+        eq = self.live.eq_three()
+        self.h.song.tracks[2].set_devices([eq])
+        self.check_only([2], before)
+        self.assertEqual(self.state(2)[0], before[2][0])
+        self.assertEqual(self.state(2)[1], before[2][1] + 1)
+        # the strip without a track was never touched
+        self.assertEqual(self.state(3), (0, 0, [None] * 7))
+        self.assertIsNone(self.mixer.devices[3]["track"])
+
+
+if __name__ == '__main__':
+    unittest.main()
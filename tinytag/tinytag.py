@@ -77,6 +77,49 @@ def _bytes_to_int(b):
     return reduce(lambda accu, elem: (accu << 8) + elem, b, 0)
 
 
+def _decode_id3_string(bytestr, default_encoding=None, ignore_errors=False):
+    # decodes the content of an ID3 text frame, the first byte is the encoding marker
+    default_encoding = default_encoding or 'ISO-8859-1'
+    try:  # it's not my fault, this is the spec.
+        first_byte = bytestr[:1]
+        if first_byte == b'\x00':  # ISO-8859-1
+            bytestr = bytestr[1:]
+            encoding = default_encoding
+        elif first_byte == b'\x01':  # UTF-16 with BOM
+            bytestr = bytestr[1:]
+            # remove language (but leave BOM)
+            if bytestr[3:5] in (b'\xfe\xff', b'\xff\xfe'):
+                bytestr = bytestr[3:]
+            if bytestr[:3].isalpha() and bytestr[3:4] == b'\x00':
+                bytestr = bytestr[4:]  # remove language
+            if bytestr[:1] == b'\x00':
+                bytestr = bytestr[1:]  # strip optional additional null byte
+            # read byte order mark to determine endianess
+            encoding = 'UTF-16be' if bytestr[0:2] == b'\xfe\xff' else 'UTF-16le'
+            # strip the bom if it exists
+            if bytestr[:2] in (b'\xfe\xff', b'\xff\xfe'):
+                bytestr = bytestr[2:] if len(bytestr) % 2 == 0 else bytestr[2:-1]
+            # remove ADDITIONAL EXTRA BOM :facepalm:
+            if bytestr[:4] == b'\x00\x00\xff\xfe':
+                bytestr = bytestr[4:]
+        elif first_byte == b'\x02':  # UTF-16LE
+            # strip optional null byte, if byte count uneven
+            bytestr = bytestr[1:-1] if len(bytestr) % 2 == 0 else bytestr[1:]
+            encoding = 'UTF-16le'
+        elif first_byte == b'\x03':  # UTF-8
+            bytestr = bytestr[1:]
+            encoding = 'UTF-8'
+        else:
+            bytestr = bytestr
+            encoding = default_encoding  # wild guess
+        if bytestr[:3].isalpha() and bytestr[3:4] == b'\x00':
+            bytestr = bytestr[4:]  # remove language
+        errors = 'ignore' if ignore_errors else 'strict'
+        return TinyTag._unpad(codecs.decode(bytestr, encoding, errors))
+    except UnicodeDecodeError:
+        raise TinyTagException('Error decoding ID3 Tag!')
+
+
 class TinyTag(object):
     def __init__(self, filehandler, filesize, ignore_errors=False):
         # This is required for compatibility between python2 and python3
@@ -111,10 +154,25 @@ class TinyTag(object):
         self._load_image = False
         self._image_data = None
         self._ignore_errors = ignore_errors
+        self._exact_duration = False
+        self._lazy = False
+        self._lazy_fields = {}  # fieldname -> arguments for _decode_id3_string
 
     def as_dict(self):
+        for fieldname in list(self._lazy_fields):
+            getattr(self, fieldname)  # decode all lazy fields
         return {k: v for k, v in self.__dict__.items() if not k.startswith('_')}
 
+    def __getattr__(self, name):
+        # only called for attributes that don't exist, which is the case for
+        # lazy fields until they are accessed for the first time
+        lazy_fields = self.__dict__.get('_lazy_fields')
+        if lazy_fields and name in lazy_fields:
+            value = _decode_id3_string(*lazy_fields.pop(name))
+            setattr(self, name, value)
+            return value
+        raise AttributeError(name)
+
     @classmethod
     def is_supported(cls, filename):
         return cls._get_parser_for_filename(filename) is not None
@@ -174,7 +232,7 @@ class TinyTag(object):
 
     @classmethod
     def get(cls, filename, tags=True, duration=True, image=False, ignore_errors=False,
-            encoding=None):
+            encoding=None, exact_duration=False, compact=False, lazy=False):
         try:  # cast pathlib.Path to str
             import pathlib
             if isinstance(filename, pathlib.Path):
@@ -185,14 +243,18 @@ class TinyTag(object):
             filename = os.path.expanduser(filename)
         size = os.path.getsize(filename)
         if not size > 0:
-            return TinyTag(None, 0)
+            return TinyTagRecord(TinyTag(None, 0)) if compact else TinyTag(None, 0)
         with io.open(filename, 'rb') as af:
             parser_class = cls.get_parser_class(filename, af)
             tag = parser_class(af, size, ignore_errors=ignore_errors)
             tag._filename = filename
             tag._default_encoding = encoding
+            tag._exact_duration = exact_duration  # only used by mp3 for now
+            tag._lazy = lazy  # only used by id3 for now
             tag.load(tags=tags, duration=duration, image=image)
             tag.extra = dict(tag.extra)  # turn default dict into dict so that it can throw KeyError
+            if compact:  # drop the parser and file handle, only keep the results
+                return TinyTagRecord(tag)
             return tag
 
     def __str__(self):
@@ -223,6 +285,8 @@ class TinyTag(object):
             write_dest = self.extra  # write into the extra field instead
             get_func = operator.getitem
             set_func = operator.setitem
+        elif fieldname in self._lazy_fields:  # do not overwrite existing data
+            return
         if get_func(write_dest, fieldname):  # do not overwrite existing data
             return
         value = bytestring if transfunc is None else transfunc(bytestring)
@@ -249,6 +313,17 @@ class TinyTag(object):
             if overwrite or not get_func(write_dest, k):
                 set_func(write_dest, k, v)
 
+    def _set_lazy_field(self, fieldname, bytestring):
+        """like _set_field, but only keeps the raw id3 text frame content, which
+        is decoded when the field is accessed for the first time"""
+        if fieldname in self._lazy_fields or getattr(self, fieldname):
+            return  # do not overwrite existing data
+        del self.__dict__[fieldname]  # make the next access go through __getattr__
+        self._lazy_fields[fieldname] = (bytestring, self._default_encoding, self._ignore_errors)
+
+    def _has_field(self, fieldname):
+        return fieldname in self._lazy_fields or bool(getattr(self, fieldname))
+
     def _determine_duration(self, fh):
         raise NotImplementedError()
 
@@ -262,6 +337,9 @@ class TinyTag(object):
                     'genre', 'disc', 'disc_total', 'comment', 'composer']:
             if not getattr(self, key) and getattr(other, key):
                 setattr(self, key, getattr(other, key))
+        for key, value in other.extra.items():
+            if not self.extra.get(key) and value:
+                self.extra[key] = value
 
     @staticmethod
     def _unpad(s):
@@ -269,6 +347,54 @@ class TinyTag(object):
         return s.replace('\x00', '')
 
 
+class TinyTagRecord(object):
+    """The public fields of a TinyTag without the parser state. Uses slots
+    instead of a dict per instance, so holding on to the results for large
+    music libraries is a lot cheaper. Returned by `TinyTag.get(compact=True)`"""
+    FIELDS = ('album', 'albumartist', 'artist', 'audio_offset', 'bitrate', 'channels',
+              'comment', 'composer', 'disc', 'disc_total', 'duration', 'extra',
+              'filesize', 'genre', 'samplerate', 'title', 'track', 'track_total', 'year')
+    __slots__ = FIELDS + ('_image_data', '_lazy_fields')
+
+    def __init__(self, tag):
+        lazy_fields = {k: v for k, v in tag._lazy_fields.items() if k not in tag.__dict__}
+        for field in TinyTagRecord.FIELDS:
+            if field not in lazy_fields:  # lazy fields stay unset until accessed
+                setattr(self, field, getattr(tag, field))
+        self._lazy_fields = lazy_fields or None
+        if self.genre:  # there are usually only few distinct genres in a library
+            self.genre = sys.intern(self.genre)
+        self._image_data = tag.get_image()
+
+    def as_dict(self):
+        return {k: getattr(self, k) for k in TinyTagRecord.FIELDS}
+
+    def __getattr__(self, name):
+        # only called for unset slots, i.e. lazy fields that haven't been accessed yet.
+        # copy and pickle look up methods on instances that don't have any slots set,
+        # so _lazy_fields itself may be unset too
+        try:
+            lazy_fields = object.__getattribute__(self, '_lazy_fields')
+        except AttributeError:
+            raise AttributeError(name) from None
+        if lazy_fields and name in lazy_fields:
+            value = _decode_id3_string(*lazy_fields[name])
+            setattr(self, name, value)
+            # copies share the dict, leave it alone
+            self._lazy_fields = {k: v for k, v in lazy_fields.items() if k != name} or None
+            return value
+        raise AttributeError(name)
+
+    def get_image(self):
+        return self._image_data
+
+    def __str__(self):
+        return json.dumps(OrderedDict(sorted(self.as_dict().items())))
+
+    def __repr__(self):
+        return str(self)
+
+
 class MP4(TinyTag):
     # https://developer.apple.com/library/mac/documentation/QuickTime/QTFF/Metadata/Metadata.html
     # https://developer.apple.com/library/mac/documentation/QuickTime/QTFF/QTFFChap2/qtff2.html
@@ -501,10 +627,14 @@ class ID3(TinyTag):
         'USLT': 'extra.lyrics',
     }
     IMAGE_FRAME_IDS = {'APIC', 'PIC'}
+    # plain text fields that can be decoded on first access, see `TinyTag.get(lazy=True)`
+    LAZY_FIELDS = {'album', 'albumartist', 'artist', 'comment', 'composer', 'title', 'year'}
     PARSABLE_FRAME_IDS = set(FRAME_ID_TO_FIELD.keys()).union(IMAGE_FRAME_IDS)
     _MAX_ESTIMATION_SEC = 30
     _CBR_DETECTION_FRAME_COUNT = 5
     _USE_XING_HEADER = True  # much faster, but can be deactivated for testing
+    _EXACT_SCAN_BLOCK_SIZE = 256 * 1024  # bytes read at once when counting all frames
+    _FRAME_TABLE = None  # (frame lengths, samples per frame), built on first exact scan
 
     ID3V1_GENRES = [
         'Blues', 'Classic Rock', 'Country', 'Dance', 'Disco',
@@ -604,11 +734,117 @@ class ID3(TinyTag):
             vbr_scale = struct.unpack('>i', fh.read(4))[0]
         return frames, byte_count, toc, vbr_scale
 
+    @staticmethod
+    def _parse_vbri_header(fh):
+        # Fraunhofer VBR header, always 32 bytes after the frame header, see:
+        # https://www.codeproject.com/Articles/8295/MPEG-Audio-Frame-Header#VBRIHeader
+        fh.seek(4, os.SEEK_CUR)  # read over VBRI header
+        version, delay, quality, byte_count, frames = struct.unpack('>HHHII', fh.read(14))
+        return frames, byte_count
+
+    @classmethod
+    def _frame_table(cls):
+        # lookup tables indexed by the 2nd and 3rd byte of a frame header,
+        # so that the frame scanner doesn't have to decode each header.
+        # a length of 0 marks an invalid header.
+        if ID3._FRAME_TABLE is None:
+            lengths = [0] * 0x10000
+            samples = [0] * 0x10000
+            for index in range(0xE000, 0x10000):  # the first 3 bits are sync bits
+                conf, bitrate_freq = index >> 8, index & 0xFF
+                mpeg_id = (conf >> 3) & 0x03
+                layer_id = (conf >> 1) & 0x03
+                br_id = (bitrate_freq >> 4) & 0x0F
+                sr_id = (bitrate_freq >> 2) & 0x03
+                padding = 1 if bitrate_freq & 0x02 > 0 else 0
+                if br_id > 14 or br_id == 0 or sr_id == 3 or layer_id == 0 or mpeg_id == 1:
+                    continue
+                bitrate = cls.bitrate_by_version_by_layer[mpeg_id][layer_id][br_id] * 1000
+                samplerate = cls.samplerates[mpeg_id][sr_id]
+                if layer_id == 3:  # Layer I, padding slot is 4 bytes
+                    lengths[index] = (12 * bitrate // samplerate + padding) * 4
+                    samples[index] = 384
+                elif layer_id == 2 or mpeg_id == 3:  # Layer II or MPEG 1 Layer III
+                    lengths[index] = 144 * bitrate // samplerate + padding
+                    samples[index] = 1152
+                else:  # MPEG 2 / 2.5 Layer III
+                    lengths[index] = 72 * bitrate // samplerate + padding
+                    samples[index] = 576
+            ID3._FRAME_TABLE = lengths, samples
+        return ID3._FRAME_TABLE
+
+    def _determine_exact_duration(self, fh):
+        # count every frame instead of extrapolating from the first ones. The
+        # stream is read in large blocks and the frame headers are looked up
+        # in precomputed tables, which keeps the per frame work minimal.
+        lengths, samples_per_frame = self._frame_table()
+        end = self.filesize
+        if end > 128:
+            fh.seek(-128, os.SEEK_END)
+            if fh.read(3) == b'TAG':  # don't scan into the id3v1 tag
+                end -= 128
+        block_size = ID3._EXACT_SCAN_BLOCK_SIZE
+        pos = self._bytepos_after_id3v2
+        buf, buf_start, buf_end = b'', pos, pos
+        frames = samples = 0
+        first_frame = last_frame_end = None
+        synced = False  # after garbage, require two consecutive frames to resync
+        while pos < end:
+            if pos + 3 > buf_end:
+                fh.seek(pos)
+                buf = fh.read(min(block_size, end - pos))
+                buf_start, buf_end = pos, pos + len(buf)
+                if len(buf) < 3:
+                    break
+            i = pos - buf_start
+            if buf[i] == 0xFF:
+                index = (buf[i + 1] << 8) | buf[i + 2]
+                length = lengths[index]
+                if length and not synced:
+                    n = i + length
+                    synced = (n + 3 > len(buf) or
+                              (buf[n] == 0xFF and lengths[(buf[n + 1] << 8) | buf[n + 2]]))
+                if length and synced:
+                    if first_frame is None:
+                        first_frame = pos, index
+                    frames += 1
+                    samples += samples_per_frame[index]
+                    pos += length
+                    last_frame_end = pos
+                    continue
+            synced = False
+            idx = buf.find(b'\xFF', i + 1)  # invalid frame, find next sync header
+            pos = buf_start + idx if idx != -1 else buf_end
+        if first_frame is None:
+            return
+        first_pos, index = first_frame
+        fh.seek(first_pos)
+        header = fh.read(4)
+        first_frame_data = header + fh.read(min(lengths[index], 192) - 4)
+        conf, rest = header[1], header[3]
+        mpeg_id, sr_id = (conf >> 3) & 0x03, (header[2] >> 2) & 0x03
+        self.channels = self.channels_per_channel_mode[(rest >> 6) & 0x03]
+        self.samplerate = ID3.samplerates[mpeg_id][sr_id]
+        self.audio_offset = first_pos
+        # a Xing/Info/VBRI frame doesn't contain any audio
+        if (b'Xing' in first_frame_data or b'Info' in first_frame_data
+                or first_frame_data[36:40] == b'VBRI'):
+            frames -= 1
+            samples -= samples_per_frame[index]
+            self.audio_offset += lengths[index]
+        self.duration = samples / float(self.samplerate)
+        if self.duration > 0:
+            self.bitrate = (last_frame_end - self.audio_offset) * 8 / self.duration / 1000
+
     def _determine_duration(self, fh):
         # if tag reading was disabled, find start position of audio data
         if self._bytepos_after_id3v2 is None:
             self._parse_id3v2_header(fh)
 
+        if self._exact_duration:
+            self._determine_exact_duration(fh)
+            return
+
         max_estimation_frames = (ID3._MAX_ESTIMATION_SEC * 44100) // ID3.samples_per_frame
         frame_size_accu = 0
         header_bytes = 4
@@ -663,6 +899,21 @@ class ID3(TinyTag):
                         self.audio_offset = fh.tell()
                         return
                     continue
+                # no Xing header, but there might be a VBRI header instead. peek() only
+                # promises what is left in the buffer, so read it from where it sits
+                frame_start = fh.tell()
+                fh.seek(36, os.SEEK_CUR)
+                if fh.read(4) == b'VBRI':
+                    fh.seek(-4, os.SEEK_CUR)
+                    vframes, byte_count = ID3._parse_vbri_header(fh)
+                    if vframes and byte_count:
+                        samples_per_frame = 576 if mpeg_id <= 2 else ID3.samples_per_frame
+                        self.duration = vframes * samples_per_frame / float(self.samplerate)
+                        self.bitrate = byte_count * 8 / self.duration / 1000
+                        self.audio_offset = fh.tell()
+                        return
+                    continue
+                fh.seek(frame_start)
 
             frames += 1  # it's most probably an mp3 frame
             bitrate_accu += frame_bitrate
@@ -694,7 +945,7 @@ class ID3(TinyTag):
     def _parse_tag(self, fh):
         self._parse_id3v2(fh)
         attrs = ['track', 'track_total', 'title', 'artist', 'album', 'albumartist', 'year', 'genre']
-        has_all_tags = all(getattr(self, attr) for attr in attrs)
+        has_all_tags = all(self._has_field(attr) for attr in attrs)
         if not has_all_tags and self.filesize > 128:
             fh.seek(-128, os.SEEK_END)  # try parsing id3v1 in last 128 bytes
             self._parse_id3v1(fh)
@@ -768,7 +1019,7 @@ class ID3(TinyTag):
         if len(frame_header_data) != frame_header_size:
             return 0
         frame = struct.unpack(binformat, frame_header_data)
-        frame_id = self._decode_string(frame[0])
+        frame_id = codecs.decode(frame[0], 'ISO-8859-1')  # frame ids are plain ascii
         frame_size = self._calc_size(frame[1:1 + frame_size_bytes], bits_per_byte)
         if DEBUG:
             stderr('Found id3 Frame %s at %d-%d of %d' %
@@ -780,7 +1031,9 @@ class ID3(TinyTag):
                 return frame_size
             content = fh.read(frame_size)
             fieldname = ID3.FRAME_ID_TO_FIELD.get(frame_id)
-            if fieldname:
+            if fieldname in ID3.LAZY_FIELDS and self._lazy:
+                self._set_lazy_field(fieldname, content)
+            elif fieldname:
                 self._set_field(fieldname, content, self._decode_string)
             elif frame_id in self.IMAGE_FRAME_IDS and self._load_image:
                 # See section 4.14: http://id3.org/id3v2.4.0-frames
@@ -798,47 +1051,7 @@ class ID3(TinyTag):
         return 0
 
     def _decode_string(self, bytestr):
-        default_encoding = 'ISO-8859-1'
-        if self._default_encoding:
-            default_encoding = self._default_encoding
-        try:  # it's not my fault, this is the spec.
-            first_byte = bytestr[:1]
-            if first_byte == b'\x00':  # ISO-8859-1
-                bytestr = bytestr[1:]
-                encoding = default_encoding
-            elif first_byte == b'\x01':  # UTF-16 with BOM
-                bytestr = bytestr[1:]
-                # remove language (but leave BOM)
-                if bytestr[3:5] in (b'\xfe\xff', b'\xff\xfe'):
-                    bytestr = bytestr[3:]
-                if bytestr[:3].isalpha() and bytestr[3:4] == b'\x00':
-                    bytestr = bytestr[4:]  # remove language
-                if bytestr[:1] == b'\x00':
-                    bytestr = bytestr[1:]  # strip optional additional null byte
-                # read byte order mark to determine endianess
-                encoding = 'UTF-16be' if bytestr[0:2] == b'\xfe\xff' else 'UTF-16le'
-                # strip the bom if it exists
-                if bytestr[:2] in (b'\xfe\xff', b'\xff\xfe'):
-                    bytestr = bytestr[2:] if len(bytestr) % 2 == 0 else bytestr[2:-1]
-                # remove ADDITIONAL EXTRA BOM :facepalm:
-                if bytestr[:4] == b'\x00\x00\xff\xfe':
-                    bytestr = bytestr[4:]
-            elif first_byte == b'\x02':  # UTF-16LE
-                # strip optional null byte, if byte count uneven
-                bytestr = bytestr[1:-1] if len(bytestr) % 2 == 0 else bytestr[1:]
-                encoding = 'UTF-16le'
-            elif first_byte == b'\x03':  # UTF-8
-                bytestr = bytestr[1:]
-                encoding = 'UTF-8'
-            else:
-                bytestr = bytestr
-                encoding = default_encoding  # wild guess
-            if bytestr[:3].isalpha() and bytestr[3:4] == b'\x00':
-                bytestr = bytestr[4:]  # remove language
-            errors = 'ignore' if self._ignore_errors else 'strict'
-            return self._unpad(codecs.decode(bytestr, encoding, errors))
-        except UnicodeDecodeError:
-            raise TinyTagException('Error decoding ID3 Tag!')
+        return _decode_id3_string(bytestr, self._default_encoding, self._ignore_errors)
 
     def _calc_size(self, bytestr, bits_per_byte):
         # length of some mp3 header fields is described by 7 or 8-bit-bytes
@@ -852,10 +1065,18 @@ class Ogg(TinyTag):
         self._max_samplenum = 0  # maximum sample position ever read
 
     def _determine_duration(self, fh):
-        max_page_size = 65536  # https://xiph.org/ogg/doc/libogg/ogg_page.html
         if not self._tags_parsed:
             self._parse_tag(fh)  # determine sample rate
             fh.seek(0)           # and rewind to start
+        if not self.samplerate:
+            return
+        granule_pos = self._find_last_granule_position(fh)
+        if granule_pos is not None:
+            self._max_samplenum = max(self._max_samplenum, granule_pos)
+            self.duration = self._max_samplenum / self.samplerate
+            return
+        # no usable page found at the end of the file, parse all remaining pages instead
+        max_page_size = 65536  # https://xiph.org/ogg/doc/libogg/ogg_page.html
         if self.filesize > max_page_size:
             fh.seek(-max_page_size, 2)  # go to last possible page position
         while True:
@@ -871,7 +1092,31 @@ class Ogg(TinyTag):
                 seekpos = idx if idx != -1 else len(b) - 3
                 fh.seek(max(seekpos, 1), os.SEEK_CUR)
 
+    def _find_last_granule_position(self, fh):
+        # the granule position of the last page is the total number of samples,
+        # so scan backwards from the end of the file for the last page header
+        # instead of parsing all pages at the end of the file.
+        max_page_size = 65536  # https://xiph.org/ogg/doc/libogg/ogg_page.html
+        block_size = 4096
+        end = self.filesize
+        data = b''
+        while end > 0 and len(data) < max_page_size:
+            start = max(end - block_size, 0)
+            fh.seek(start)
+            data = fh.read(end - start) + data
+            # only search the new block, plus the bytes a header can reach into the previous one
+            idx = data.rfind(b'OggS', 0, end - start + 3)
+            while idx != -1:
+                if len(data) - idx >= 14:
+                    version, flags, pos = struct.unpack('<BBq', data[idx + 4:idx + 14])
+                    if version == 0 and pos >= 0:  # -1 means no packet ends on this page
+                        return pos
+                idx = data.rfind(b'OggS', 0, idx)
+            end = start
+        return None
+
     def _parse_tag(self, fh):
+        self._tags_parsed = True
         page_start_pos = fh.tell()  # set audio_offest later if its audio data
         for packet in self._parse_pages(fh):
             walker = BytesIO(packet)
@@ -881,6 +1126,8 @@ class Ogg(TinyTag):
                 if not self.audio_offset:
                     self.bitrate = bitrate / 1000
                     self.audio_offset = page_start_pos
+                if not self._parse_tags:
+                    break  # the identification header is all we need for the duration
             elif packet[0:7] == b"\x03vorbis" and self._parse_tags:
                 walker.seek(7, os.SEEK_CUR)  # jump over header name
                 self._parse_vorbis_comment(walker)
@@ -892,6 +1139,8 @@ class Ogg(TinyTag):
                 if (version & 0xF0) == 0:  # only major version 0 supported
                     self.channels = ch
                     self.samplerate = 48000  # internally opus always uses 48khz
+                if not self._parse_tags:
+                    break  # the identification header is all we need for the duration
             elif packet[0:8] == b'OpusTags' and self._parse_tags:  # parse opus metadata:
                 walker.seek(8, os.SEEK_CUR)  # jump over header name
                 self._parse_vorbis_comment(walker)
@@ -918,6 +1167,8 @@ class Ogg(TinyTag):
             'genre': 'genre',
             'description': 'comment',
             'composer': 'composer',
+            'bpm': 'extra.bpm',
+            'initialkey': 'extra.initial_key',
         }
         vendor_length = struct.unpack('I', fh.read(4))[0]
         fh.seek(vendor_length, os.SEEK_CUR)  # jump over vendor
@@ -1067,6 +1318,13 @@ class Flac(TinyTag):
 
     def _determine_duration(self, fh):
         # for spec, see https://xiph.org/flac/ogg_mapping.html
+        # STREAMINFO is mandatory and always comes first, so unless tags or the
+        # image are wanted, we can stop reading right after it.
+        blocks_needed = {Flac.METADATA_STREAMINFO}
+        if self._parse_tags:
+            blocks_needed.add(Flac.METADATA_VORBIS_COMMENT)
+        if self._load_image:
+            blocks_needed.add(Flac.METADATA_PICTURE)
         header_data = fh.read(4)
         while len(header_data):
             meta_header = struct.unpack('B3B', header_data)
@@ -1126,7 +1384,8 @@ class Flac(TinyTag):
                     stderr('Unknown FLAC block type', block_type)
                 fh.seek(size, 1)  # seek over this block
 
-            if is_last_block:
+            blocks_needed.discard(block_type)
+            if is_last_block or not blocks_needed:
                 return
             header_data = fh.read(4)
 
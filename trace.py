@@ -0,0 +1,112 @@
+"""
+    Opt-in recording of the MIDI messages the K2 sends, for replaying a real set
+    against the script outside of Live (see benchmarks/replay.py).
+
+    Set XONEK2_TRACE before starting Live to a file to write the trace to, or to a
+    directory to get a new, timestamped file in it for every session. Messages are
+    buffered in memory and written once per tick, never from the MIDI handler.
+
+    A trace is MAGIC, a header with the format version and the wall clock time the
+    recording started at, then one fixed size record per message: microseconds
+    since the start and the three MIDI bytes.
+"""
+import os
+import struct
+import time
+
+from XoneK2_DJ import diagnostics
+
+ENV_VAR = "XONEK2_TRACE"
+MAGIC = b"XK2TRACE"
+FORMAT_VERSION = 1
+HEADER = struct.Struct("<Hd")
+EVENT = struct.Struct("<QBBB")
+
+g_switch = diagnostics.Switch(ENV_VAR)
+
+
+class TraceWriter():
+    def __init__(self, path, started_at=None):
+        self._file = open(path, "wb")
+        self._file.write(MAGIC + HEADER.pack(FORMAT_VERSION, started_at if started_at is not None else time.time()))
+        self._buffer = bytearray()
+
+    def add(self, microseconds, midi_bytes):
+        self._buffer += EVENT.pack(microseconds, *midi_bytes)
+
+    def flush(self):
+        if self._buffer:
+            self._file.write(self._buffer)
+            self._file.flush()
+            self._buffer = bytearray()
+
+    def close(self):
+        self.flush()
+        self._file.close()
+
+
+class TraceRecorder():
+    def __init__(self, path, clock=time.perf_counter):
+        self.path = path
+        self._writer = TraceWriter(path)
+        self._clock = clock
+        self._start = clock()
+        self.count = 0
+
+    def record(self, midi_bytes):
+        # only notes and CCs, the K2 doesn't send anything else
+        if len(midi_bytes) == 3:
+            self._writer.add(int((self._clock() - self._start) * 1e6), midi_bytes)
+            self.count += 1
+
+    def tick(self):
+        self._writer.flush()
+
+    def stop(self):
+        self._writer.close()
+
+
+def read(path):
+    """
+        Returns the wall clock time the trace was started at and a list of
+        (seconds since the start, midi bytes)
+    """
+    with open(path, "rb") as f:
+        data = f.read()
+    if not data.startswith(MAGIC):
+        raise ValueError("%s is not a trace" % path)
+    version, started_at = HEADER.unpack_from(data, len(MAGIC))
+    if version != FORMAT_VERSION:
+        raise ValueError("%s has trace format %d, expected %d" % (path, version, FORMAT_VERSION))
+    offset = len(MAGIC) + HEADER.size
+    # a recording that was cut off may end in a partial record
+    end = offset + (len(data) - offset) // EVENT.size * EVENT.size
+    events = [(microseconds / 1e6, (b0, b1, b2))
+              for microseconds, b0, b1, b2 in EVENT.iter_unpack(data[offset:end])]
+    return started_at, events
+
+
+def start(log, setting=None):
+    """Starts recording if XONEK2_TRACE (or setting) says so"""
+    setting = g_switch.setting(setting)
+    recorder = None
+    if setting:
+        path = os.path.expanduser(setting)
+        if os.path.isdir(path):
+            path = os.path.join(path, time.strftime("xonek2-%Y%m%d-%H%M%S.trace"))
+        try:
+            recorder = TraceRecorder(path)
+            log("recording MIDI trace to %s" % path)
+        except OSError as e:
+            log("can't record MIDI trace to %s: %s" % (path, e))
+    return g_switch.switch_on(recorder)
+
+
+def stop():
+    g_switch.stop()
+
+
+def record(midi_bytes):
+    recorder = g_switch.active
+    if recorder is not None:
+        recorder.record(midi_bytes)
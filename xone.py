@@ -1,6 +1,6 @@
 import time
-import os
 
+from collections import OrderedDict
 from functools import partial
 
 import Live
@@ -18,15 +18,14 @@ from _Framework.TransportComponent import TransportComponent
 import _Framework.Task
 
 from XoneK2_DJ.Browser import BrowserItem, BrowserRepresentation
-g_logger = None
-DEBUG = True
-
-def log(msg):
-    global g_logger
-    if DEBUG:
-        if g_logger is not None:
-            g_logger(msg)
-
+from XoneK2_DJ.dispatcher import ActionDispatcher
+from XoneK2_DJ import diagnostics
+from XoneK2_DJ import latency
+from XoneK2_DJ import logger
+from XoneK2_DJ import profiling
+from XoneK2_DJ import trace
+g_leds = None
+g_pending_writes = set()
 
 EQ_DEVICES = {
     'FilterEQ3': {
@@ -84,6 +83,64 @@ class ClipState():
     PLAYING = 3
 
 
+# at most this many LED messages go out per control surface tick, the rest follows on the next ticks
+MAX_LED_MESSAGES_PER_TICK = 24
+
+class LedShadow():
+    """
+        Shadow of the K2's button LEDs, keyed by the note of the button (other colors
+        are at an offset from it). Buttons only record the color they want, flush()
+        sends the LEDs that differ from what was last sent, once per tick and at
+        most MAX_LED_MESSAGES_PER_TICK messages at a time.
+    """
+    def __init__(self, send_midi):
+        self._send_midi = send_midi
+        self._wanted = {} # notenr -> (color offset or None for off, colormap)
+        self._sent = {} # notenr -> color offset or None, as last sent
+        self._dirty = OrderedDict()
+
+    def set(self, notenr, color=None, colormap=Color):
+        self._wanted[notenr] = (color, colormap)
+        if notenr in self._sent and self._sent[notenr] == color:
+            self._dirty.pop(notenr, None)
+        else:
+            self._dirty[notenr] = True
+
+    def invalidate(self):
+        """forget what was sent, e.g. when the controller was reconnected, and resend everything"""
+        self._sent = {}
+        for notenr in self._wanted:
+            self._dirty[notenr] = True
+
+    def forget(self, notenr):
+        """the LED was changed behind the shadow's back, e.g. by send_value() of a mapped button"""
+        self._sent.pop(notenr, None)
+
+    def flush(self):
+        sent = 0
+        while self._dirty:
+            notenr = next(iter(self._dirty))
+            messages = self._messages(notenr)
+            if sent + len(messages) > MAX_LED_MESSAGES_PER_TICK:
+                break
+            del self._dirty[notenr]
+            for msg in messages:
+                self._send_midi(msg)
+            sent += len(messages)
+            self._sent[notenr] = self._wanted[notenr][0]
+
+    def _messages(self, notenr):
+        color, colormap = self._wanted[notenr]
+        if color is not None:
+            offsets, velocity = (color,), 127
+        elif notenr in self._sent:
+            # switch off the color that is lit
+            offsets, velocity = (self._sent[notenr] or 0,), 0
+        else:
+            # don't know what's lit, switch off all colors
+            offsets, velocity = (colormap.RED, colormap.YELLOW, colormap.GREEN), 0
+        return [(144 + CHANNEL, notenr + offset, velocity) for offset in offsets]
+
 class ButtonWithLight(ButtonElement):
     def __init__(self, notenr):
         super(ButtonWithLight, self).__init__(True, MIDI_NOTE_TYPE, CHANNEL, notenr)
@@ -91,7 +148,11 @@ class ButtonWithLight(ButtonElement):
 
     def release_parameter(self):
         super(ButtonWithLight, self).release_parameter()
-        self.send_midi((144 + CHANNEL, self.notenr, 0)) # for some reason send_value() doesn't work reliably, so send raw MIDI
+        # the framework lit the LED with send_value() while the button was mapped, so the
+        # shadow can't know its state. For some reason send_value() doesn't work reliably
+        # for switching it off, the shadow sends raw MIDI
+        g_leds.forget(self.notenr)
+        g_leds.set(self.notenr)
 
 class MultiShiftButton(ButtonElement):
     def __init__(self, notenr, max_states=4, colormap=ColorBottomRow()):
@@ -100,7 +161,7 @@ class MultiShiftButton(ButtonElement):
         self._state = 0
         self._notenr = notenr
         self._colormap = colormap
-        self.add_value_listener(self._on_push)
+        self.add_value_listener(latency.instrument("MultiShiftButton %d" % notenr, self._on_push))
         self._update_light()
 
     def state(self):
@@ -113,15 +174,13 @@ class MultiShiftButton(ButtonElement):
 
     def _update_light(self):
         if self._state == 0:
-            self.send_midi((144 + CHANNEL, self._notenr + self._colormap.RED, 0))
-            self.send_midi((144 + CHANNEL, self._notenr + self._colormap.YELLOW, 0))
-            self.send_midi((144 + CHANNEL, self._notenr + self._colormap.GREEN, 0))
+            g_leds.set(self._notenr, None, self._colormap)
         elif self._state == 1:
-            self.send_midi((144 + CHANNEL, self._notenr + self._colormap.RED, 127))
+            g_leds.set(self._notenr, self._colormap.RED, self._colormap)
         elif self._state == 2:
-            self.send_midi((144 + CHANNEL, self._notenr + self._colormap.YELLOW, 127))
+            g_leds.set(self._notenr, self._colormap.YELLOW, self._colormap)
         elif self._state == 3:
-            self.send_midi((144 + CHANNEL, self._notenr + self._colormap.GREEN, 127))
+            g_leds.set(self._notenr, self._colormap.GREEN, self._colormap)
 
 class DetailViewButton(ButtonElement):
     def __init__(self, notenr, parent, tracknum):
@@ -129,7 +188,7 @@ class DetailViewButton(ButtonElement):
         self._notenr = notenr
         self._parent = parent
         self._tracknum = tracknum
-        self.add_value_listener(self._on_push)
+        self.add_value_listener(latency.instrument("DetailViewButton %d" % notenr, self._on_push))
 
     def _on_push(self, value):
         if value > 64:
@@ -147,14 +206,88 @@ def button(notenr, name=None):
         rv.name = name
     return rv
 
+# Incoming values of a control are written to its Live parameter at most once per this
+# many seconds. The first value after a pause is written right away, faster ones are
+# coalesced and the latest is written once the interval passed, at the latest on the
+# next tick. 0 writes every value. Keys are a control type or "<type> <cc>" for a
+# single control.
+COALESCE_INTERVAL = {
+    "Fader": 0.02,
+    "EqGainEncoder": 0.02,
+    "DynamicEncoder": 0.02,
+}
+
+class ParameterWriter():
+    """
+        Writes the values of one control to a Live parameter, coalescing them as
+        configured in COALESCE_INTERVAL. Absolute controls keep the latest value,
+        relative ones add up their deltas (acceleration included).
+    """
+    def __init__(self, kind, cc=None):
+        self._name = kind if cc is None else "%s %d" % (kind, cc)
+        self._interval = COALESCE_INTERVAL.get(self._name, COALESCE_INTERVAL.get(kind, 0.0))
+        self._parameter = None
+        self._value = None
+        self._delta = 0.0
+        self._last_write = 0.0
+        self._pending_since = None
+
+    def set_value(self, parameter, value):
+        self._switch_to(parameter)
+        self._value = value
+        self._delta = 0.0
+        self._changed()
+
+    def add_delta(self, parameter, delta):
+        self._switch_to(parameter)
+        self._delta += delta
+        self._changed()
+
+    def _switch_to(self, parameter):
+        if parameter != self._parameter:
+            if self._pending_since is not None:
+                self.write()
+            self._parameter = parameter
+
+    def _changed(self):
+        now = time.monotonic()
+        if now - self._last_write >= self._interval:
+            self.write(now)
+        elif self._pending_since is None:
+            self._pending_since = now
+            g_pending_writes.add(self)
+
+    def write(self, now=None):
+        now = now or time.monotonic()
+        if self._pending_since is not None:
+            latency.record("%s coalesced" % self._name, now - self._pending_since)
+            self._pending_since = None
+            g_pending_writes.discard(self)
+        if self._parameter is None:
+            return
+        if self._value is not None:
+            self._parameter.value = self._value
+            self._value = None
+        elif self._delta:
+            new_value = self._parameter.value + self._delta
+            self._parameter.value = max(min(self._parameter.max, new_value), self._parameter.min)
+            self._delta = 0.0
+        self._last_write = now
+
+def flush_pending_writes():
+    now = time.monotonic()
+    for writer in list(g_pending_writes):
+        writer.write(now)
+
 class EqGainEncoder(EncoderElement):
     """
     Gain encoder that maps values in a way so 0dB is in the center
     """
     def __init__(self, cc):
         super(EqGainEncoder,self).__init__(MIDI_CC_TYPE, CHANNEL, cc, Live.MidiMap.MapMode.absolute)
-        self.add_value_listener(self.handle_encoder_turn)
+        self.add_value_listener(latency.instrument("EqGainEncoder %d" % cc, self.handle_encoder_turn))
         self.mapped_param = None
+        self._writer = ParameterWriter("EqGainEncoder", cc)
 
     def handle_encoder_turn(self, value):
         zero_db = 0.85
@@ -173,14 +306,15 @@ class EqGainEncoder(EncoderElement):
             self.release_parameter()
 
         if self.mapped_param != None:
-            self.mapped_param.value = fval
+            self._writer.set_value(self.mapped_param, fval)
 
 class Fader(SliderElement):
     def __init__(self, notenr, max=1.0):
         super(Fader,self).__init__(MIDI_CC_TYPE, CHANNEL, notenr)
-        self.add_value_listener(self.handle_slider)
+        self.add_value_listener(latency.instrument("Fader %d" % notenr, self.handle_slider))
         self._max = max
         self._mapped_param = None
+        self._writer = ParameterWriter("Fader", notenr)
 
     def handle_slider(self, value):
         if (self.mapped_parameter() != None):
@@ -188,7 +322,7 @@ class Fader(SliderElement):
             self.release_parameter()
 
         if self._mapped_param != None:
-            self._mapped_param.value = self._max * ((value / 127.0) ** 0.5)
+            self._writer.set_value(self._mapped_param, self._max * ((value / 127.0) ** 0.5))
 
 def knob(cc):
     return EncoderElement(MIDI_CC_TYPE, CHANNEL, cc, Live.MidiMap.MapMode.absolute)
@@ -212,11 +346,12 @@ class DynamicEncoder(EncoderElement):
         self.timeout = timeout
         if cc != None:
             self.encoder = encoder(cc)
-            self.encoder.add_value_listener(self.handle_encoder_turn)
+            self.encoder.add_value_listener(latency.instrument("DynamicEncoder %d" % cc, self.handle_encoder_turn))
         self.sensitivity = 1.0
         self.last_event_value = None
         self.last_event_time = 0
         self.target = target
+        self._writer = ParameterWriter("DynamicEncoder", cc)
 
     def handle_encoder_turn(self, value):
         now = time.time()
@@ -228,8 +363,7 @@ class DynamicEncoder(EncoderElement):
         delta *= self.sensitivity
         if self.target is not None:
             delta *= float(self.target.max - self.target.min) / 150.0
-            new_value = self.target.value + delta
-            self.target.value = max(min(self.target.max, new_value), self.target.min)
+            self._writer.add_delta(self.target, delta)
         self.last_event_time = now
         self.last_event_value = value
 
@@ -239,8 +373,8 @@ class MultiplexedEncoder(EncoderElement):
         self._encoders = encoders
         self._shift_button = shift_button
         self._button = button(button_cc)
-        self._button.add_value_listener(self._handle_button)
-        self.add_value_listener(self._handle_encoder_turn)
+        self._button.add_value_listener(latency.instrument("MultiplexedEncoder button %d" % button_cc, self._handle_button))
+        self.add_value_listener(latency.instrument("MultiplexedEncoder %d" % cc, self._handle_encoder_turn))
 
     def _handle_encoder_turn(self, value):
         state = self._shift_button.state()
@@ -352,10 +486,14 @@ class BrowserScroller(DynamicEncoder):
 
 
 class WaveformZoom(DynamicEncoder):
-    def __init__(self, application, song):
+    ZOOM_IN_KEY_CODE = 24
+    ZOOM_OUT_KEY_CODE = 27
+
+    def __init__(self, application, song, dispatcher):
         super(WaveformZoom, self).__init__(None, None)
         self._application = application
         self._song = song
+        self._dispatcher = dispatcher
 
     def handle_button(self, value):
         if (value > 64):
@@ -364,12 +502,23 @@ class WaveformZoom(DynamicEncoder):
     def handle_encoder_turn(self, value):
         self._application.view.show_view('Detail/Clip')
         self._application.view.focus_view('Detail/Clip')
+        # zoom yuckily, by sending key presses to Live. This runs in the background and
+        # turns that come in while a previous zoom is still running are sent in one go
         if value < 64:
-            # zoom in yuckily
-            os.system("osascript -e 'tell application \"System Events\" to tell process \"Live\" to key code 24'")
+            self._dispatcher.submit("zoom_in", partial(self._zoom_command, self.ZOOM_IN_KEY_CODE))
         else:
-            # zoom out yuckily
-            os.system("osascript -e 'tell application \"System Events\" to tell process \"Live\" to key code 27'")
+            self._dispatcher.submit("zoom_out", partial(self._zoom_command, self.ZOOM_OUT_KEY_CODE))
+
+    @staticmethod
+    def _zoom_command(key_code, count):
+        return [
+            "osascript",
+            "-e", 'tell application "System Events" to tell process "Live"',
+            "-e", "repeat %d times" % count,
+            "-e", "key code %d" % key_code,
+            "-e", "end repeat",
+            "-e", "end tell"
+        ]
 
 class PositionScroller(DynamicEncoder):
     def __init__(self, application, song):
@@ -386,11 +535,10 @@ class PositionScroller(DynamicEncoder):
 class GlobalStopButton(ButtonElement):
     def __init__(self, button_cc, song):
         self.button = button(button_cc)
-        self.button.add_value_listener(self.handle_button)
+        self.button.add_value_listener(latency.instrument("GlobalStopButton %d" % button_cc, self.handle_button))
         self.song = song
         song.add_is_playing_listener(self.handle_song_is_playing)
         self.last_stop_button_time = 0
-        log("song %s" % dir(song))
 
     def handle_song_is_playing(self):
         self.button.send_value(127 if self.song.is_playing else 0)
@@ -407,6 +555,9 @@ class GlobalStopButton(ButtonElement):
         self.last_stop_button_time = now
 
 class MixerWithDevices(MixerComponent):
+    # device of a strip that hasn't looked at its track's devices yet
+    UNASSIGNED = object()
+
     def __init__(self, num_tracks, num_returns=0, device_select=None, device_encoders=None):
         self.devices = []
         self.eqs = []
@@ -421,20 +572,22 @@ class MixerWithDevices(MixerComponent):
                 "track": None,
                 "params": [],
                 "toggle": None,
+                "device": None,
             }
             self.devices.append(dev)
             self.register_components(dev["component"])
             eq = {
                 "component": DeviceComponent(),
                 "cb": None,
-                "track": None
+                "track": None,
+                "device": None,
             }
             self.eqs.append(eq)
             self.register_components(eq["component"])
         self._reassign_tracks()
         if device_select:
             for i, b in enumerate(device_select):
-                b.add_value_listener(partial(self.on_device_select_push, i))
+                b.add_value_listener(latency.instrument("DeviceSelectButton %d" % b.notenr, partial(self.on_device_select_push, i)))
 
         self.song().view.add_selected_track_listener(self.on_track_selected)
 
@@ -459,8 +612,7 @@ class MixerWithDevices(MixerComponent):
     def light_up(self, which_track):
         if self.device_select:
             for i, b in enumerate(self.device_select):
-                velocity = 127 if i == which_track else 0
-                b.send_midi((144 + CHANNEL, b._msg_identifier, velocity))
+                g_leds.set(b._msg_identifier, Color.RED if i == which_track else None)
 
     def attach_encoders(self):
         for control, target in zip(self.encoders, self.devices[self.active_track]["params"]):
@@ -477,31 +629,23 @@ class MixerWithDevices(MixerComponent):
         # assign each DeviceComponent to the first device on its track
         # this could be called before we construct self.devices
         if self.devices:
-            log("reassigning tracks")
             tracks_to_use = self.get_active_tracks()
-            log("tracks_to_use has %d elements" % len(tracks_to_use))
-            log("devices has %d" % len(self.devices))
-            for i, dev in enumerate(self.devices):
-                if i < len(tracks_to_use):
-                    log("device %d gets a track %s" % (i, tracks_to_use[i].name))
-                    self.assign_device_to_track(tracks_to_use[i], i)
-                else:
-                    log("device %d gets no track" % i)
-                    self.assign_device_to_track(None, i)
-        if self.eqs:
-            log("reassigning tracks")
-            tracks_to_use = self.get_active_tracks()
-            log("tracks_to_use has %d elements" % len(tracks_to_use))
-            log("devices has %d" % len(self.devices))
-            for i, eq in enumerate(self.eqs):
-                if i < len(tracks_to_use):
-                    log("device %d gets a track %s" % (i, tracks_to_use[i].name))
-                    self.assign_eq_to_track(tracks_to_use[i], i)
-                else:
-                    log("device %d gets no track" % i)
-                    self.assign_eq_to_track(None, i)
+            for i in range(len(self.devices)):
+                track = tracks_to_use[i] if i < len(tracks_to_use) else None
+                # strips that keep their track keep their listeners and devices
+                if self.devices[i]["track"] != track:
+                    logger.debug("device %d gets track %s", i, track.name if track is not None else None)
+                    self.assign_device_to_track(track, i)
+                if self.eqs[i]["track"] != track:
+                    self.assign_eq_to_track(track, i)
         self.light_up(self.active_track)
 
+    def _first_device(self, track, is_eq):
+        for dev in track.devices:
+            if (dev.class_name in EQ_DEVICES) == is_eq:
+                return dev
+        return None
+
     def assign_device_to_track(self, track, i):
         # nuke existing listener
         dev = self.devices[i]
@@ -511,6 +655,7 @@ class MixerWithDevices(MixerComponent):
             dev["cb"] = None
             dev["params"] = []
             dev["toggle"] = None
+            dev["device"] = None
             dev["component"].set_lock_to_device(False, None)
             dev["component"].set_device(None)
 
@@ -520,61 +665,60 @@ class MixerWithDevices(MixerComponent):
                 return self._on_device_changed(i)
             dev["cb"] = dcb
             dev["track"] = track
+            dev["device"] = self.UNASSIGNED
             track.add_devices_listener(dcb)
 
             # force an update to attach to any existing device
             dcb()
 
     def _on_device_changed(self, i):
-        log("_on_device_changed %d" % i)
         # the device chain on track i changed-- reassign device if needed
-        track = self.devices[i]["track"]
-        device_comp = self.devices[i]["component"]
-        device = None
-        if track.devices:
-            # Find the first non-EQ device.
-            for dev in track.devices:
-                log("examine device %s" % dev.class_name)
-                if dev.class_name not in EQ_DEVICES:
-                    device = dev
-                    log("using %s" % device.class_name)
-                    self.devices[i]["params"] = device.parameters[1:len(self.encoders)+1]
-                    self.devices[i]["toggle"] = device.parameters[0]
-                    break
-        device_comp.set_lock_to_device(True, device)
-        self.attach_encoders()
-        self.update()
-        self.light_up(self.active_track)
+        dev = self.devices[i]
+        # Find the first non-EQ device.
+        device = self._first_device(dev["track"], False)
+        if device is dev["device"] or device == dev["device"]:
+            return
+        logger.debug("device %d uses %s", i, device.class_name if device is not None else None)
+        dev["device"] = device
+        if device is not None:
+            dev["params"] = device.parameters[1:len(self.encoders)+1]
+            dev["toggle"] = device.parameters[0]
+        dev["component"].set_lock_to_device(True, device)
+        if i == self.active_track:
+            self.attach_encoders()
+        dev["component"].update()
 
     def assign_eq_to_track(self, track, i):
         # nuke existing listener
-        dev = self.eqs[i]
-        if dev["track"]:
-            dev["track"].remove_devices_listener(dev["cb"])
-            dev["track"] = None
-            dev["cb"] = None
-            dev["component"].set_lock_to_device(False, None)
-            dev["component"].set_device(None)
+        eq = self.eqs[i]
+        if eq["track"]:
+            eq["track"].remove_devices_listener(eq["cb"])
+            eq["track"] = None
+            eq["cb"] = None
+            eq["device"] = None
+            eq["component"].set_lock_to_device(False, None)
+            eq["component"].set_device(None)
 
         if track is not None:
             # listen for changes to the device chain
-            def dcb():
-                return self._reassign_tracks()
-            dev["cb"] = dcb
-            dev["track"] = track
-            track.add_devices_listener(dcb)
-            device_comp = self.eqs[i]["component"]
-            device = None
-            if track.devices:
-                # Find the first EQ device.
-                for dev in track.devices:
-                    log("examine device %s" % dev.class_name)
-                    if dev.class_name in EQ_DEVICES:
-                        log("using it")
-                        device = dev
-                        break
-            device_comp.set_lock_to_device(True, device)
-        self.update()
+            def ecb():
+                return self._on_eq_changed(i)
+            eq["cb"] = ecb
+            eq["track"] = track
+            eq["device"] = self.UNASSIGNED
+            track.add_devices_listener(ecb)
+            ecb()
+
+    def _on_eq_changed(self, i):
+        eq = self.eqs[i]
+        # Find the first EQ device.
+        device = self._first_device(eq["track"], True)
+        if device is eq["device"] or device == eq["device"]:
+            return
+        logger.debug("eq %d uses %s", i, device.class_name if device is not None else None)
+        eq["device"] = device
+        eq["component"].set_lock_to_device(True, device)
+        eq["component"].update()
 
     def set_eq_controls(self, track_nr, controls):
         eq_comp = self.eqs[track_nr]["component"]
@@ -593,7 +737,7 @@ class ClipStartButton(ButtonElement):
         self._song = song
         self._tracknr = tracknr
         self._notenr = notenr
-        self.add_value_listener(self._push_button)
+        self.add_value_listener(latency.instrument("ClipStartButton %d" % notenr, self._push_button))
         self._timer = None
         self._warning_toggle = False
 
@@ -613,14 +757,14 @@ class ClipStartButton(ButtonElement):
             else:
                 color = Color.GREEN
 
-            self.send_midi((144 + CHANNEL, self._notenr + color, 127))    
+            g_leds.set(self._notenr, color)
         else:
-            self.send_midi((144 + CHANNEL, self._notenr, 0))    
+            g_leds.set(self._notenr)
 
     def _flash_warp_warning(self):
         color = Color.GREEN if self._warning_toggle else Color.RED
         self._warning_toggle = not self._warning_toggle
-        self.send_midi((144 + CHANNEL, self._notenr + color, 127))    
+        g_leds.set(self._notenr, color)
 
     def _push_button(self, value):
         if value > 1:
@@ -633,38 +777,191 @@ class TrackStopButton(ButtonElement):
         self.mixer = mixer
         self.tracknr = tracknr
         self.notenr = notenr
-        self.add_value_listener(self.push_button)
+        self.add_value_listener(latency.instrument("TrackStopButton %d" % notenr, self.push_button))
 
     def set_track_playing(self, is_playing):
-        if is_playing:
-            self.send_midi((144 + CHANNEL, self.notenr, 127))    
-        else:
-            self.send_midi((144 + CHANNEL, self.notenr, 0))    
+        g_leds.set(self.notenr, Color.RED if is_playing else None)
 
     def push_button(self, value):
         if value > 1:
             self.mixer.channel_strip(self.tracknr)._track.stop_all_clips()
 
+class ClipListenerRegistry():
+    """
+        Keeps the has_clip listeners on clip slots and the playing_status listeners
+        on their clips, keyed by (track index, slot index). Syncing compares the
+        session against what is registered and only adds or removes listeners for
+        slots and clips that changed, so dropping one clip into a big set doesn't
+        re-register thousands of listeners.
+    """
+    def __init__(self, on_slot_changed, on_clip_changed):
+        self._on_slot_changed = on_slot_changed
+        self._on_clip_changed = on_clip_changed
+        self._slots = {} # (track_idx, slot_idx) -> (slot, callback)
+        self._clips = {} # (track_idx, slot_idx) -> (clip, callback)
+        self._num_slots = {} # track_idx -> number of slots registered
+
+    def sync(self, tracks):
+        for track_idx, track in enumerate(tracks):
+            self.sync_track(track_idx, track)
+        for track_idx in [t for t in self._num_slots if t >= len(tracks)]:
+            self._remove_track(track_idx)
+
+    def sync_track(self, track_idx, track):
+        slots = track.clip_slots
+        for slot_idx, slot in enumerate(slots):
+            self.sync_slot(track_idx, slot_idx, slot)
+        for slot_idx in range(len(slots), self._num_slots.get(track_idx, 0)):
+            self._remove_slot((track_idx, slot_idx))
+        self._num_slots[track_idx] = len(slots)
+
+    def sync_slot(self, track_idx, slot_idx, slot):
+        key = (track_idx, slot_idx)
+        registered = self._slots.get(key)
+        if registered is None or registered[0] != slot:
+            self._remove_slot(key)
+            callback = lambda : self._on_slot_changed(slot, track_idx, slot_idx)
+            slot.add_has_clip_listener(callback)
+            self._slots[key] = (slot, callback)
+
+        clip = slot.clip if slot.has_clip else None
+        registered = self._clips.get(key)
+        if registered is not None and registered[0] == clip:
+            return
+        self._remove_clip(key)
+        if clip is not None:
+            callback = lambda : self._on_clip_changed(clip, track_idx, slot_idx)
+            clip.add_playing_status_listener(callback)
+            self._clips[key] = (clip, callback)
+
+    def clear(self):
+        for track_idx in list(self._num_slots):
+            self._remove_track(track_idx)
+
+    def _remove_track(self, track_idx):
+        for slot_idx in range(self._num_slots.pop(track_idx, 0)):
+            self._remove_slot((track_idx, slot_idx))
+
+    def _remove_slot(self, key):
+        self._remove_clip(key)
+        registered = self._slots.pop(key, None)
+        if registered is None:
+            return
+        slot, callback = registered
+        try:
+            if slot.has_clip_has_listener(callback):
+                slot.remove_has_clip_listener(callback)
+        except:
+            pass
+
+    def _remove_clip(self, key):
+        registered = self._clips.pop(key, None)
+        if registered is None:
+            return
+        clip, callback = registered
+        try:
+            if clip.playing_status_has_listener(callback):
+                clip.remove_playing_status_listener(callback)
+        except:
+            pass
+
+class DeckState():
+    """
+        What is playing on the decks, i.e. the first NUM_TRACKS tracks: the playing
+        slot, clip and file per deck and the master deck. It is updated from the
+        listener that fired rather than by rescanning the session, and tells
+        whether something the browser shows (a deck's file or the master deck)
+        changed.
+    """
+    def __init__(self):
+        self._slots = []
+        self._clips = []
+        self._files = []
+        self._master = -1
+
+    def num_decks(self):
+        return len(self._slots)
+
+    def files(self):
+        return list(self._files)
+
+    def master(self):
+        return self._master
+
+    def is_playing(self, deck):
+        return 1 if self._slots[deck] >= 0 else 0
+
+    def sync(self, tracks):
+        self._slots = [-1] * len(tracks)
+        self._clips = [None] * len(tracks)
+        self._files = [None] * len(tracks)
+        for deck, track in enumerate(tracks):
+            self.sync_track(deck, track)
+        self._update_master()
+
+    def sync_track(self, deck, track):
+        """re-reads the playing slot of one track, returns True if the browser needs an update"""
+        slot_idx = track.playing_slot_index
+        clip = track.clip_slots[slot_idx].clip if slot_idx >= 0 else None
+        return self._set_deck(deck, slot_idx, clip)
+
+    def clip_changed(self, deck, slot_idx, clip):
+        """a clip's playing status changed, returns True if the browser needs an update"""
+        if clip.is_playing:
+            return self._set_deck(deck, slot_idx, clip)
+        if self._slots[deck] == slot_idx:
+            return self._set_deck(deck, -1, None)
+        return False
+
+    def _set_deck(self, deck, slot_idx, clip):
+        if self._slots[deck] == slot_idx and self._clips[deck] == clip:
+            # relaunched, which can make another deck the one playing the longest
+            return self._update_master()
+        self._slots[deck] = slot_idx
+        self._clips[deck] = clip
+        file_path = clip.file_path if clip is not None and clip.is_audio_clip else None
+        file_changed = self._files[deck] != file_path
+        self._files[deck] = file_path
+        return self._update_master() or file_changed
+
+    def _update_master(self):
+        # the master deck is the one that has been playing for the longest time
+        master = -1
+        max_play_time = 0
+        for deck, clip in enumerate(self._clips):
+            if clip is not None and clip.playing_position > max_play_time:
+                max_play_time = clip.playing_position
+                master = deck
+        changed = master != self._master
+        self._master = master
+        return changed
+
 class XoneK2_DJ(ControlSurface):
     def __init__(self, instance):
-        global g_logger
-        g_logger = self.log_message
+        global g_leds
+        self.logger = logger.start(self.log_message)
         super(XoneK2_DJ, self).__init__(instance)
-        self.tracks_with_listener = []
-        self.slots_with_listener = []
-        self.clips_with_listener = []
-        self.slot_callbacks = []
-        self.clip_callbacks = []
+        g_leds = self.leds = LedShadow(self._send_midi)
+        latency.start(logger.info)
+        trace.start(logger.info)
+        profiling.start(logger.info)
+        # flushes the log and does the periodic work of the other diagnostics that are on
+        self._tasks.add(Task.repeat(Task.run(diagnostics.tick)))
+        profiling.instrument(self, ["update_track_playing_status"])
+        self.clip_listeners = ClipListenerRegistry(self.on_slot_clip_changed, self.on_clip_playing_changed)
+        profiling.instrument(self.clip_listeners, ["sync", "sync_track", "sync_slot"])
+        self.deck_state = DeckState()
 
         with self.component_guard():
             self._set_suppress_rebuild_requests(True)
             self.shift_button = MultiShiftButton(BUTTON_LL, 4)
 
+            self._led_flush_task = self._tasks.add(Task.repeat(Task.run(latency.instrument("tick: LED flush", self.leds.flush))))
+            self._write_flush_task = self._tasks.add(Task.repeat(Task.run(latency.instrument("tick: parameter writes", flush_pending_writes))))
             self.init_session()
             self.init_mixer()
 
-            self.remove_clip_listeners()
-            self.add_clip_listeners()
+            self.clip_listeners.sync(self.song().tracks[:NUM_TRACKS])
             self.update_track_playing_status()
 
             self._set_suppress_rebuild_requests(False)
@@ -674,17 +971,19 @@ class XoneK2_DJ(ControlSurface):
 
     def init_session(self):
         self.transport = TransportComponent()
-        self.browser_repr = BrowserRepresentation(self.application().browser, self.log_message)
+        self.dispatcher = ActionDispatcher(logger.warning)
+        self.browser_repr = BrowserRepresentation(self.application().browser, logger.info)
+        profiling.instrument(self.browser_repr, ["poll", "_apply_filter", "_update", "set_decks"])
         self.song().add_tempo_listener(self._tempo_changed)
         self._tempo_changed()
-        self._browser_poll_task = self._tasks.add(Task.repeat(Task.run(self.browser_repr.poll)))
+        self._browser_poll_task = self._tasks.add(Task.repeat(Task.run(latency.instrument("tick: browser poll", self.browser_repr.poll))))
 
         self.bottom_left_encoder = MultiplexedEncoder(
             [
                 TempoEncoder(self.transport),
                 DynamicEncoder(None, self.song().master_track.mixer_device.cue_volume),
                 BrowserScroller(self.browser_repr, BrowserScroller.HORIZONTAL),
-                WaveformZoom(self.application(), self.song())
+                WaveformZoom(self.application(), self.song(), self.dispatcher)
             ],
             self.shift_button, ENCODER_LL, PUSH_ENCODER_LL)
 
@@ -706,6 +1005,7 @@ class XoneK2_DJ(ControlSurface):
             device_encoders=ENCODERS
         )
         self.mixer.id = 'Mixer'
+        profiling.instrument(self.mixer, ["_reassign_tracks"])
 
         self.song().view.selected_track = self.mixer.channel_strip(0)._track
 
@@ -728,36 +1028,35 @@ class XoneK2_DJ(ControlSurface):
             self.track_stop_buttons.append(TrackStopButton(i, GRID[1][i], self.mixer))
             if self.mixer.channel_strip(i)._track != None:
                 # TODO support adding of tracks without the need to reload the script
-                self.mixer.channel_strip(i)._track.add_clip_slots_listener(self.on_track_changed)
+                self.mixer.channel_strip(i)._track.add_clip_slots_listener(partial(self.on_track_changed, i))
             self.clip_view_buttons.append(DetailViewButton(GRID[3][i], self, i))
 
         self.song().view.add_selected_scene_listener(self.on_scene_changed)
         self.mixer.update()
 
     def on_scene_changed(self):
-        log("scene changed")
-        self.update_track_playing_status()
-
-    def on_track_changed(self):
-        log("track changed")
-        self.remove_clip_listeners()
-        self.add_clip_listeners()
-        self.update_track_playing_status()
+        logger.debug("scene changed")
+        for i in range(self.deck_state.num_decks()):
+            self.update_track_buttons(i)
+
+    def on_track_changed(self, track_idx):
+        logger.debug("track %d changed", track_idx)
+        track = self.song().tracks[track_idx]
+        self.clip_listeners.sync_track(track_idx, track)
+        if self.deck_state.sync_track(track_idx, track):
+            self.push_decks()
+        self.update_track_buttons(track_idx)
 
     def on_slot_clip_changed(self, slot, track_idx, slot_idx):
-        self.remove_clip_listeners()
-        self.add_clip_listeners()
-        self.update_track_playing_status()
+        self.clip_listeners.sync_slot(track_idx, slot_idx, slot)
+        if self.deck_state.sync_track(track_idx, self.song().tracks[track_idx]):
+            self.push_decks()
+        self.update_track_buttons(track_idx)
 
     def on_clip_playing_changed(self, clip, track_idx, clip_idx):
-        self.update_track_playing_status()
-
-    def is_track_playing(self, track):
-        for slot in track.clip_slots:
-            if slot.has_clip and slot.clip.is_playing:
-                return 1
-
-        return 0
+        if self.deck_state.clip_changed(track_idx, clip_idx, clip):
+            self.push_decks()
+        self.update_track_buttons(track_idx)
 
     def is_selected_slot_playing(self, track_idx):
         slot = self.song().view.selected_scene.clip_slots[track_idx]
@@ -772,87 +1071,35 @@ class XoneK2_DJ(ControlSurface):
                 state = ClipState.STOPPED_NO_WARP
         return slot.has_clip, state
 
-    def update_track_playing_status(self):
-        i = 0
-        playing_tracks = []
-        master_deck_index = -1
-        max_play_time = 0
-        for track in self.song().tracks:
-            if i >= NUM_TRACKS:
-                return
+    def update_track_buttons(self, track_idx):
+        is_selected, clip_state = self.is_selected_slot_playing(track_idx)
+        self.clip_start_buttons[track_idx].set_clip_selected(is_selected, clip_state)
+        self.track_stop_buttons[track_idx].set_track_playing(self.deck_state.is_playing(track_idx))
 
-            is_selected, clip_state = self.is_selected_slot_playing(i)
-            self.clip_start_buttons[i].set_clip_selected(is_selected, clip_state)
-            self.track_stop_buttons[i].set_track_playing(self.is_track_playing(track))
+    def push_decks(self):
+        self.browser_repr.set_decks(self.deck_state.files(), self.deck_state.master())
 
-            if track.playing_slot_index >= 0:
-                slot = track.clip_slots[track.playing_slot_index]
-                playing_tracks.append(slot.clip.file_path)
+    def update_track_playing_status(self):
+        """full resync of the decks and the clip/stop buttons, the listeners keep them up to date afterwards"""
+        self.deck_state.sync(self.song().tracks[:NUM_TRACKS])
+        for i in range(self.deck_state.num_decks()):
+            self.update_track_buttons(i)
+        self.push_decks()
 
-                # the master deck is the one that has been playing for the longest time
-                if (slot.clip.playing_position > max_play_time):
-                    max_play_time = slot.clip.playing_position
-                    master_deck_index = i
+    def receive_midi(self, midi_bytes):
+        trace.record(midi_bytes)
+        super(XoneK2_DJ, self).receive_midi(midi_bytes)
 
-            else:
-                playing_tracks.append(None)
-
-            i += 1
-        self.browser_repr.set_decks(playing_tracks, master_deck_index)
-
-    def clip_add_callback(self, clip, track_idx, clip_idx):
-        callback = lambda : self.on_clip_playing_changed(clip, track_idx, clip_idx)
-        clip.add_playing_status_listener(callback)
-        self.clips_with_listener += [clip]
-        self.clip_callbacks += [callback]
-
-    def slot_add_callback(self, slot, track_idx, slot_idx):
-        callback = lambda : self.on_slot_clip_changed(slot, track_idx, slot_idx)
-        slot.add_has_clip_listener(callback)
-        self.slots_with_listener += [slot]
-        self.slot_callbacks += [callback]
-
-    def add_clip_listeners(self):
-        i = 0
-        for track in self.song().tracks:
-            if i >= NUM_TRACKS:
-                return
-            sloti = 0
-            for slot in track.clip_slots:
-                if slot.has_clip:
-                    self.clip_add_callback(slot.clip, i, sloti)
-                self.slot_add_callback(slot, i, sloti)
-                sloti += 1
-
-            i += 1
-
-    def remove_slot_listeners(self):
-        for i in range(0, len(self.slots_with_listener)):
-            slot = self.slots_with_listener[i]
-            callback = self.slot_callbacks[i]
-            try:
-                if slot.has_clip_has_listener(callback):
-                    slot.remove_has_clip_listener(callback)
-            except:
-                continue
-
-        self.slots_with_listener = []
-        self.slot_callbacks = []
-
-    def remove_clip_listeners(self):
-        self.remove_slot_listeners()
-        for i in range(0, len(self.clips_with_listener)):
-            clip = self.clips_with_listener[i]
-            callback = self.clip_callbacks[i]
-            try:
-                if clip.playing_status_has_listener(callback):
-                    clip.remove_playing_status_listener(callback)
-            except:
-                continue
-
-        self.clips_with_listener = []
-        self.clip_callbacks = []
+    def refresh_state(self):
+        super(XoneK2_DJ, self).refresh_state()
+        self.leds.invalidate()
 
     def disconnect(self):
+        self.clip_listeners.clear()
         super(XoneK2_DJ, self).disconnect()
-        self.browser_repr.disconnect()
\ No newline at end of file
+        self.browser_repr.disconnect()
+        self.dispatcher.stop()
+        latency.stop()
+        trace.stop()
+        profiling.stop()
+        logger.stop()
\ No newline at end of file